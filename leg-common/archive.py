@@ -0,0 +1,348 @@
+"""
+Parquet cold tier for LEG time-series data.
+
+Closed months are moved out of the hot store (InfluxDB or SQLite, see
+timeseries.py) into Parquet files partitioned by month and house:
+
+    <root>/<measurement>/month=2026-01/house_id=7/data.parquet
+
+Each file holds one house-month sorted by time, one row group per day, with
+column statistics. Queries read only the requested field columns, skip
+month/house partitions outside the filter and skip row groups whose time
+statistics fall outside the range. `_manifest.json` records up to where
+each measurement is archived.
+
+TieredStore puts the archive behind the hot store's interface: ranges
+before the archive boundary are answered from Parquet, the rest from the
+hot store, and the results merged.
+"""
+
+import json
+import os
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+MANIFEST = "_manifest.json"
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string()), ("house_id", pa.string())]), flavor="hive")
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def month_bounds(month: str) -> tuple[datetime, datetime]:
+    """UTC [start, stop) of a "YYYY-MM" month."""
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=UTC)
+    stop = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, stop
+
+
+def months_between(start: datetime, stop: datetime) -> list[str]:
+    """"YYYY-MM" of every month overlapping [start, stop)."""
+    months = []
+    month = start.astimezone(UTC).strftime("%Y-%m")
+    while month_bounds(month)[0] < stop:
+        months.append(month)
+        month = month_bounds(month)[1].strftime("%Y-%m")
+    return months
+
+
+def _utc(time: datetime) -> datetime:
+    return time if time.tzinfo else time.replace(tzinfo=UTC)
+
+
+class ParquetArchive:
+    """Month/house-partitioned Parquet files with a manifest of archived ranges."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    # Manifest
+
+    def _manifest(self) -> dict:
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.root, MANIFEST))
+
+    def months(self, measurement: str) -> list[str]:
+        return self._manifest().get(measurement, {}).get("months", [])
+
+    def archived_until(self, measurement: str) -> datetime | None:
+        """End of the contiguous archived range (queries before it go to Parquet), None if nothing archived."""
+        until = self._manifest().get(measurement, {}).get("archived_until")
+        return datetime.fromisoformat(until) if until else None
+
+    # Writing
+
+    def month_writer(self, measurement: str, month: str, fields: list[str] | None = None) -> "MonthWriter":
+        return MonthWriter(self, measurement, month, fields)
+
+    def _commit_month(self, measurement: str, month: str) -> None:
+        manifest = self._manifest()
+        entry = manifest.setdefault(measurement, {"months": []})
+        entry["months"] = sorted(set(entry["months"]) | {month})
+        # The boundary only moves over a gap-free run of months from the first one
+        until = None
+        for archived in entry["months"]:
+            start, stop = month_bounds(archived)
+            if until is not None and start != until:
+                break
+            until = stop
+        entry["archived_until"] = until.isoformat()
+        self._save_manifest(manifest)
+
+    # Reading
+
+    def read(self, measurement: str, columns: list[str], start: datetime, stop: datetime | None = None,
+             house_id: str | None = None, house_ids: list[str] | None = None) -> pa.Table:
+        """Rows of [start, stop) with the given columns (time and house_id are available as columns)."""
+        until = self.archived_until(measurement)
+        path = os.path.join(self.root, measurement)
+        if until is None or not os.path.isdir(path):
+            return pa.table({name: pa.array([], pa.float64()) for name in columns})
+        stop = min(_utc(stop), until) if stop is not None else until
+        start = _utc(start)
+
+        dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+        flt = (
+            ds.field("month").isin(months_between(start, stop))
+            & (ds.field("time") >= pa.scalar(start, pa.timestamp("ms", tz="UTC")))
+            & (ds.field("time") < pa.scalar(stop, pa.timestamp("ms", tz="UTC")))
+        )
+        if house_id is not None:
+            flt &= ds.field("house_id") == str(house_id)
+        if house_ids is not None:
+            flt &= ds.field("house_id").isin([str(h) for h in house_ids])
+        available = set(dataset.schema.names)
+        return dataset.to_table(columns=[name for name in columns if name in available], filter=flt)
+
+    def fields(self, measurement: str) -> list[str]:
+        path = os.path.join(self.root, measurement)
+        if not os.path.isdir(path):
+            return []
+        schema = ds.dataset(path, format="parquet", partitioning=PARTITIONING).schema
+        return [name for name in schema.names if name not in ("time", "month", "house_id")]
+
+    def house_ids(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        """house_id values with archived rows in the range, in id order."""
+        table = self.read(measurement, ["house_id"], start, stop)
+        if "house_id" not in table.column_names:
+            return []
+        return sorted(pc.unique(table["house_id"]).to_pylist(), key=lambda h: (len(h), h))
+
+    def sum_fields(self, measurement: str, start: datetime, stop: datetime | None = None,
+                   house_id: str | None = None, by_house: bool = False,
+                   fields: list[str] | None = None, house_ids: list[str] | None = None) -> dict:
+        """Field sums: {field: total}, or {house_id: {field: total}} with by_house."""
+        fields = fields or self.fields(measurement)
+        table = self.read(measurement, ["house_id", *fields], start, stop, house_id, house_ids)
+        fields = [name for name in fields if name in table.column_names]
+        if table.num_rows == 0:
+            return {}
+        if not by_house:
+            return {name: pc.sum(table[name]).as_py() or 0.0 for name in fields}
+        grouped = table.group_by("house_id").aggregate([(name, "sum") for name in fields]).to_pydict()
+        return {
+            house: {name: grouped[f"{name}_sum"][i] or 0.0 for name in fields}
+            for i, house in enumerate(grouped["house_id"])
+        }
+
+    def window_sum(self, measurement: str, field: str, start: datetime, stop: datetime | None = None,
+                   every_s: int = 60, house_id: str | None = None) -> list[tuple[datetime, float]]:
+        """Sums of one field per window, labelled with the window end time; empty windows omitted."""
+        table = self.read(measurement, ["time", field], start, stop, house_id)
+        if table.num_rows == 0 or field not in table.column_names:
+            return []
+        every_ms = every_s * 1000
+        windows = table["time"].cast(pa.int64()).to_numpy() // every_ms
+        values = table[field].fill_null(0.0).to_numpy()
+        keys, inverse = np.unique(windows, return_inverse=True)
+        sums = np.bincount(inverse, weights=values)
+        return [(EPOCH + timedelta(milliseconds=int(key + 1) * every_ms), float(total))
+                for key, total in zip(keys, sums)]
+
+
+class MonthWriter:
+    """
+    Writes one month of a measurement, one house file per house, appending
+    a row group per write() call (the archiver writes one day at a time).
+    Files are written under temporary names and only replace the month on
+    commit().
+
+    All house files share one schema. Pass the month's full field set as
+    `fields` (e.g. the hot store's field_names() for the month); without it
+    the schema is fixed by the first write. A later write with a field
+    outside the schema raises ValueError instead of dropping the column.
+    """
+
+    def __init__(self, archive: ParquetArchive, measurement: str, month: str,
+                 fields: list[str] | None = None) -> None:
+        self.archive = archive
+        self.measurement = measurement
+        self.month = month
+        self.directory = os.path.join(archive.root, measurement, f"month={month}")
+        self.rows = 0
+        self._writers: dict[str, pq.ParquetWriter] = {}
+        self._schema: pa.Schema | None = None if fields is None else self._make_schema(fields)
+
+    @staticmethod
+    def _make_schema(fields) -> pa.Schema:
+        return pa.schema([("time", pa.timestamp("ms", tz="UTC"))] + [(name, pa.float64()) for name in sorted(fields)])
+
+    def write(self, columns: dict[str, list]) -> None:
+        """Append rows in column form (time in ms, house_id, fields) as produced by read_columns()."""
+        if not columns.get("time"):
+            return
+        fields = [name for name in columns if name not in ("time", "house_id")]
+        if self._schema is None:
+            self._schema = self._make_schema(fields)
+        unknown = sorted(set(fields) - set(self._schema.names))
+        if unknown:
+            raise ValueError(f"{self.measurement} {self.month}: fields {', '.join(unknown)} are not in the "
+                             f"month's schema ({', '.join(self._schema.names[1:])})")
+        count = len(columns["time"])
+        batch = pa.table(
+            {"time": pa.array(columns["time"], pa.int64()).cast(pa.timestamp("ms", tz="UTC")),
+             **{name: pa.array(columns.get(name, [None] * count), pa.float64()) for name in self._schema.names[1:]}},
+            schema=self._schema,
+        )
+        house_ids = np.asarray(columns["house_id"])
+        times = np.asarray(columns["time"], dtype=np.int64)
+        for house_id in np.unique(house_ids):
+            rows = np.flatnonzero(house_ids == house_id)
+            rows = rows[np.argsort(times[rows], kind="stable")]
+            self._writer(str(house_id)).write_table(batch.take(rows))
+            self.rows += len(rows)
+
+    def _writer(self, house_id: str) -> pq.ParquetWriter:
+        writer = self._writers.get(house_id)
+        if writer is None:
+            path = os.path.join(self.directory, f"house_id={house_id}")
+            os.makedirs(path, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(path, "data.parquet.tmp"), self._schema,
+                                      compression="zstd", write_statistics=True)
+            self._writers[house_id] = writer
+        return writer
+
+    def commit(self) -> None:
+        """Close all house files, move them into place and record the month in the manifest."""
+        for house_id, writer in self._writers.items():
+            writer.close()
+            path = os.path.join(self.directory, f"house_id={house_id}")
+            os.replace(os.path.join(path, "data.parquet.tmp"), os.path.join(path, "data.parquet"))
+        self._writers.clear()
+        self.archive._commit_month(self.measurement, self.month)
+
+    def abort(self) -> None:
+        for house_id, writer in self._writers.items():
+            writer.close()
+            os.remove(os.path.join(self.directory, f"house_id={house_id}", "data.parquet.tmp"))
+        self._writers.clear()
+
+
+class TieredStore:
+    """A hot store (timeseries.py) with the Parquet archive behind it for older ranges."""
+
+    def __init__(self, hot, archive: ParquetArchive) -> None:
+        self.hot = hot
+        self.archive = archive
+        self.backend = f"{hot.backend}+parquet"
+
+    def write(self, records) -> None:
+        self.hot.write(records)
+
+    async def write_async(self, records) -> None:
+        await self.hot.write_async(records)
+
+    def _split(self, measurement: str, start: datetime, stop: datetime | None):
+        """(cold_stop, hot_start): cold_stop is None without an archived part, hot_start None without a hot part."""
+        until = self.archive.archived_until(measurement)
+        start = _utc(start)
+        if until is None or start >= until:
+            return None, start
+        if stop is not None and _utc(stop) <= until:
+            return _utc(stop), None
+        return until, until
+
+    def house_ids(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        cold_stop, hot_start = self._split(measurement, start, stop)
+        houses = set()
+        if cold_stop is not None:
+            houses.update(self.archive.house_ids(measurement, start, cold_stop))
+        if hot_start is not None:
+            houses.update(self.hot.house_ids(measurement, hot_start, stop))
+        return sorted(houses, key=lambda h: (len(h), h))
+
+    def sum_fields(self, measurement: str, start: datetime, stop: datetime | None = None,
+                   house_id: str | None = None, by_house: bool = False,
+                   fields: list[str] | None = None, house_ids: list[str] | None = None) -> dict:
+        cold_stop, hot_start = self._split(measurement, start, stop)
+        result = {}
+        if cold_stop is not None:
+            result = self.archive.sum_fields(measurement, start, cold_stop, house_id, by_house, fields, house_ids)
+        if hot_start is not None:
+            hot = self.hot.sum_fields(measurement, hot_start, stop, house_id, by_house, fields, house_ids)
+            if by_house:
+                for house, sums in hot.items():
+                    target = result.setdefault(house, {})
+                    for name, value in sums.items():
+                        target[name] = target.get(name, 0.0) + value
+            else:
+                for name, value in hot.items():
+                    result[name] = result.get(name, 0.0) + value
+        return result
+
+    def window_sum(self, measurement: str, field: str, start: datetime, stop: datetime | None = None,
+                   every_s: int = 60, house_id: str | None = None) -> list[tuple[datetime, float]]:
+        cold_stop, hot_start = self._split(measurement, start, stop)
+        windows = []
+        if cold_stop is not None:
+            windows += self.archive.window_sum(measurement, field, start, cold_stop, every_s, house_id)
+        if hot_start is not None:
+            windows += self.hot.window_sum(measurement, field, hot_start, stop, every_s, house_id)
+        return windows
+
+    def read_columns(self, measurement: str, start: datetime, stop: datetime,
+                     fields: list[str] | None = None) -> dict[str, list]:
+        """Records of the range in column form, archived rows first, then the hot store's."""
+        cold_stop, hot_start = self._split(measurement, start, stop)
+        parts = []
+        if cold_stop is not None:
+            names = fields if fields is not None else self.archive.fields(measurement)
+            table = self.archive.read(measurement, ["time", "house_id", *names], start, cold_stop)
+            columns = table.to_pydict()
+            if "time" in columns:
+                columns["time"] = table["time"].cast(pa.int64()).to_pylist()
+                parts.append(columns)
+        if hot_start is not None:
+            parts.append(self.hot.read_columns(measurement, hot_start, stop, fields))
+        names = sorted({name for part in parts for name in part} - {"time", "house_id"})
+        result: dict[str, list] = {"time": [], "house_id": [], **{name: [] for name in names}}
+        for part in parts:
+            count = len(part.get("time", []))
+            for name, values in result.items():
+                values.extend(part.get(name, [None] * count))
+        return result
+
+    def health(self) -> dict:
+        health = self.hot.health()
+        until = self.archive.archived_until("house_energy")
+        health["archived_until"] = until.isoformat() if until else None
+        return {**health, "backend": self.backend}
+
+    def close(self) -> None:
+        self.hot.close()
+
+    async def aclose(self) -> None:
+        await self.hot.aclose()
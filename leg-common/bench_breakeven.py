@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for breakeven.py.
+
+Times a single scalar call (the collector's per-interval path), a plain
+Python loop over the same rules as a reference, and the vectorized call on
+E/I arrays with one and with many tariff sets. The reference loop also
+checks that the vectorized results agree.
+
+Usage:
+    python bench_breakeven.py
+    python bench_breakeven.py --size 100000 --scenarios 50 --repeat 5
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+from breakeven import breakeven_tariffs
+
+P_PV, P_GRID_CON, P_GRID_DEL = 20.0, 30.0, 6.0
+
+
+def reference(E: float, I: float, p_pv: float, p_grid_con: float, p_grid_del: float):
+    """Scalar rules as written out in the FSD (14.5 algorithm)."""
+    if I == 0:
+        return p_grid_con, p_pv
+    if E >= I:
+        p_con = p_grid_del + (E / I) * (p_pv - p_grid_del)
+        if p_con > p_grid_con:
+            return p_grid_con, (I * p_grid_con + (E - I) * p_grid_del) / E
+        return p_con, p_pv
+    return p_grid_con + (E / I) * (p_pv - p_grid_con), p_pv
+
+
+def best_of(stmt, repeat: int, number: int) -> float:
+    """Best time per call in seconds."""
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def peak_memory(stmt) -> int:
+    tracemalloc.start()
+    stmt()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark break-even pricing")
+    parser.add_argument("--size", type=int, default=1_000_000, help="E/I array length")
+    parser.add_argument("--scenarios", type=int, default=20, help="Tariff sets for the broadcast case")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    E = rng.exponential(1.0, args.size)
+    I = rng.exponential(1.0, args.size)
+    I[rng.random(args.size) < 0.05] = 0.0    # intervals without consumption
+    E_list, I_list = E.tolist(), I.tolist()
+
+    # Correctness against the scalar reference
+    p_con, p_pv = breakeven_tariffs(E, I, P_PV, P_GRID_CON, P_GRID_DEL)
+    expected = np.array([reference(e, i, P_PV, P_GRID_CON, P_GRID_DEL) for e, i in zip(E_list, I_list)])
+    assert np.allclose(p_con, expected[:, 0]) and np.allclose(p_pv, expected[:, 1]), "results differ from reference"
+
+    scalar = best_of(lambda: breakeven_tariffs(1.3, 0.7, P_PV, P_GRID_CON, P_GRID_DEL), args.repeat, 10_000)
+    scalar_ref = best_of(lambda: reference(1.3, 0.7, P_PV, P_GRID_CON, P_GRID_DEL), args.repeat, 10_000)
+    loop = best_of(
+        lambda: [reference(e, i, P_PV, P_GRID_CON, P_GRID_DEL) for e, i in zip(E_list, I_list)], args.repeat, 1
+    )
+    vector = best_of(lambda: breakeven_tariffs(E, I, P_PV, P_GRID_CON, P_GRID_DEL), args.repeat, 1)
+
+    scenarios = np.column_stack([
+        np.linspace(10, 25, args.scenarios), np.full(args.scenarios, P_GRID_CON), np.full(args.scenarios, P_GRID_DEL)
+    ])
+    size_broadcast = max(1, args.size // args.scenarios)
+    E_b, I_b = E[:size_broadcast], I[:size_broadcast]
+
+    def broadcast():
+        return breakeven_tariffs(E_b, I_b, scenarios[:, 0:1], scenarios[:, 1:2], scenarios[:, 2:3])
+
+    broadcast_time = best_of(broadcast, args.repeat, 1)
+
+    print(f"{'case':<34} {'time':>12} {'per element':>12} {'peak MiB':>9}")
+    print(f"{'scalar call':<34} {scalar * 1e6:>10.2f}us {'':>12} {'':>9}")
+    print(f"{'scalar reference (pure Python)':<34} {scalar_ref * 1e6:>10.2f}us {'':>12} {'':>9}")
+    print(f"{f'reference loop ({args.size})':<34} {loop * 1e3:>10.1f}ms "
+          f"{loop / args.size * 1e9:>10.1f}ns {'':>9}")
+    print(f"{f'vectorized ({args.size})':<34} {vector * 1e3:>10.1f}ms "
+          f"{vector / args.size * 1e9:>10.1f}ns "
+          f"{peak_memory(lambda: breakeven_tariffs(E, I, P_PV, P_GRID_CON, P_GRID_DEL)) / 2**20:>9.1f}")
+    print(f"{f'broadcast ({args.scenarios} x {size_broadcast})':<34} {broadcast_time * 1e3:>10.1f}ms "
+          f"{broadcast_time / (args.scenarios * size_broadcast) * 1e9:>10.1f}ns "
+          f"{peak_memory(broadcast) / 2**20:>9.1f}")
+    print(f"speedup vectorized vs loop: {loop / vector:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the line-protocol encoder against influxdb_client Points.
+
+Encodes collector-shaped intervals (one house_energy record per house and
+one community_energy record) into the payload sent to InfluxDB, once the
+way InfluxStore used to (a Point per record, serialized by the client) and
+once with LineProtocolEncoder, cold (empty prefix cache) and warm. Both
+payloads are checked to be identical before timing.
+
+Usage:
+    python bench_lineprotocol.py
+    python bench_lineprotocol.py --houses 5 50 500 5000
+"""
+
+import argparse
+import timeit
+from datetime import UTC, datetime
+
+from bench_timeseries import interval_records
+from influxdb_client import Point
+from lineprotocol import LineProtocolEncoder
+
+
+def point_payload(records) -> bytes:
+    """The previous InfluxStore.write path: one Point per record, serialized by the client."""
+    points = []
+    for record in records:
+        point = Point(record.measurement)
+        for key, value in record.tags.items():
+            point.tag(key, value)
+        for key, value in record.fields.items():
+            point.field(key, float(value))
+        if record.time is not None:
+            point.time(record.time)
+        points.append(point)
+    return "\n".join(point.to_line_protocol() for point in points).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark line-protocol encoding")
+    parser.add_argument("--houses", type=int, nargs="+", default=[5, 50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'houses':>7} {'Point':>12} {'encoder cold':>14} {'encoder warm':>14} {'speedup':>8}")
+    for houses in args.houses:
+        records = interval_records(houses, datetime.now(UTC))
+        encoder = LineProtocolEncoder()
+        if encoder.encode(records) != point_payload(records):
+            raise SystemExit(f"Payloads differ for {houses} houses")
+
+        number = max(1, 2000 // houses)
+        rates = []
+        for stmt in (lambda records=records: point_payload(records),
+                     lambda records=records: LineProtocolEncoder().encode(records),
+                     lambda records=records, encoder=encoder: encoder.encode(records)):
+            best = min(timeit.repeat(stmt, repeat=args.repeat, number=number)) / number
+            rates.append(len(records) / best)
+        print(f"{houses:>7} {rates[0]:>10,.0f}/s {rates[1]:>12,.0f}/s {rates[2]:>12,.0f}/s "
+              f"{rates[2] / rates[0]:>7.1f}x")
+    print("(points/s; one point per house plus the community point)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the embedded SQLite time-series store.
+
+Fills a temporary database with collector-shaped data (one house_energy
+record per house and one community_energy record per interval), then times
+a batched interval write and the invoicing UI's summary queries: 24 h sums
+per house, for the community and for one house, and the 1 h per-minute
+chart series. Compare with the same endpoints against InfluxDB to decide
+on a backend.
+
+Usage:
+    python bench_timeseries.py
+    python bench_timeseries.py --houses 50 --days 7 --interval 10
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+from datetime import UTC, datetime, timedelta
+
+from timeseries import Record, SQLiteStore
+
+HOUSE_FIELDS = ("ei_kwh", "eo_kwh", "delta_ei_kwh", "delta_eo_kwh", "net_flow_kwh",
+                "value_consumption_ct", "value_pv_delivery_ct", "tariff_p_consumption", "tariff_p_pv_delivery")
+COMMUNITY_FIELDS = ("total_consumption_kwh", "total_production_kwh", "grid_import_kwh", "grid_export_kwh",
+                    "value_grid_import_ct", "value_grid_export_ct", "tariff_p_grid_consumption",
+                    "tariff_p_grid_delivery")
+
+
+def interval_records(houses: int, time: datetime) -> list[Record]:
+    records = [Record("house_energy", {name: 0.001 * h for name in HOUSE_FIELDS},
+                      tags={"house_id": str(h), "mac": f"AA-00-00-00-00-{h:02X}"}, time=time)
+               for h in range(1, houses + 1)]
+    records.append(Record("community_energy", {name: 0.01 for name in COMMUNITY_FIELDS}, time=time))
+    return records
+
+
+def best_of(stmt, repeat: int, number: int) -> float:
+    """Best time per call in seconds."""
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite time-series store")
+    parser.add_argument("--houses", type=int, default=5)
+    parser.add_argument("--days", type=float, default=2)
+    parser.add_argument("--interval", type=int, default=10, help="Collector interval in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStore(os.path.join(tmp, "bench.db"))
+        now = datetime.now(UTC)
+        intervals = int(args.days * 86400 / args.interval)
+        start = now - timedelta(seconds=intervals * args.interval)
+
+        fill_start = timeit.default_timer()
+        batch = []
+        for i in range(intervals):
+            batch.extend(interval_records(args.houses, start + timedelta(seconds=i * args.interval)))
+            if len(batch) >= 10_000:
+                store.write(batch)
+                batch = []
+        store.write(batch)
+        fill = timeit.default_timer() - fill_start
+        rows = store._connect().execute("SELECT COUNT(*) FROM points").fetchone()[0]
+        size_mib = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 2**20
+
+        day, hour = now - timedelta(hours=24), now - timedelta(hours=1)
+        cases = {
+            "interval write (1 batch)": lambda: store.write(interval_records(args.houses, datetime.now(UTC))),
+            "summary 24h (per house)": lambda: store.sum_fields("house_energy", day, by_house=True),
+            "community 24h": lambda: store.sum_fields("community_energy", day),
+            "house 24h": lambda: store.sum_fields("house_energy", day, house_id="1"),
+            "timeseries 1h (1 min windows)": lambda: store.window_sum("community_energy", "total_consumption_kwh",
+                                                                      hour, every_s=60),
+        }
+
+        print(f"{rows} rows ({intervals} intervals x {args.houses} houses), {size_mib:.1f} MiB, "
+              f"filled in {fill:.1f}s ({rows / fill:,.0f} rows/s)")
+        for name, stmt in cases.items():
+            print(f"{name:<32} {best_of(stmt, args.repeat, 3) * 1e3:>9.2f}ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
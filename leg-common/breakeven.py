@@ -0,0 +1,78 @@
+"""
+Break-even pricing for LEG communities.
+
+Single implementation of the break-even rules used by the simulator, the
+collector, the invoicing UI and the what-if re-pricing. E (house exports to
+the community) and I (house imports from the community) may be scalars or
+NumPy arrays, and so may the tariffs; all inputs broadcast together.
+
+    SURPLUS (E >= I):  p_con = p_grid_del + (E/I) * (p_pv - p_grid_del)
+                       capped at p_grid_con; when capped the PV payout is
+                       reduced to (I * p_grid_con + (E - I) * p_grid_del) / E
+    DEFICIT (E < I):   p_con = p_grid_con + (E/I) * (p_pv - p_grid_con)
+    NO CONSUMPTION:    p_con = p_grid_con, PV payout = p_pv
+
+With these prices the community's profit is zero in every case where
+houses consume (I > 0).
+"""
+
+import numpy as np
+
+NO_CONSUMPTION = "no_consumption"
+SURPLUS = "surplus"
+SURPLUS_CAPPED = "surplus_capped"
+DEFICIT = "deficit"
+
+
+def breakeven_tariffs(E, I, p_pv, p_grid_con, p_grid_del):
+    """
+    Break-even house consumption price and effective PV payout.
+
+    Returns (p_con, p_pv_effective) in ct/kWh: floats for scalar inputs,
+    otherwise arrays of the broadcast shape of all arguments.
+    """
+    if all(isinstance(x, (int, float)) for x in (E, I, p_pv, p_grid_con, p_grid_del)):
+        return _breakeven_scalar(float(E), float(I), float(p_pv), float(p_grid_con), float(p_grid_del))
+
+    E = np.asarray(E, dtype=np.float64)
+    I = np.asarray(I, dtype=np.float64)
+
+    has_consumption = I > 0
+    ratio = np.divide(E, I, out=np.zeros(np.broadcast(E, I).shape), where=has_consumption)
+    surplus = E >= I
+
+    p_con_surplus = p_grid_del + ratio * (p_pv - p_grid_del)
+    p_con_deficit = p_grid_con + ratio * (p_pv - p_grid_con)
+    capped = surplus & has_consumption & (p_con_surplus > p_grid_con)
+
+    p_con = np.where(surplus, np.minimum(p_con_surplus, p_grid_con), p_con_deficit)
+    p_con = np.where(has_consumption, p_con, p_grid_con)
+
+    safe_E = np.where(E > 0, E, 1.0)
+    p_pv_capped = (I * p_grid_con + (E - I) * p_grid_del) / safe_E
+    p_pv_effective = np.where(capped, p_pv_capped, p_pv)
+
+    return p_con, np.broadcast_to(p_pv_effective, p_con.shape)
+
+
+def _breakeven_scalar(E: float, I: float, p_pv: float, p_grid_con: float, p_grid_del: float):
+    """Same rules for single values without array overhead (live per-interval path)."""
+    if I <= 0:
+        return p_grid_con, p_pv
+    if E >= I:
+        p_con = p_grid_del + (E / I) * (p_pv - p_grid_del)
+        if p_con > p_grid_con:
+            return p_grid_con, (I * p_grid_con + (E - I) * p_grid_del) / E
+        return p_con, p_pv
+    return p_grid_con + (E / I) * (p_pv - p_grid_con), p_pv
+
+
+def breakeven_mode(E: float, I: float, p_pv: float, p_grid_con: float, p_grid_del: float) -> str:
+    """Which rule applies to a scalar E/I: NO_CONSUMPTION, SURPLUS, SURPLUS_CAPPED or DEFICIT."""
+    if I <= 0:
+        return NO_CONSUMPTION
+    if E < I:
+        return DEFICIT
+    if p_grid_del + (E / I) * (p_pv - p_grid_del) > p_grid_con:
+        return SURPLUS_CAPPED
+    return SURPLUS
@@ -0,0 +1,87 @@
+"""
+InfluxDB line-protocol encoder for LEG Records.
+
+Encodes a batch of Records straight into one line-protocol payload instead
+of building an influxdb_client Point per record. The escaped
+"measurement,tag=value,... " prefix of every series (one per house MAC) and
+the escaped, sorted field keys are computed once and cached, so encoding a
+row only formats its values and timestamp.
+
+The output is byte-for-byte what Point.to_line_protocol() produces: tags
+and fields sorted by key, fields written as floats without a trailing
+".0", None and non-finite fields skipped, timestamps in nanoseconds.
+"""
+
+import math
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+
+from timeseries import Record
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_NS = timedelta(microseconds=1)
+
+_ESCAPE_MEASUREMENT = str.maketrans({",": r"\,", " ": r"\ ", "\n": r"\n", "\t": r"\t", "\r": r"\r"})
+_ESCAPE_KEY = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ ", "\n": r"\n", "\t": r"\t", "\r": r"\r"})
+
+
+def _escape_tag_value(value) -> str:
+    escaped = str(value).translate(_ESCAPE_KEY)
+    return escaped + " " if escaped.endswith("\\") else escaped
+
+
+def timestamp_ns(time: datetime) -> int:
+    """Nanoseconds since the epoch (naive datetimes are taken as UTC)."""
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=UTC)
+    return (time - EPOCH) // _NS * 1000
+
+
+class LineProtocolEncoder:
+    """Batch encoder with cached series prefixes and field keys."""
+
+    def __init__(self) -> None:
+        self._prefixes: dict[tuple, str] = {}
+        self._field_keys: dict[tuple, list[tuple[str, str]]] = {}
+
+    def prefix(self, measurement: str, tags: dict[str, str]) -> str:
+        """Escaped "measurement,tag=value,... " of a series, cached per measurement and tags."""
+        key = (measurement, *tags.items())
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            parts = [measurement.translate(_ESCAPE_MEASUREMENT)]
+            for name, value in sorted(tags.items()):
+                if value is None:
+                    continue
+                name, value = str(name).translate(_ESCAPE_KEY), _escape_tag_value(value)
+                if name and value:
+                    parts.append(f"{name}={value}")
+            prefix = self._prefixes[key] = ",".join(parts) + " "
+        return prefix
+
+    def field_keys(self, names: tuple) -> list[tuple[str, str]]:
+        """(name, escaped "name=") pairs sorted by name, cached per field set."""
+        keys = self._field_keys.get(names)
+        if keys is None:
+            keys = self._field_keys[names] = [(name, f"{str(name).translate(_ESCAPE_KEY)}=") for name in sorted(names)]
+        return keys
+
+    def encode(self, records: Iterable[Record]) -> bytes:
+        """One newline-separated line-protocol payload; records without finite fields are left out."""
+        lines = []
+        for record in records:
+            fields = record.fields
+            values = []
+            for name, key in self.field_keys(tuple(fields)):
+                value = fields[name]
+                if value is None or not math.isfinite(value := float(value)):
+                    continue
+                text = repr(value)
+                values.append(key + text.removesuffix(".0"))
+            if not values:
+                continue
+            line = self.prefix(record.measurement, record.tags) + ",".join(values)
+            if record.time is not None:
+                line += f" {timestamp_ns(record.time)}"
+            lines.append(line)
+        return "\n".join(lines).encode()
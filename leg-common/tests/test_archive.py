@@ -0,0 +1,103 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from archive import ParquetArchive, TieredStore, month_bounds, months_between
+from timeseries import Record, SQLiteStore
+
+JAN = datetime(2026, 1, 1, tzinfo=UTC)
+FEB = datetime(2026, 2, 1, tzinfo=UTC)
+MAR = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def hot(tmp_path):
+    store = SQLiteStore(str(tmp_path / "leg.db"))
+    # Every 6 h from Jan to the start of March; a field appears mid-January
+    time = JAN
+    while time < MAR:
+        fields = {"ei_kwh": 1.0, "eo_kwh": 0.5}
+        if time >= JAN + timedelta(days=10):
+            fields["delta_ei_kwh"] = 0.25
+        store.write([Record("house_energy", fields, {"house_id": str(h)}, time) for h in (1, 2, 10)])
+        time += timedelta(hours=6)
+    yield store
+    store.close()
+
+
+def archive_month(store, archive, month):
+    """What archiver.py does: copy day by day with the month's full field set, commit, delete."""
+    start, stop = month_bounds(month)
+    writer = archive.month_writer("house_energy", month, store.field_names("house_energy", start, stop))
+    day = start
+    while day < stop:
+        writer.write(store.read_columns("house_energy", day, day + timedelta(days=1)))
+        day += timedelta(days=1)
+    writer.commit()
+    store.delete_range("house_energy", start, stop)
+    return writer.rows
+
+
+def test_month_helpers():
+    assert month_bounds("2025-12") == (datetime(2025, 12, 1, tzinfo=UTC), JAN)
+    assert months_between(JAN + timedelta(days=20), MAR + timedelta(days=1)) == ["2026-01", "2026-02", "2026-03"]
+
+
+def test_tiered_reads_match_before_archiving(hot, tmp_path):
+    query = (JAN + timedelta(days=3, hours=5), MAR)
+    before = hot.sum_fields("house_energy", *query, by_house=True)
+    houses_before = hot.house_ids("house_energy", *query)
+    windows_before = hot.window_sum("house_energy", "ei_kwh", JAN, MAR, every_s=86400, house_id="2")
+
+    archive = ParquetArchive(str(tmp_path / "archive"))
+    assert archive_month(hot, archive, "2026-01") == 31 * 4 * 3
+    assert archive.archived_until("house_energy") == FEB
+    assert hot.first_time("house_energy") == FEB
+
+    tiered = TieredStore(hot, archive)
+    after = tiered.sum_fields("house_energy", *query, by_house=True)
+    assert after.keys() == before.keys()
+    for house, sums in before.items():
+        assert after[house] == pytest.approx(sums)
+    assert tiered.house_ids("house_energy", *query) == houses_before == ["1", "2", "10"]
+    windows_after = tiered.window_sum("house_energy", "ei_kwh", JAN, MAR, every_s=86400, house_id="2")
+    assert [t for t, _ in windows_after] == [t for t, _ in windows_before]
+    assert [v for _, v in windows_after] == pytest.approx([v for _, v in windows_before])
+
+
+def test_late_fields_are_archived(hot, tmp_path):
+    archive = ParquetArchive(str(tmp_path / "archive"))
+    archive_month(hot, archive, "2026-01")
+    sums = archive.sum_fields("house_energy", JAN, FEB, house_id="1")
+    assert sums["delta_ei_kwh"] == pytest.approx(0.25 * 4 * 21)
+
+
+def test_unknown_field_raises_and_abort_keeps_nothing(hot, tmp_path):
+    archive = ParquetArchive(str(tmp_path / "archive"))
+    writer = archive.month_writer("house_energy", "2026-01")
+    writer.write(hot.read_columns("house_energy", JAN, JAN + timedelta(days=1)))
+    with pytest.raises(ValueError, match="delta_ei_kwh"):
+        writer.write(hot.read_columns("house_energy", JAN + timedelta(days=12), JAN + timedelta(days=13)))
+    writer.abort()
+    assert archive.archived_until("house_energy") is None
+    assert archive.months("house_energy") == []
+
+
+def test_read_columns_across_boundary(hot, tmp_path):
+    archive = ParquetArchive(str(tmp_path / "archive"))
+    archive_month(hot, archive, "2026-01")
+    tiered = TieredStore(hot, archive)
+    columns = tiered.read_columns("house_energy", FEB - timedelta(days=1), FEB + timedelta(days=1), ["ei_kwh"])
+    assert set(columns) == {"time", "house_id", "ei_kwh"}
+    assert len(columns["time"]) == 2 * 4 * 3
+    times = sorted(set(columns["time"]))
+    assert times[0] == int((FEB - timedelta(days=1)).timestamp() * 1000)
+    assert times[-1] == int((FEB + timedelta(hours=18)).timestamp() * 1000)
+
+
+def test_manifest_boundary_needs_contiguous_months(tmp_path):
+    archive = ParquetArchive(str(tmp_path / "archive"))
+    archive._commit_month("house_energy", "2026-01")
+    archive._commit_month("house_energy", "2026-03")
+    assert archive.archived_until("house_energy") == FEB
+    archive._commit_month("house_energy", "2026-02")
+    assert archive.archived_until("house_energy") == datetime(2026, 4, 1, tzinfo=UTC)
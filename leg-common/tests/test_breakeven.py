@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from breakeven import (
+    DEFICIT,
+    NO_CONSUMPTION,
+    SURPLUS,
+    SURPLUS_CAPPED,
+    breakeven_mode,
+    breakeven_tariffs,
+)
+
+PRICES = (20.0, 30.0, 6.0)  # p_pv, p_grid_con, p_grid_del
+
+
+@pytest.mark.parametrize("E, I, mode", [
+    (0.0, 0.0, NO_CONSUMPTION),
+    (5.0, 0.0, NO_CONSUMPTION),
+    (1.0, 4.0, DEFICIT),
+    (4.0, 4.0, SURPLUS),
+    (5.0, 4.0, SURPLUS),
+    (40.0, 1.0, SURPLUS_CAPPED),
+])
+def test_modes(E, I, mode):
+    assert breakeven_mode(E, I, *PRICES) == mode
+
+
+@pytest.mark.parametrize("E, I", [(0.0, 0.0), (5.0, 0.0), (1.0, 4.0), (4.0, 4.0), (5.0, 4.0), (40.0, 1.0)])
+def test_community_profit_is_zero(E, I):
+    p_pv, p_grid_con, p_grid_del = PRICES
+    p_con, p_pv_eff = breakeven_tariffs(E, I, *PRICES)
+    if I == 0:
+        assert (p_con, p_pv_eff) == (p_grid_con, p_pv)
+        return
+    grid_import, grid_export = max(I - E, 0.0), max(E - I, 0.0)
+    profit = p_con * I + grid_export * p_grid_del - p_pv_eff * E - grid_import * p_grid_con
+    assert profit == pytest.approx(0.0, abs=1e-9)
+
+
+def test_capped_surplus_never_exceeds_grid_price():
+    p_con, p_pv_eff = breakeven_tariffs(40.0, 1.0, *PRICES)
+    assert p_con == 30.0
+    assert p_pv_eff < 20.0
+
+
+def test_vectorised_matches_scalar():
+    rng = np.random.default_rng(0)
+    E = rng.uniform(0, 5, 500)
+    I = rng.uniform(0, 5, 500)
+    E[:20] = 0.0
+    I[20:40] = 0.0
+    E[40:60] = I[40:60]
+    p_con, p_pv_eff = breakeven_tariffs(E, I, *PRICES)
+    expected = np.array([breakeven_tariffs(float(e), float(i), *PRICES) for e, i in zip(E, I)])
+    np.testing.assert_allclose(p_con, expected[:, 0])
+    np.testing.assert_allclose(p_pv_eff, expected[:, 1])
+
+
+def test_tariff_arrays_broadcast():
+    p_pv = np.array([10.0, 20.0, 25.0])
+    p_con, p_pv_eff = breakeven_tariffs(np.array([2.0]), np.array([4.0]), p_pv, 30.0, 6.0)
+    assert p_con.shape == p_pv_eff.shape == (3,)
+    for k, price in enumerate(p_pv):
+        assert p_con[k] == pytest.approx(breakeven_tariffs(2.0, 4.0, float(price), 30.0, 6.0)[0])
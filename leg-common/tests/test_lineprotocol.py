@@ -0,0 +1,53 @@
+import math
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from lineprotocol import LineProtocolEncoder, timestamp_ns
+from timeseries import Record
+
+influxdb_client = pytest.importorskip("influxdb_client")
+
+T0 = datetime(2026, 1, 15, 12, 0, 0, 123456, tzinfo=UTC)
+
+
+def point_line(record: Record) -> str:
+    point = influxdb_client.Point(record.measurement)
+    for key, value in record.tags.items():
+        point.tag(key, value)
+    for key, value in record.fields.items():
+        point.field(key, float(value))
+    if record.time is not None:
+        point.time(record.time)
+    return point.to_line_protocol()
+
+
+@pytest.mark.parametrize("record", [
+    Record("house_energy", {"ei_kwh": 1.0, "eo_kwh": 0.25}, {"house_id": "7", "mac": "B0-81-84-25-22-5C"}, T0),
+    Record("community_energy", {"grid_import_kwh": 12, "total_production_kwh": 1e-7}, time=T0),
+    Record("house energy", {"field,with=chars": -3.5}, {"tag key": "value with, comma=", "z": "a\\"}, T0),
+    Record("house_energy", {"b": 2.0, "a": 1.0}, {"mac": "x", "house_id": "1"}, T0 - timedelta(days=400)),
+    Record("house_energy", {"ei_kwh": 123456789.123}, {"house_id": "2"}, None),
+])
+def test_matches_point(record):
+    assert LineProtocolEncoder().encode([record]).decode() == point_line(record)
+
+
+def test_skips_non_finite_and_empty_records():
+    records = [
+        Record("house_energy", {"a": math.nan, "b": 1.5, "c": None}, {"house_id": "1"}, T0),
+        Record("house_energy", {"a": math.inf}, {"house_id": "2"}, T0),
+    ]
+    assert LineProtocolEncoder().encode(records) == f"house_energy,house_id=1 b=1.5 {timestamp_ns(T0)}".encode()
+
+
+def test_cache_does_not_change_output():
+    encoder = LineProtocolEncoder()
+    batch = [Record("house_energy", {"ei_kwh": float(h)}, {"house_id": str(h)}, T0) for h in range(1, 4)]
+    first = encoder.encode(batch)
+    assert encoder.encode(batch) == first == LineProtocolEncoder().encode(batch)
+    assert first.count(b"\n") == 2
+
+
+def test_timestamp_ns_naive_is_utc():
+    assert timestamp_ns(T0.replace(tzinfo=None)) == timestamp_ns(T0)
+    assert timestamp_ns(datetime(1970, 1, 1, 0, 0, 1, tzinfo=UTC)) == 1_000_000_000
@@ -0,0 +1,147 @@
+import asyncio
+import sqlite3
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from timeseries import NO_HOUSE_ID, Record, SQLiteStore, create_store
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+INTERVAL = timedelta(minutes=10)
+
+
+def fill(store, houses=3, hours=5):
+    """house_energy every 10 min: house h delivers h Wh per interval; community totals alongside."""
+    steps = int(hours * 3600 / INTERVAL.total_seconds())
+    for step in range(steps):
+        time = T0 + step * INTERVAL
+        records = [Record("house_energy", {"ei_kwh": 0.001 * h, "eo_kwh": 0.002},
+                          {"house_id": str(h), "mac": f"AA-{h:02X}"}, time)
+                   for h in range(1, houses + 1)]
+        records.append(Record("community_energy", {"grid_import_kwh": 0.5}, time=time))
+        store.write(records)
+    return steps
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "leg.db"))
+    yield store
+    store.close()
+
+
+def raw_sums(store, measurement, start, stop):
+    """Field sums straight from the raw rows, bypassing the rollup."""
+    rows = store._connect().execute(
+        "SELECT house_id, field, SUM(value) FROM points WHERE measurement = ? AND time >= ? AND time < ? "
+        "GROUP BY house_id, field", (measurement, store._ms(start), store._ms(stop)))
+    result = {}
+    for house, name, total in rows:
+        result.setdefault(house, {})[name] = total
+    return result
+
+
+def assert_sums_equal(sums, expected):
+    assert sums.keys() == expected.keys()
+    for house, fields in expected.items():
+        assert sums[house] == pytest.approx(fields)
+
+
+def test_sums_by_house(store):
+    steps = fill(store)
+    sums = store.sum_fields("house_energy", T0, T0 + timedelta(hours=5), by_house=True)
+    assert set(sums) == {"1", "2", "3"}
+    assert sums["2"]["ei_kwh"] == pytest.approx(0.002 * steps)
+    total = store.sum_fields("house_energy", T0, T0 + timedelta(hours=5))
+    assert total["eo_kwh"] == pytest.approx(0.002 * steps * 3)
+
+
+@pytest.mark.parametrize("start_min, stop_min", [(0, 300), (5, 295), (25, 185), (70, 110), (61, 62)])
+def test_rollup_matches_raw_rows(store, start_min, stop_min):
+    fill(store)
+    start, stop = T0 + timedelta(minutes=start_min), T0 + timedelta(minutes=stop_min)
+    assert_sums_equal(store.sum_fields("house_energy", start, stop, by_house=True),
+                      raw_sums(store, "house_energy", start, stop))
+
+
+def test_field_and_house_filters(store):
+    fill(store)
+    stop = T0 + timedelta(hours=5)
+    sums = store.sum_fields("house_energy", T0, stop, by_house=True, fields=["ei_kwh"], house_ids=["1", "3"])
+    assert set(sums) == {"1", "3"}
+    assert all(set(fields) == {"ei_kwh"} for fields in sums.values())
+    assert store.sum_fields("house_energy", T0, stop, house_ids=[]) == {}
+    assert set(store.sum_fields("house_energy", T0, stop, house_id="2")) == {"ei_kwh", "eo_kwh"}
+
+
+def test_overwrite_keeps_rollup_consistent(store):
+    record = Record("house_energy", {"ei_kwh": 1.0}, {"house_id": "1"}, T0)
+    store.write([record])
+    store.write([Record("house_energy", {"ei_kwh": 4.0}, {"house_id": "1"}, T0)])
+    assert store.sum_fields("house_energy", T0, T0 + timedelta(hours=2)) == {"ei_kwh": 4.0}
+
+
+def test_delete_range_updates_rollup(store):
+    fill(store)
+    store.delete_range("house_energy", T0, T0 + timedelta(hours=2))
+    assert store.sum_fields("house_energy", T0, T0 + timedelta(hours=2)) == {}
+    assert store.first_time("house_energy") == T0 + timedelta(hours=2)
+    assert_sums_equal(store.sum_fields("house_energy", T0, T0 + timedelta(hours=5), by_house=True),
+                      raw_sums(store, "house_energy", T0, T0 + timedelta(hours=5)))
+
+
+def test_window_sum(store):
+    fill(store, houses=2, hours=1)
+    windows = store.window_sum("house_energy", "ei_kwh", T0, T0 + timedelta(hours=1), every_s=1800)
+    assert [time for time, _ in windows] == [T0 + timedelta(minutes=30), T0 + timedelta(minutes=60)]
+    assert windows[0][1] == pytest.approx(3 * 0.003)
+    one_house = store.window_sum("house_energy", "ei_kwh", T0, T0 + timedelta(hours=1), 3600, house_id="2")
+    assert one_house[0][1] == pytest.approx(6 * 0.002)
+
+
+def test_read_columns_and_listings(store):
+    fill(store, houses=2, hours=1)
+    columns = store.read_columns("house_energy", T0, T0 + timedelta(minutes=20), fields=["ei_kwh"])
+    assert set(columns) == {"time", "house_id", "ei_kwh"}
+    assert columns["house_id"] == ["1", "1", "2", "2"]
+    assert columns["time"][:2] == [store._ms(T0), store._ms(T0 + INTERVAL)]
+    assert store.house_ids("house_energy", T0) == ["1", "2"]
+    assert store.field_names("house_energy", T0) == ["ei_kwh", "eo_kwh"]
+
+
+def test_community_rows_without_house_id(store):
+    fill(store, houses=1, hours=1)
+    sums = store.sum_fields("community_energy", T0, T0 + timedelta(hours=1), by_house=True)
+    assert set(sums) == {NO_HOUSE_ID}
+    assert set(store.read_columns("community_energy", T0, T0 + timedelta(hours=1))["house_id"]) == {NO_HOUSE_ID}
+
+
+def test_migrates_empty_house_ids(tmp_path):
+    path = str(tmp_path / "old.db")
+    SQLiteStore(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO points VALUES ('community_energy', '', ?, 'grid_import_kwh', 1.0)",
+                 (int(T0.timestamp() * 1000),))
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    store = SQLiteStore(path)
+    assert store.sum_fields("community_energy", T0, T0 + timedelta(hours=1), by_house=True) == {
+        NO_HOUSE_ID: {"grid_import_kwh": 1.0}}
+    store.close()
+
+
+def test_write_async(store):
+    async def run():
+        await store.write_async([Record("house_energy", {"ei_kwh": 1.0}, {"house_id": "1"}, T0)])
+        await store.aclose()
+    asyncio.run(run())
+    assert store.sum_fields("house_energy", T0, T0 + timedelta(minutes=1)) == {"ei_kwh": 1.0}
+
+
+def test_create_store(tmp_path):
+    store = create_store({"storage": {"backend": "sqlite", "path": "x.db"}}, str(tmp_path))
+    assert isinstance(store, SQLiteStore)
+    assert store.health()["status"] == "pass"
+    store.close()
+    with pytest.raises(ValueError):
+        create_store({"storage": {"backend": "csv"}}, str(tmp_path))
@@ -0,0 +1,528 @@
+"""
+Time-series storage for LEG energy data.
+
+One small interface over two backends, chosen with the `storage.backend`
+config key:
+
+- InfluxStore ("influxdb", default): the existing InfluxDB bucket.
+- SQLiteStore ("sqlite"): embedded SQLite file in WAL mode, for edge boxes,
+  small communities and tests without an InfluxDB server.
+
+Both take batches of Records (measurement, tags, fields, time) and answer
+the queries the collector, the invoicing UI and the invoicing CLIs need:
+field sums over a time range (total, per house, for one house or a shard of
+houses, optionally limited to some fields), windowed sums of one field, the
+houses and field names with data in a range and raw records in column form. Only the
+house_id tag is queryable; other tags (e.g. mac) are kept but not indexed by
+the SQLite backend. Records without a house_id (community_energy) are
+reported with house_id NO_HOUSE_ID by both backends.
+
+Writers running on an asyncio event loop (the collector) use write_async()
+and aclose(): InfluxDB through the async client, SQLite on a dedicated
+writer thread.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+# Bucket size of the SQLite hourly rollup (ms)
+ROLLUP_MS = 3600 * 1000
+
+# house_id of records without one (community_energy)
+NO_HOUSE_ID = "unknown"
+
+# SQLite schema version (PRAGMA user_version); 1 = NO_HOUSE_ID instead of ""
+SQLITE_SCHEMA_VERSION = 1
+
+
+@dataclass
+class Record:
+    measurement: str
+    fields: dict[str, float]
+    tags: dict[str, str] = field(default_factory=dict)
+    time: datetime | None = None  # None = now
+
+
+def _utc(time: datetime | None) -> datetime:
+    if time is None:
+        return datetime.now(UTC)
+    return time if time.tzinfo else time.replace(tzinfo=UTC)
+
+
+class InfluxStore:
+    """Records in an InfluxDB 2.x bucket; sums and windows run as Flux queries."""
+
+    backend = "influxdb"
+
+    def __init__(self, url: str, token: str, org: str, bucket: str) -> None:
+        from influxdb_client import InfluxDBClient
+        from influxdb_client.client.write_api import SYNCHRONOUS
+        from lineprotocol import LineProtocolEncoder
+
+        self.url, self.token, self.org = url, token, org
+        self.bucket = bucket
+        self.client = InfluxDBClient(url=url, token=token, org=org, verify_ssl=False)
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+        self.query_api = self.client.query_api()
+        # Series prefixes (one per house) are escaped once and reused every interval
+        self.encoder = LineProtocolEncoder()
+        self._async_client = None   # created on first write_async(), inside the event loop
+
+    def write(self, records: list[Record]) -> None:
+        """Write the batch as one line-protocol payload (nanosecond timestamps)."""
+        payload = self.encoder.encode(records)
+        if payload:
+            self.write_api.write(bucket=self.bucket, record=payload)
+
+    async def write_async(self, records: list[Record]) -> None:
+        """write() for asyncio callers, through InfluxDBClientAsync (needs influxdb-client[async])."""
+        payload = self.encoder.encode(records)
+        if not payload:
+            return
+        if self._async_client is None:
+            from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+
+            self._async_client = InfluxDBClientAsync(url=self.url, token=self.token, org=self.org,
+                                                     verify_ssl=False)
+        await self._async_client.write_api().write(bucket=self.bucket, record=payload)
+
+    def _range(self, measurement: str, start: datetime, stop: datetime | None,
+               house_id: str | None, house_ids: list[str] | None = None,
+               fields: list[str] | None = None) -> str:
+        stop_arg = f", stop: {_utc(stop).isoformat()}" if stop else ""
+        query = f'''
+        from(bucket: "{self.bucket}")
+          |> range(start: {_utc(start).isoformat()}{stop_arg})
+          |> filter(fn: (r) => r._measurement == "{measurement}")'''
+        if fields is not None:
+            predicate = " or ".join(f'r._field == "{name}"' for name in fields)
+            query += f'''
+          |> filter(fn: (r) => {predicate})'''
+        if house_id is not None:
+            query += f'''
+          |> filter(fn: (r) => r.house_id == "{house_id}")'''
+        if house_ids is not None:
+            pattern = "|".join(re.escape(str(h)) for h in house_ids)
+            query += f'''
+          |> filter(fn: (r) => r.house_id =~ /^({pattern})$/)'''
+        return query
+
+    def house_ids(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        """house_id tag values with data in the range, in id order."""
+        stop_arg = f", stop: {_utc(stop).isoformat()}" if stop else ""
+        query = f'''
+        import "influxdata/influxdb/schema"
+        schema.tagValues(
+          bucket: "{self.bucket}",
+          tag: "house_id",
+          predicate: (r) => r._measurement == "{measurement}",
+          start: {_utc(start).isoformat()}{stop_arg}
+        )
+        '''
+        return sorted((str(record.get_value()) for record in self.query_api.query_stream(query)),
+                      key=lambda h: (len(h), h))
+
+    def field_names(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        """Field keys with data in the range, sorted."""
+        stop_arg = f", stop: {_utc(stop).isoformat()}" if stop else ""
+        query = f'''
+        import "influxdata/influxdb/schema"
+        schema.fieldKeys(
+          bucket: "{self.bucket}",
+          predicate: (r) => r._measurement == "{measurement}",
+          start: {_utc(start).isoformat()}{stop_arg}
+        )
+        '''
+        return sorted(str(record.get_value()) for record in self.query_api.query_stream(query))
+
+    def sum_fields(self, measurement: str, start: datetime, stop: datetime | None = None,
+                   house_id: str | None = None, by_house: bool = False,
+                   fields: list[str] | None = None, house_ids: list[str] | None = None) -> dict:
+        """
+        Field sums: {field: total}, or {house_id: {field: total}} with by_house.
+        fields limits the summed fields, house_ids the houses (a settlement shard).
+        """
+        if house_ids is not None and not house_ids:
+            return {}
+        columns = '["house_id", "_field"]' if by_house else '["_field"]'
+        query = self._range(measurement, start, stop, house_id, house_ids, fields) + f'''
+          |> group(columns: {columns})
+          |> sum()
+        '''
+        result: dict = {}
+        for record in self.query_api.query_stream(query):
+            target = result.setdefault(record.values.get("house_id", NO_HOUSE_ID), {}) if by_house else result
+            target[record.get_field()] = float(record.get_value() or 0.0)
+        return result
+
+    def window_sum(self, measurement: str, field: str, start: datetime, stop: datetime | None = None,
+                   every_s: int = 60, house_id: str | None = None) -> list[tuple[datetime, float]]:
+        """Sums of one field per window, labelled with the window end time; empty windows omitted."""
+        query = self._range(measurement, start, stop, house_id) + f'''
+          |> filter(fn: (r) => r._field == "{field}")
+          |> group(columns: ["_field"])
+          |> aggregateWindow(every: {every_s}s, fn: sum, createEmpty: false)
+        '''
+        return [(record.get_time(), record.get_value() or 0.0)
+                for table in self.query_api.query(query) for record in table.records]
+
+    def read_columns(self, measurement: str, start: datetime, stop: datetime,
+                     fields: list[str] | None = None) -> dict[str, list]:
+        """Records of the range in column form: time (ms), house_id and one list per field (all or `fields`)."""
+        query = self._range(measurement, start, stop, None, fields=fields) + '''
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> group()
+          |> sort(columns: ["house_id", "_time"])
+        '''
+        rows = []
+        fields: set[str] = set()
+        for record in self.query_api.query_stream(query):
+            values = {key: value for key, value in record.values.items()
+                      if not key.startswith("_") and key not in ("result", "table", "house_id", "mac")}
+            fields.update(values)
+            rows.append((int(record.get_time().timestamp() * 1000), str(record.values.get("house_id", NO_HOUSE_ID)), values))
+        return {
+            "time": [row[0] for row in rows],
+            "house_id": [row[1] for row in rows],
+            **{name: [row[2].get(name) for row in rows] for name in sorted(fields)},
+        }
+
+    def first_time(self, measurement: str) -> datetime | None:
+        """Time of the oldest record of the measurement, None if there is none."""
+        query = f'''
+        from(bucket: "{self.bucket}")
+          |> range(start: 0)
+          |> filter(fn: (r) => r._measurement == "{measurement}")
+          |> keep(columns: ["_time"])
+          |> group()
+          |> min(column: "_time")
+        '''
+        for record in self.query_api.query_stream(query):
+            return record.get_time()
+        return None
+
+    def delete_range(self, measurement: str, start: datetime, stop: datetime) -> None:
+        self.client.delete_api().delete(
+            _utc(start), _utc(stop), f'_measurement="{measurement}"', bucket=self.bucket
+        )
+
+    def health(self) -> dict:
+        health = self.client.health()
+        return {"backend": self.backend, "status": health.status, "version": health.version}
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        self.close()
+
+
+class SQLiteStore:
+    """
+    Records in a local SQLite database (WAL), one row per field value.
+
+    The table is clustered on (measurement, house_id, time, field), which
+    covers per-house range queries; a second covering index on
+    (measurement, time) serves range queries over all houses. Triggers keep
+    hourly sums per series and field in `rollup`, so field sums read whole
+    hours from the rollup and only the partial hours at the range edges
+    from the raw rows.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._writer: ThreadPoolExecutor | None = None   # for write_async()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS points (
+                    measurement TEXT NOT NULL,
+                    house_id TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    field TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (measurement, house_id, time, field)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS points_measurement_time
+                ON points (measurement, time, house_id, field, value)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollup (
+                    measurement TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    house_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (measurement, bucket, house_id, field)
+                ) WITHOUT ROWID
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS points_rollup_insert AFTER INSERT ON points BEGIN
+                    INSERT INTO rollup VALUES (new.measurement, new.time - new.time % {ROLLUP_MS},
+                                               new.house_id, new.field, new.value)
+                    ON CONFLICT DO UPDATE SET value = value + excluded.value;
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS points_rollup_update AFTER UPDATE OF value ON points BEGIN
+                    UPDATE rollup SET value = value + new.value - old.value
+                    WHERE measurement = new.measurement AND bucket = new.time - new.time % {ROLLUP_MS}
+                      AND house_id = new.house_id AND field = new.field;
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS points_rollup_delete AFTER DELETE ON points BEGIN
+                    UPDATE rollup SET value = value - old.value
+                    WHERE measurement = old.measurement AND bucket = old.time - old.time % {ROLLUP_MS}
+                      AND house_id = old.house_id AND field = old.field;
+                END
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series_tags (
+                    measurement TEXT NOT NULL,
+                    house_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (measurement, house_id, tag)
+                ) WITHOUT ROWID
+            """)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SQLITE_SCHEMA_VERSION:
+                # Databases written before NO_HOUSE_ID stored community rows with an empty house_id
+                for table in ("points", "rollup", "series_tags"):
+                    conn.execute(f"UPDATE {table} SET house_id = ? WHERE house_id = ''", (NO_HOUSE_ID,))
+                conn.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; Flask serves API requests from a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _ms(time: datetime | None) -> int:
+        return int(_utc(time).timestamp() * 1000)
+
+    def write(self, records: list[Record]) -> None:
+        """Insert a batch in one transaction; a repeated (series, time, field) overwrites like InfluxDB."""
+        now = self._ms(None)
+        rows = []
+        tags = []
+        for record in records:
+            house_id = record.tags.get("house_id", NO_HOUSE_ID)
+            time = now if record.time is None else self._ms(record.time)
+            rows.extend((record.measurement, house_id, time, key, float(value))
+                        for key, value in record.fields.items())
+            tags.extend((record.measurement, house_id, key, str(value))
+                        for key, value in record.tags.items() if key != "house_id")
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO points VALUES (?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET value = excluded.value", rows
+            )
+            if tags:
+                conn.executemany("INSERT OR REPLACE INTO series_tags VALUES (?, ?, ?, ?)", tags)
+
+    async def write_async(self, records: list[Record]) -> None:
+        """write() for asyncio callers; writes run one at a time on a dedicated thread."""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        await asyncio.get_running_loop().run_in_executor(self._writer, self.write, records)
+
+    @staticmethod
+    def _filters(house_id: str | None, house_ids: list[str] | None,
+                 fields: list[str] | None) -> tuple[str, list]:
+        """Extra house/field conditions, appended to a WHERE clause."""
+        where, params = "", []
+        if house_id is not None:
+            where += " AND house_id = ?"
+            params.append(str(house_id))
+        if house_ids is not None:
+            where += f" AND house_id IN ({', '.join('?' * len(house_ids))})"
+            params.extend(str(h) for h in house_ids)
+        if fields is not None:
+            where += f" AND field IN ({', '.join('?' * len(fields))})"
+            params.extend(fields)
+        return where, params
+
+    def _where(self, measurement: str, start: datetime, stop: datetime | None,
+               house_id: str | None, house_ids: list[str] | None = None,
+               fields: list[str] | None = None) -> tuple[str, list]:
+        where = "measurement = ? AND time >= ?"
+        params: list = [measurement, self._ms(start)]
+        if stop is not None:
+            where += " AND time < ?"
+            params.append(self._ms(stop))
+        filters, filter_params = self._filters(house_id, house_ids, fields)
+        return where + filters, params + filter_params
+
+    def _sum_parts(self, measurement: str, start: datetime, stop: datetime | None,
+                   house_id: str | None, house_ids: list[str] | None = None,
+                   fields: list[str] | None = None) -> tuple[str, list]:
+        """UNION ALL of raw rows for the partial edge hours and rollup rows for the whole hours."""
+        start_ms = self._ms(start)
+        stop_ms = None if stop is None else self._ms(stop)
+        first_bucket = -(-start_ms // ROLLUP_MS) * ROLLUP_MS
+        # Open-ended ranges may take the current (partial) hour from the rollup as well
+        end_bucket = None if stop_ms is None else stop_ms - stop_ms % ROLLUP_MS
+        if end_bucket is not None and end_bucket <= first_bucket:
+            where, params = self._where(measurement, start, stop, house_id, house_ids, fields)
+            return f"SELECT house_id, field, value FROM points WHERE {where}", params
+
+        house, house_param = self._filters(house_id, house_ids, fields)
+        parts = [f"SELECT house_id, field, value FROM points WHERE measurement = ? AND time >= ? AND time < ?{house}"]
+        params = [measurement, start_ms, first_bucket, *house_param]
+        parts.append(f"SELECT house_id, field, value FROM rollup WHERE measurement = ? AND bucket >= ?"
+                     f"{'' if end_bucket is None else ' AND bucket < ?'}{house}")
+        params += [measurement, first_bucket, *([] if end_bucket is None else [end_bucket]), *house_param]
+        if end_bucket is not None:
+            parts.append(f"SELECT house_id, field, value FROM points "
+                         f"WHERE measurement = ? AND time >= ? AND time < ?{house}")
+            params += [measurement, end_bucket, stop_ms, *house_param]
+        return " UNION ALL ".join(parts), params
+
+    def house_ids(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        """house_id values with data in the range, in id order."""
+        where, params = self._where(measurement, start, stop, None)
+        rows = self._connect().execute(f"SELECT DISTINCT house_id FROM points WHERE {where}", params)
+        return sorted((house_id for (house_id,) in rows), key=lambda h: (len(h), h))
+
+    def field_names(self, measurement: str, start: datetime, stop: datetime | None = None) -> list[str]:
+        """Field names with data in the range, sorted."""
+        where, params = self._where(measurement, start, stop, None)
+        rows = self._connect().execute(f"SELECT DISTINCT field FROM points WHERE {where}", params)
+        return sorted(name for (name,) in rows)
+
+    def sum_fields(self, measurement: str, start: datetime, stop: datetime | None = None,
+                   house_id: str | None = None, by_house: bool = False,
+                   fields: list[str] | None = None, house_ids: list[str] | None = None) -> dict:
+        """
+        Field sums: {field: total}, or {house_id: {field: total}} with by_house.
+        fields limits the summed fields, house_ids the houses (a settlement shard).
+        """
+        if house_ids is not None and not house_ids:
+            return {}
+        parts, params = self._sum_parts(measurement, start, stop, house_id, house_ids, fields)
+        conn = self._connect()
+        if not by_house:
+            rows = conn.execute(f"SELECT field, SUM(value) FROM ({parts}) GROUP BY field", params)
+            return {name: total for name, total in rows}
+        result: dict = {}
+        rows = conn.execute(f"SELECT house_id, field, SUM(value) FROM ({parts}) GROUP BY house_id, field", params)
+        for house, name, total in rows:
+            result.setdefault(house, {})[name] = total
+        return result
+
+    def window_sum(self, measurement: str, field: str, start: datetime, stop: datetime | None = None,
+                   every_s: int = 60, house_id: str | None = None) -> list[tuple[datetime, float]]:
+        """Sums of one field per window, labelled with the window end time; empty windows omitted."""
+        where, params = self._where(measurement, start, stop, house_id)
+        every_ms = every_s * 1000
+        rows = self._connect().execute(
+            f"SELECT time / ? AS window, SUM(value) FROM points WHERE {where} AND field = ? "
+            "GROUP BY window ORDER BY window",
+            [every_ms, *params, field],
+        )
+        epoch = datetime(1970, 1, 1, tzinfo=UTC)
+        return [(epoch + timedelta(milliseconds=(window + 1) * every_ms), total) for window, total in rows]
+
+    def read_columns(self, measurement: str, start: datetime, stop: datetime,
+                     fields: list[str] | None = None) -> dict[str, list]:
+        """Records of the range in column form: time (ms), house_id and one list per field (all or `fields`)."""
+        where, params = self._where(measurement, start, stop, None, fields=fields)
+        rows = self._connect().execute(
+            f"SELECT house_id, time, field, value FROM points WHERE {where} ORDER BY house_id, time", params
+        )
+        records: dict[tuple, dict] = {}
+        fields: set[str] = set()
+        for house_id, time, name, value in rows:
+            records.setdefault((house_id, time), {})[name] = value
+            fields.add(name)
+        return {
+            "time": [time for _, time in records],
+            "house_id": [house_id for house_id, _ in records],
+            **{name: [values.get(name) for values in records.values()] for name in sorted(fields)},
+        }
+
+    def first_time(self, measurement: str) -> datetime | None:
+        """Time of the oldest record of the measurement, None if there is none."""
+        (first,) = self._connect().execute(
+            "SELECT MIN(time) FROM points WHERE measurement = ?", (measurement,)
+        ).fetchone()
+        return None if first is None else datetime(1970, 1, 1, tzinfo=UTC) + timedelta(milliseconds=first)
+
+    def delete_range(self, measurement: str, start: datetime, stop: datetime) -> None:
+        """Delete the range; the delete trigger takes the values out of the hourly rollups."""
+        where, params = self._where(measurement, start, stop, None)
+        start_ms, stop_ms = self._ms(start), self._ms(stop)
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM points WHERE {where}", params)
+            # Buckets left without raw rows would otherwise report float residue (~1e-18) instead of nothing
+            conn.execute(f"""
+                DELETE FROM rollup WHERE measurement = ? AND bucket >= ? AND bucket < ?
+                  AND NOT EXISTS (
+                    SELECT 1 FROM points WHERE points.measurement = rollup.measurement
+                      AND points.house_id = rollup.house_id AND points.field = rollup.field
+                      AND points.time >= rollup.bucket AND points.time < rollup.bucket + {ROLLUP_MS})
+            """, (measurement, start_ms - start_ms % ROLLUP_MS, stop_ms))
+
+    def health(self) -> dict:
+        self._connect().execute("SELECT 1").fetchone()
+        return {"backend": self.backend, "status": "pass", "version": f"SQLite {sqlite3.sqlite_version}"}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    async def aclose(self) -> None:
+        if self._writer is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self.close)
+            self._writer.shutdown()
+            self._writer = None
+        self.close()
+
+
+def create_store(config: dict, base_dir: str = ".", archived: bool = True):
+    """
+    Store for a subproject config: `storage.backend` is "influxdb" (default,
+    settings from the `influxdb` section) or "sqlite" (`storage.path`,
+    relative to base_dir, default leg.db). With an `archive.path`, reads
+    also cover the Parquet cold tier (archive.py) unless archived=False.
+    """
+    storage = config.get("storage") or {}
+    backend = storage.get("backend", "influxdb")
+    if backend == "sqlite":
+        store = SQLiteStore(os.path.join(base_dir, storage.get("path", "leg.db")))
+    elif backend == "influxdb":
+        influx = config.get("influxdb", {})
+        store = InfluxStore(
+            url=influx.get("url", "http://localhost:8086"),
+            token=influx.get("token", ""),
+            org=influx.get("org", "LEG"),
+            bucket=influx.get("bucket", "energy"),
+        )
+    else:
+        raise ValueError(f"Unknown storage backend: {backend} (expected 'influxdb' or 'sqlite')")
+
+    archive_path = (config.get("archive") or {}).get("path")
+    if archived and archive_path:
+        from archive import ParquetArchive, TieredStore
+        store = TieredStore(store, ParquetArchive(os.path.join(base_dir, archive_path)))
+    return store
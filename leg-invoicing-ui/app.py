@@ -4,15 +4,32 @@ LEG Invoicing Web UI
 Provides tariff management and energy data access via REST API.
 """
 
-from flask import Flask, render_template, request, jsonify
 import json
+import logging
 import os
-from datetime import datetime, timedelta
+import queue
+import ssl
+import sys
+from datetime import UTC, datetime, timedelta
 
+import paho.mqtt.client as mqtt
 import yaml
-from influxdb_client import InfluxDBClient
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
+from live_feed import IntervalFeed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'leg-common'))
+from breakeven import breakeven_mode, breakeven_tariffs
+from timeseries import create_store
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # Load configuration
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
@@ -26,16 +43,54 @@ DEFAULT_TARIFFS = config.get('tariffs', {
     'p_grid_con': 30.0,
 })
 
-# InfluxDB client
-influx_config = config.get('influxdb', {})
-influx_client = InfluxDBClient(
-    url=influx_config.get('url', 'http://localhost:8086'),
-    token=influx_config.get('token', ''),
-    org=influx_config.get('org', 'LEG'),
-    verify_ssl=False
-)
-query_api = influx_client.query_api()
-INFLUX_BUCKET = influx_config.get('bucket', 'energy')
+# Time-series store written by the collector (InfluxDB or embedded SQLite)
+store = create_store(config, os.path.dirname(os.path.abspath(__file__)))
+
+# Live interval feed (collector publishes each interval result to a retained MQTT topic)
+INTERVAL_TOPIC = config.get('collector', {}).get('publish_topic', 'leg/collector/interval')
+SSE_KEEPALIVE_SECONDS = 15
+interval_feed = IntervalFeed()
+
+
+def _on_feed_connect(client, userdata, flags, reason_code, properties=None):
+    if reason_code == 0:
+        client.subscribe(INTERVAL_TOPIC)
+        logger.info(f"Live feed subscribed to {INTERVAL_TOPIC}")
+    else:
+        logger.error(f"Live feed failed to connect: {reason_code}")
+
+
+def _on_feed_message(client, userdata, msg):
+    interval_feed.publish(msg.payload.decode())
+
+
+def start_interval_feed():
+    """Subscribe to the collector's interval topic in a background MQTT thread."""
+    mqtt_config = config.get('mqtt')
+    if not mqtt_config:
+        logger.warning("No MQTT configuration - live interval feed disabled")
+        return None
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = _on_feed_connect
+    client.on_message = _on_feed_message
+
+    if mqtt_config.get('use_tls', False):
+        client.tls_set(cert_reqs=ssl.CERT_NONE)
+        client.tls_insecure_set(True)
+    if mqtt_config.get('username') and mqtt_config.get('password'):
+        client.username_pw_set(mqtt_config['username'], mqtt_config['password'])
+
+    try:
+        client.connect_async(mqtt_config['broker'], mqtt_config['port'], 60)
+        client.loop_start()
+    except Exception as e:
+        logger.error(f"Live feed could not connect to MQTT broker: {e}")
+        return None
+    return client
+
+
+feed_client = start_interval_feed()
 
 
 def load_tariffs():
@@ -50,9 +105,19 @@ def save_tariffs(tariffs):
         json.dump(tariffs, f, indent=2)
 
 
-def calculate_house_tariff(tariffs):
-    """Calculate house consumption tariff (p_con) based on other tariffs."""
-    p_con = (tariffs['p_pv'] + tariffs['p_grid_con']) / 2
+def latest_energy_balance():
+    """(E, I) in kWh of the most recent collector interval, or (0, 0) if none was received."""
+    if interval_feed.latest is None:
+        return 0.0, 0.0
+    community = json.loads(interval_feed.latest).get('community', {})
+    return community.get('total_production_kwh', 0.0), community.get('total_consumption_kwh', 0.0)
+
+
+def calculate_house_tariff(tariffs, E=None, I=None):
+    """Break-even house consumption tariff (p_con) for E/I, by default the latest interval."""
+    if E is None or I is None:
+        E, I = latest_energy_balance()
+    p_con, _ = breakeven_tariffs(E, I, tariffs['p_pv'], tariffs['p_grid_con'], tariffs['p_grid_del'])
     return round(p_con, 2)
 
 
@@ -70,6 +135,30 @@ def get_tariffs():
     return jsonify(tariffs)
 
 
+@app.route('/api/tariffs/breakeven', methods=['GET'])
+def preview_breakeven():
+    """
+    Preview break-even tariffs for given E/I (kWh), defaulting to the latest
+    interval. p_pv/p_grid_con/p_grid_del override the saved tariffs.
+    """
+    tariffs = load_tariffs()
+    for key in ('p_pv', 'p_grid_con', 'p_grid_del'):
+        tariffs[key] = request.args.get(key, tariffs[key], type=float)
+    latest_E, latest_I = latest_energy_balance()
+    E = request.args.get('E', latest_E, type=float)
+    I = request.args.get('I', latest_I, type=float)
+    p_con, p_pv = breakeven_tariffs(E, I, tariffs['p_pv'], tariffs['p_grid_con'], tariffs['p_grid_del'])
+    return jsonify({
+        'E': E,
+        'I': I,
+        'mode': breakeven_mode(E, I, tariffs['p_pv'], tariffs['p_grid_con'], tariffs['p_grid_del']),
+        'p_con': round(p_con, 2),
+        'p_pv': round(p_pv, 2),
+        'p_grid_con': tariffs['p_grid_con'],
+        'p_grid_del': tariffs['p_grid_del'],
+    })
+
+
 @app.route('/api/tariffs', methods=['POST'])
 def update_tariffs():
     data = request.json
@@ -83,37 +172,25 @@ def update_tariffs():
     return jsonify({'status': 'success', 'tariffs': tariffs})
 
 
+def _since(hours):
+    return datetime.now(UTC) - timedelta(hours=hours)
+
+
+def _rounded(sums):
+    return {field: round(value, 4) if value else 0 for field, value in sums.items()}
+
+
 @app.route('/api/energy/summary', methods=['GET'])
 def get_energy_summary():
     """Get energy summary for all houses over a time period."""
     hours = request.args.get('hours', 24, type=int)
 
-    query = f'''
-    from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: -{hours}h)
-      |> filter(fn: (r) => r._measurement == "house_energy")
-      |> group(columns: ["house_id", "_field"])
-      |> sum()
-    '''
-
     try:
-        result = query_api.query(query)
-
-        houses = {}
-        for table in result:
-            for record in table.records:
-                house_id = record.values.get('house_id', 'unknown')
-                field = record.get_field()
-                value = record.get_value()
-
-                if house_id not in houses:
-                    houses[house_id] = {}
-                houses[house_id][field] = round(value, 4) if value else 0
-
+        sums = store.sum_fields('house_energy', _since(hours), by_house=True)
         return jsonify({
             'status': 'success',
             'period_hours': hours,
-            'houses': houses
+            'houses': {house_id: _rounded(fields) for house_id, fields in sums.items()}
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -124,28 +201,11 @@ def get_community_energy():
     """Get community-level energy data."""
     hours = request.args.get('hours', 24, type=int)
 
-    query = f'''
-    from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: -{hours}h)
-      |> filter(fn: (r) => r._measurement == "community_energy")
-      |> group(columns: ["_field"])
-      |> sum()
-    '''
-
     try:
-        result = query_api.query(query)
-
-        data = {}
-        for table in result:
-            for record in table.records:
-                field = record.get_field()
-                value = record.get_value()
-                data[field] = round(value, 4) if value else 0
-
         return jsonify({
             'status': 'success',
             'period_hours': hours,
-            'community': data
+            'community': _rounded(store.sum_fields('community_energy', _since(hours)))
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -156,30 +216,12 @@ def get_house_energy(house_id):
     """Get energy data for a specific house."""
     hours = request.args.get('hours', 24, type=int)
 
-    query = f'''
-    from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: -{hours}h)
-      |> filter(fn: (r) => r._measurement == "house_energy")
-      |> filter(fn: (r) => r.house_id == "{house_id}")
-      |> group(columns: ["_field"])
-      |> sum()
-    '''
-
     try:
-        result = query_api.query(query)
-
-        data = {}
-        for table in result:
-            for record in table.records:
-                field = record.get_field()
-                value = record.get_value()
-                data[field] = round(value, 4) if value else 0
-
         return jsonify({
             'status': 'success',
             'house_id': house_id,
             'period_hours': hours,
-            'energy': data
+            'energy': _rounded(store.sum_fields('house_energy', _since(hours), house_id=house_id))
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -192,44 +234,56 @@ def get_energy_timeseries():
     measurement = request.args.get('measurement', 'community_energy')
     field = request.args.get('field', 'total_consumption_kwh')
 
-    query = f'''
-    from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: -{hours}h)
-      |> filter(fn: (r) => r._measurement == "{measurement}")
-      |> filter(fn: (r) => r._field == "{field}")
-      |> aggregateWindow(every: 1m, fn: sum, createEmpty: false)
-    '''
-
     try:
-        result = query_api.query(query)
-
-        data = []
-        for table in result:
-            for record in table.records:
-                data.append({
-                    'time': record.get_time().isoformat(),
-                    'value': round(record.get_value(), 6) if record.get_value() else 0
-                })
-
+        windows = store.window_sum(measurement, field, _since(hours), every_s=60)
         return jsonify({
             'status': 'success',
             'measurement': measurement,
             'field': field,
-            'data': data
+            'data': [{'time': time.isoformat(), 'value': round(value, 6) if value else 0}
+                     for time, value in windows]
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/stream/intervals', methods=['GET'])
+def stream_intervals():
+    """Server-Sent Events stream of collector interval results."""
+    def generate():
+        q = interval_feed.subscribe()
+        try:
+            while True:
+                try:
+                    sequence, message = q.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'id: {sequence}\nevent: interval\ndata: {message}\n\n'
+        finally:
+            interval_feed.unsubscribe(q)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     try:
-        health = influx_client.health()
+        health = store.health()
         return jsonify({
             'status': 'ok',
-            'influxdb': health.status,
-            'influxdb_version': health.version
+            # Pre-storage-interface keys, kept for existing monitoring checks
+            'influxdb': health['status'],
+            'influxdb_version': health['version'],
+            'storage': health['backend'],
+            'storage_status': health['status'],
+            'storage_version': health['version'],
+            'live_feed_subscribers': interval_feed.subscriber_count
         })
     except Exception as e:
         return jsonify({
@@ -243,5 +297,6 @@ if __name__ == '__main__':
     app.run(
         host=web_config.get('host', '0.0.0.0'),
         port=web_config.get('port', 8060),
-        debug=False
+        debug=False,
+        threaded=True
     )
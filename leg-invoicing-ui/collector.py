@@ -2,19 +2,32 @@
 MQTT Collector Service for LEG-Invoicing
 
 Subscribes to smart meter MQTT topics, calculates energy deltas,
-applies break-even tariffs, and stores all values in InfluxDB.
+applies break-even tariffs, and stores all values in InfluxDB or the
+embedded SQLite store (see leg-common/timeseries.py).
+
+Runs on one asyncio event loop: an ingest task reads MQTT messages
+(aiomqtt) and an interval task closes, stores and publishes each
+interval, so ingest keeps running while a write is in flight. SIGTERM and
+SIGINT cancel both tasks, store the partial interval and close the store.
 """
 
+import asyncio
 import json
+import logging
 import os
+import signal
 import ssl
-import logging
-from datetime import datetime
-from typing import Dict
+import sys
+from datetime import UTC, datetime
+
+import aiomqtt
 import yaml
-import paho.mqtt.client as mqtt
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from breakeven import NO_CONSUMPTION, SURPLUS_CAPPED, breakeven_mode, breakeven_tariffs
+from meter_stats import MeterStats
+from recent import RecentReadings, start_query_server
+from timeseries import Record, create_store
 
 # Load configuration
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
@@ -28,14 +41,17 @@ MQTT_USE_TLS = config["mqtt"].get("use_tls", False)
 MQTT_USERNAME = config["mqtt"].get("username", "")
 MQTT_PASSWORD = config["mqtt"].get("password", "")
 
-INFLUX_URL = config["influxdb"]["url"]
-INFLUX_TOKEN = config["influxdb"]["token"]
-INFLUX_ORG = config["influxdb"]["org"]
-INFLUX_BUCKET = config["influxdb"]["bucket"]
-
 HOUSE_CONFIG = config["houses"]
 DEFAULT_TARIFFS = config["tariffs"]
 COLLECTOR_INTERVAL = config["collector"]["interval"]
+INTERVAL_TOPIC = config["collector"].get("publish_topic", "leg/collector/interval")
+# In-memory ring buffer of the last N readings per house, served locally (see recent.py)
+RECENT_READINGS = config["collector"].get("recent_readings", 360)
+QUERY_HOST = config["collector"].get("query_host", "127.0.0.1")
+QUERY_PORT = config["collector"].get("query_port", 8061)
+# Largest plausible power per meter; deltas above it over the elapsed meter time are rejected
+MAX_POWER_KW = config["collector"].get("max_power_kw", 36.0)
+STATS_ALPHA = config["collector"].get("stats_alpha", 0.05)
 
 LOG_LEVEL = config["logging"]["level"]
 LOG_FILE = config["logging"].get("file")
@@ -61,93 +77,57 @@ TARIFFS_FILE = os.path.join(os.path.dirname(__file__), "tariffs.json")
 
 class EnergyCollector:
     def __init__(self):
-        self.previous_values: Dict[str, Dict[str, float]] = {}
-        self.current_interval: Dict[str, Dict] = {}
-
-        self.influx_client = InfluxDBClient(
-            url=INFLUX_URL,
-            token=INFLUX_TOKEN,
-            org=INFLUX_ORG,
-            verify_ssl=False
-        )
-        self.write_api = self.influx_client.write_api(write_options=SYNCHRONOUS)
-        logger.info(f"Connected to InfluxDB at {INFLUX_URL}")
+        self.previous_values: dict[str, dict[str, float]] = {}
+        self.current_interval: dict[str, dict] = {}
+        house_ids = [house["id"] for house in HOUSE_CONFIG.values()]
+        self.recent = RecentReadings(house_ids, RECENT_READINGS)
+        self.stats = MeterStats(house_ids, MAX_POWER_KW, STATS_ALPHA)
 
-    def load_base_tariffs(self) -> Dict[str, float]:
+        # InfluxDB or embedded SQLite, per the storage section of config.yaml
+        self.store = create_store(config, os.path.dirname(os.path.abspath(__file__)))
+        logger.info(f"Storing interval data in {self.store.backend}")
+
+    def load_base_tariffs(self) -> dict[str, float]:
         """Load policy tariffs from file or use defaults."""
         if os.path.exists(TARIFFS_FILE):
             with open(TARIFFS_FILE, "r") as f:
                 return json.load(f)
         return DEFAULT_TARIFFS.copy()
 
-    def calculate_breakeven_tariffs(self, E: float, I: float, base_tariffs: Dict[str, float]) -> Dict[str, float]:
+    def calculate_breakeven_tariffs(self, E: float, I: float, base_tariffs: dict[str, float]) -> dict[str, float]:
         """
         Calculate break-even tariffs based on community energy balance.
-        
-        The community acts as intermediary between PV producers and consumers.
-        Break-even means: community revenue = community costs
-        
+
         E = total_production (PV exports from houses to community)
         I = total_consumption (imports from community to houses)
-        
-        SURPLUS (E > I): More PV than needed, excess goes to grid
-          - Revenue: houses pay for I kWh + grid pays for (E-I) kWh
-          - Cost: pay PV producers for E kWh
-          - Formula: p_con = p_grid_del + (E/I) * (p_pv - p_grid_del)
-          - Edge case: if p_con > p_grid_con, cap house price and reduce PV payout
-        
-        DEFICIT (E < I): Need grid power to cover shortfall  
-          - Revenue: houses pay for I kWh
-          - Cost: pay PV producers for E kWh + pay grid for (I-E) kWh
-          - Formula: p_con = p_grid_con + (E/I) * (p_pv - p_grid_con)
+
+        The rules (surplus, capped surplus, deficit, no consumption) live in
+        leg-common/breakeven.py, shared with the simulator and invoicing.
         """
-        p_pv_policy = base_tariffs["p_pv"]        # Policy PV payout rate
-        p_grid_con = base_tariffs["p_grid_con"]   # Grid import price  
-        p_grid_del = base_tariffs["p_grid_del"]   # Grid export price
-        
+        p_pv_policy = base_tariffs["p_pv"]
+        p_grid_con = base_tariffs["p_grid_con"]
+        p_grid_del = base_tariffs["p_grid_del"]
+
         tariffs = base_tariffs.copy()
-        
-        if I == 0:
-            # No consumption - use policy defaults
-            tariffs["p_con"] = p_grid_con
-            tariffs["p_pv"] = p_pv_policy
+        tariffs["p_con"], tariffs["p_pv"] = breakeven_tariffs(E, I, p_pv_policy, p_grid_con, p_grid_del)
+
+        mode = breakeven_mode(E, I, p_pv_policy, p_grid_con, p_grid_del)
+        if mode == NO_CONSUMPTION:
             logger.debug(f"Break-even: No consumption, using defaults p_con={p_grid_con}")
-            return tariffs
-        
-        if E >= I:
-            # SURPLUS: Community has more PV than consumption
-            # Standard break-even formula:
-            p_con_calc = p_grid_del + (E / I) * (p_pv_policy - p_grid_del)
-            
-            if p_con_calc > p_grid_con:
-                # EDGE CASE: House price would exceed grid price
-                # Cap house price and reduce PV payout to break even
-                tariffs["p_con"] = p_grid_con
-                # PV payout = weighted average of house revenue and grid export revenue
-                tariffs["p_pv"] = (I * p_grid_con + (E - I) * p_grid_del) / E
-                logger.info(
-                    f"Break-even SURPLUS (capped): E={E:.4f} I={I:.4f} "
-                    f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f} (reduced from {p_pv_policy})"
-                )
-            else:
-                tariffs["p_con"] = p_con_calc
-                tariffs["p_pv"] = p_pv_policy
-                logger.info(
-                    f"Break-even SURPLUS: E={E:.4f} I={I:.4f} "
-                    f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f}"
-                )
+        elif mode == SURPLUS_CAPPED:
+            logger.info(
+                f"Break-even SURPLUS (capped): E={E:.4f} I={I:.4f} "
+                f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f} (reduced from {p_pv_policy})"
+            )
         else:
-            # DEFICIT: Community needs grid power
-            tariffs["p_con"] = p_grid_con + (E / I) * (p_pv_policy - p_grid_con)
-            tariffs["p_pv"] = p_pv_policy
             logger.info(
-                f"Break-even DEFICIT: E={E:.4f} I={I:.4f} "
+                f"Break-even {mode.upper()}: E={E:.4f} I={I:.4f} "
                 f"p_con={tariffs['p_con']:.2f} p_pv={tariffs['p_pv']:.2f}"
             )
-        
+
         return tariffs
 
-    def process_message(self, mac: str, payload: Dict):
+    def process_message(self, mac: str, payload: dict):
         """Process incoming MQTT message and calculate energy delta."""
         if mac not in HOUSE_CONFIG:
             return
@@ -156,11 +136,14 @@ class EnergyCollector:
         house_id = house_info["id"]
         ei = payload.get("Ei", 0)
         eo = payload.get("Eo", 0)
+        ts = payload.get("ts", 0)
+        self.recent.append(house_id, ts, ei, eo)
 
         # Check if we have valid previous values (ei/eo are never 0 in reality)
         # If previous is 0, we just started up - wait for next reading
         if mac not in self.previous_values or self.previous_values[mac]["Ei"] == 0:
             self.previous_values[mac] = {"Ei": ei, "Eo": eo}
+            self.stats.reset(house_id, ts)
             logger.info(f"Startup: storing baseline for house {house_id} (Ei={ei}, Eo={eo})")
             return
         
@@ -171,10 +154,13 @@ class EnergyCollector:
         # Update previous values
         self.previous_values[mac] = {"Ei": ei, "Eo": eo}
         
-        # Sanity check: skip unreasonably large deltas (>0.1 kWh = ~36kW for 10s)
-        MAX_DELTA = 0.1
-        if delta_ei > MAX_DELTA or delta_eo > MAX_DELTA:
-            logger.warning(f"Skipping invalid delta: ei={delta_ei:.4f}, eo={delta_eo:.4f} kWh (house {house_id})")
+        # Sanity check: skip deltas above MAX_POWER_KW over the time since the last reading
+        valid, elapsed, limit = self.stats.update(house_id, ts, delta_ei, delta_eo)
+        if not valid:
+            logger.warning(
+                f"Skipping invalid delta: ei={delta_ei:.4f}, eo={delta_eo:.4f} kWh "
+                f"(limit {limit:.4f} kWh over {elapsed:.0f}s, house {house_id})"
+            )
             return
         
         if mac in self.current_interval:
@@ -191,10 +177,16 @@ class EnergyCollector:
                 "eo": eo,
             }
 
-    def store_interval_data(self):
-        """Store all collected data for this interval to InfluxDB."""
+    def close_interval(self) -> tuple[list[Record], dict] | None:
+        """
+        Close the current interval: price it and start a new one.
+
+        Returns the records to store and the interval result (per-house
+        deltas, community totals and the applied break-even tariffs) to
+        publish to live consumers, or None if nothing was collected.
+        """
         if not self.current_interval:
-            return
+            return None
 
         # Step 1: Calculate totals (E and I)
         total_consumption = 0  # I = total imports to houses
@@ -209,7 +201,8 @@ class EnergyCollector:
         tariffs = self.calculate_breakeven_tariffs(total_production, total_consumption, base_tariffs)
 
         # Step 3: Create house data points with calculated tariffs
-        points = []
+        records = []
+        house_results = {}
 
         for mac, data in self.current_interval.items():
             delta_ei = data["delta_ei"]
@@ -221,20 +214,30 @@ class EnergyCollector:
             # Net flow per home: positive = exporting, negative = importing
             net_flow_home = delta_eo - delta_ei
 
-            point = Point("house_energy") \
-                .tag("house_id", str(data["house_id"])) \
-                .tag("mac", mac) \
-                .field("ei_kwh", float(data["ei"])) \
-                .field("eo_kwh", float(data["eo"])) \
-                .field("delta_ei_kwh", float(delta_ei)) \
-                .field("delta_eo_kwh", float(delta_eo)) \
-                .field("net_flow_kwh", float(net_flow_home)) \
-                .field("value_consumption_ct", float(value_consumption)) \
-                .field("value_pv_delivery_ct", float(value_pv_delivery)) \
-                .field("tariff_p_consumption", float(tariffs["p_con"])) \
-                .field("tariff_p_pv_delivery", float(tariffs["p_pv"]))
-
-            points.append(point)
+            records.append(Record(
+                "house_energy",
+                tags={"house_id": str(data["house_id"]), "mac": mac},
+                fields={
+                    "ei_kwh": float(data["ei"]),
+                    "eo_kwh": float(data["eo"]),
+                    "delta_ei_kwh": float(delta_ei),
+                    "delta_eo_kwh": float(delta_eo),
+                    "net_flow_kwh": float(net_flow_home),
+                    "value_consumption_ct": float(value_consumption),
+                    "value_pv_delivery_ct": float(value_pv_delivery),
+                    "tariff_p_consumption": float(tariffs["p_con"]),
+                    "tariff_p_pv_delivery": float(tariffs["p_pv"]),
+                },
+            ))
+
+            house_results[str(data["house_id"])] = {
+                "mac": mac,
+                "delta_ei_kwh": delta_ei,
+                "delta_eo_kwh": delta_eo,
+                "net_flow_kwh": net_flow_home,
+                "value_consumption_ct": value_consumption,
+                "value_pv_delivery_ct": value_pv_delivery,
+            }
 
         # Step 4: Calculate grid exchange
         net_energy = total_production - total_consumption
@@ -249,80 +252,186 @@ class EnergyCollector:
         value_grid_export = grid_export * tariffs["p_grid_del"]
         value_grid_import = grid_import * tariffs["p_grid_con"]
 
-        # Step 5: Create community data point
-        community_point = Point("community_energy") \
-            .field("total_consumption_kwh", total_consumption) \
-            .field("total_production_kwh", total_production) \
-            .field("grid_import_kwh", float(grid_import)) \
-            .field("grid_export_kwh", float(grid_export)) \
-            .field("value_grid_import_ct", float(value_grid_import)) \
-            .field("value_grid_export_ct", float(value_grid_export)) \
-            .field("tariff_p_grid_consumption", float(tariffs["p_grid_con"])) \
-            .field("tariff_p_grid_delivery", float(tariffs["p_grid_del"]))
+        # Step 5: Create community record
+        records.append(Record("community_energy", fields={
+            "total_consumption_kwh": float(total_consumption),
+            "total_production_kwh": float(total_production),
+            "grid_import_kwh": float(grid_import),
+            "grid_export_kwh": float(grid_export),
+            "value_grid_import_ct": float(value_grid_import),
+            "value_grid_export_ct": float(value_grid_export),
+            "tariff_p_grid_consumption": float(tariffs["p_grid_con"]),
+            "tariff_p_grid_delivery": float(tariffs["p_grid_del"]),
+        }))
 
-        points.append(community_point)
+        self.current_interval.clear()
 
-        # Step 6: Write all points to InfluxDB
-        self.write_api.write(bucket=INFLUX_BUCKET, record=points)
+        return records, {
+            "time": datetime.now(UTC).isoformat(),
+            "interval_s": COLLECTOR_INTERVAL,
+            "houses": house_results,
+            "community": {
+                "total_consumption_kwh": total_consumption,
+                "total_production_kwh": total_production,
+                "grid_import_kwh": grid_import,
+                "grid_export_kwh": grid_export,
+                "value_grid_import_ct": value_grid_import,
+                "value_grid_export_ct": value_grid_export,
+            },
+            "tariffs": {
+                "p_con": tariffs["p_con"],
+                "p_pv": tariffs["p_pv"],
+                "p_grid_con": tariffs["p_grid_con"],
+                "p_grid_del": tariffs["p_grid_del"],
+            },
+        }
+
+    def restore_interval(self, pending: dict[str, dict]):
+        """Merge a closed interval whose write failed back into the current one."""
+        for mac, data in pending.items():
+            current = self.current_interval.get(mac)
+            if current is None:
+                self.current_interval[mac] = data
+            else:
+                # Readings that arrived meanwhile keep the newer counter values
+                current["delta_ei"] += data["delta_ei"]
+                current["delta_eo"] += data["delta_eo"]
 
+    async def store_interval_data(self) -> dict | None:
+        """
+        Close the interval and write its records in one batch; returns the interval result.
+
+        If the write fails, the interval is merged back into the current one
+        and the error re-raised, so the next flush stores it again.
+        """
+        pending = self.current_interval.copy()
+        closed = self.close_interval()
+        if closed is None:
+            return None
+        records, result = closed
+        # Messages keep being ingested into the next interval while the write is in flight;
+        # shielded so a dropped MQTT connection does not cancel it halfway
+        try:
+            await asyncio.shield(self.store.write_async(records))
+        except Exception:
+            self.restore_interval(pending)
+            raise
+        community, tariffs = result["community"], result["tariffs"]
         logger.info(
-            f"Stored: cons={total_consumption:.4f}kWh, prod={total_production:.4f}kWh, "
+            f"Stored: cons={community['total_consumption_kwh']:.4f}kWh, "
+            f"prod={community['total_production_kwh']:.4f}kWh, "
             f"p_con={tariffs['p_con']:.2f}, p_pv={tariffs['p_pv']:.2f}"
         )
+        return result
 
-        self.current_interval.clear()
-
-
-def on_connect(client, userdata, flags, rc, properties=None):
-    if rc == 0:
-        logger.info(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
-        client.subscribe("+/SENSOR")
-        logger.info("Subscribed to +/SENSOR")
-    else:
-        logger.error(f"Failed to connect, return code {rc}")
-
-
-def on_message(client, userdata, msg):
-    try:
-        mac = msg.topic.split("/")[0]
-        payload = json.loads(msg.payload.decode())
-        userdata["collector"].process_message(mac, payload)
-    except Exception as e:
-        logger.error(f"Error processing message: {e}")
-
-
-def main():
-    import time
-
-    collector = EnergyCollector()
-
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, userdata={"collector": collector})
-    client.on_connect = on_connect
-    client.on_message = on_message
 
+def mqtt_client() -> aiomqtt.Client:
+    tls_context = None
     if MQTT_USE_TLS:
-        client.tls_set(cert_reqs=ssl.CERT_NONE)
-        client.tls_insecure_set(True)
+        tls_context = ssl.create_default_context()
+        tls_context.check_hostname = False
+        tls_context.verify_mode = ssl.CERT_NONE
         logger.info("TLS enabled for MQTT connection")
-
     if MQTT_USERNAME and MQTT_PASSWORD:
-        client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
         logger.info(f"MQTT authentication configured for user: {MQTT_USERNAME}")
+    return aiomqtt.Client(
+        MQTT_BROKER, MQTT_PORT,
+        username=MQTT_USERNAME or None, password=MQTT_PASSWORD or None,
+        tls_context=tls_context, tls_insecure=True if MQTT_USE_TLS else None,
+        keepalive=60,
+    )
+
+
+async def ingest(collector: EnergyCollector, client: aiomqtt.Client):
+    """Feed +/SENSOR messages to the collector until cancelled."""
+    await client.subscribe("+/SENSOR")
+    logger.info("Subscribed to +/SENSOR")
+    async for message in client.messages:
+        try:
+            mac = message.topic.value.split("/")[0]
+            collector.process_message(mac, json.loads(message.payload))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"Error processing message: {e}")
+
+
+async def flush_intervals(collector: EnergyCollector, client: aiomqtt.Client, stop: asyncio.Event):
+    """Store and publish an interval every COLLECTOR_INTERVAL seconds, then the partial one once stop is set."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    while not stop.is_set():
+        deadline += COLLECTOR_INTERVAL  # drift-free schedule
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=max(0.0, deadline - loop.time()))
+        except TimeoutError:
+            pass
+        await flush(collector, client)
+
+
+async def flush(collector: EnergyCollector, client: aiomqtt.Client):
+    try:
+        result = await collector.store_interval_data()
+    except Exception as e:  # noqa: BLE001 - backend-specific write errors (InfluxDB API, SQLite)
+        logger.error(f"Error storing interval, retrying with the next one: {e}")
+        return
+    if result:
+        # Retained so late subscribers (UI live feed) get the last interval immediately
+        await client.publish(INTERVAL_TOPIC, json.dumps(result), retain=True)
+
+
+async def session(collector: EnergyCollector, stop: asyncio.Event):
+    """One broker connection: ingest and interval tasks until stop is set or the connection fails."""
+    async with mqtt_client() as client:
+        logger.info(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
+        tasks = {asyncio.create_task(ingest(collector, client)),
+                 asyncio.create_task(flush_intervals(collector, client, stop))}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            task.result()  # re-raises the MqttError that ended the session
+
+
+async def run(collector: EnergyCollector):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    # systemd stops the service with SIGTERM
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Starting collector - storing data every {COLLECTOR_INTERVAL} seconds to {collector.store.backend}")
+    logger.info(f"Publishing interval results to {INTERVAL_TOPIC}")
 
-    client.connect(MQTT_BROKER, MQTT_PORT, 60)
-    client.loop_start()
+    try:
+        while not stop.is_set():
+            try:
+                await session(collector, stop)
+            except aiomqtt.MqttError as e:
+                logger.error(f"MQTT connection lost: {e}; reconnecting in 5s")
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=5)
+                except TimeoutError:
+                    pass
+        logger.info("Shutting down collector")
+        # Stopped while disconnected: store the partial interval without publishing it
+        if collector.current_interval:
+            await collector.store_interval_data()
+    finally:
+        await collector.store.aclose()
 
-    logger.info(f"Starting collector - storing data every {COLLECTOR_INTERVAL} seconds to InfluxDB")
 
+def main():
+    collector = EnergyCollector()
+    query_server = None
+    if QUERY_PORT:
+        query_server = start_query_server(collector.recent, QUERY_HOST, QUERY_PORT, collector.stats)
     try:
-        while True:
-            time.sleep(COLLECTOR_INTERVAL)
-            collector.store_interval_data()
-    except KeyboardInterrupt:
-        logger.info("Shutting down collector")
-        client.loop_stop()
-        client.disconnect()
-        collector.influx_client.close()
+        asyncio.run(run(collector))
+    finally:
+        if query_server:
+            query_server.shutdown()
 
 
 if __name__ == "__main__":
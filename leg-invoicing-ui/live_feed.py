@@ -0,0 +1,54 @@
+"""
+Live Interval Feed for LEG-Invoicing
+
+Fans collector interval results (received from the retained MQTT topic)
+out to any number of Server-Sent Events subscribers.
+"""
+
+import queue
+import threading
+
+
+class IntervalFeed:
+    """Thread-safe fan-out of interval messages to per-client queues."""
+
+    def __init__(self, max_queue: int = 16):
+        self._lock = threading.Lock()
+        self._subscribers: set[queue.Queue] = set()
+        self._max_queue = max_queue
+        self.latest: str | None = None
+        self.sequence = 0
+
+    def publish(self, message: str):
+        """Push a message to all subscribers, dropping the oldest for slow clients."""
+        with self._lock:
+            self.sequence += 1
+            self.latest = message
+            item = (self.sequence, message)
+            for q in self._subscribers:
+                try:
+                    q.put_nowait(item)
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+                    q.put_nowait(item)
+
+    def subscribe(self) -> queue.Queue:
+        """Register a new subscriber, primed with the latest message if any."""
+        q = queue.Queue(maxsize=self._max_queue)
+        with self._lock:
+            if self.latest is not None:
+                q.put_nowait((self.sequence, self.latest))
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
@@ -0,0 +1,106 @@
+"""
+Streaming per-meter statistics for the LEG collector.
+
+One row of a float64 NumPy array per house holds the last meter ts, the
+receive time and exponentially weighted mean/variance of the inter-arrival
+time and of the import and export power. Every update is O(1), and 100k
+meters take about 6 MB.
+
+Delta validation scales with the elapsed meter time: the largest
+plausible energy delta is max_power_kw times the time since the previous
+reading, so slow meters and readings after a reconnect gap are accepted
+while glitches (counter jumps, unit errors) are still rejected. The limit
+does not tighten with a meter's power statistics, since a load switching
+on (EV, heat pump) is a legitimate jump far above its recent mean; the
+statistics are for monitoring (GET /stats), and the mean inter-arrival
+time is the fallback elapsed time when neither ts nor receive time
+advanced.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+# State columns
+LAST_TS, LAST_SEEN, DT_MEAN, IMPORT_MEAN, IMPORT_VAR, EXPORT_MEAN, EXPORT_VAR, COUNT = range(8)
+STAT_COLUMNS = 8
+
+
+class MeterStats:
+    """EWMA statistics and elapsed-time-scaled delta limits per house."""
+
+    def __init__(self, house_ids, max_power_kw: float = 36.0, alpha: float = 0.05):
+        self.house_ids = [str(h) for h in house_ids]
+        self._row = {house_id: row for row, house_id in enumerate(self.house_ids)}
+        self.max_power_kw = max_power_kw
+        self.alpha = alpha
+        self.state = np.full((len(self.house_ids), STAT_COLUMNS), np.nan)
+        self.state[:, COUNT] = 0
+        self._lock = threading.Lock()
+
+    def reset(self, house_id, ts: float, received: float | None = None) -> None:
+        """Start timing from a baseline reading (startup), keeping the learned statistics."""
+        row = self._row.get(str(house_id))
+        if row is None:
+            return
+        with self._lock:
+            self.state[row, LAST_TS] = ts
+            self.state[row, LAST_SEEN] = time.time() if received is None else received
+
+    def update(self, house_id, ts: float, delta_ei: float, delta_eo: float,
+               received: float | None = None) -> tuple[bool, float, float]:
+        """
+        Check a reading's deltas against max_power_kw over the elapsed time and update the statistics.
+
+        Returns (valid, elapsed_s, limit_kwh). Elapsed time comes from the meter ts; if it did
+        not advance (meter restart, no ts) the receive time is used, then the mean inter-arrival
+        time of accepted readings. Rejected readings do not enter the statistics.
+        """
+        row = self._row.get(str(house_id))
+        if row is None:
+            return True, 0.0, float("inf")
+        received = time.time() if received is None else received
+        with self._lock:
+            last_ts, last_seen, dt_mean, imp_mean, imp_var, exp_mean, exp_var, count = self.state[row].tolist()
+            elapsed = ts - last_ts
+            if not elapsed > 0:
+                elapsed = received - last_seen
+            if not elapsed > 0:
+                elapsed = dt_mean if dt_mean > 0 else 1.0
+            limit = self.max_power_kw * elapsed / 3600
+            valid = delta_ei <= limit and delta_eo <= limit
+
+            a = self.alpha
+            if valid:
+                dt_mean = elapsed if count == 0 else dt_mean + a * (elapsed - dt_mean)
+                imp_mean, imp_var = _ewma(imp_mean, imp_var, delta_ei * 3600 / elapsed, a, count)
+                exp_mean, exp_var = _ewma(exp_mean, exp_var, delta_eo * 3600 / elapsed, a, count)
+                count += 1
+            self.state[row] = (ts, received, dt_mean, imp_mean, imp_var, exp_mean, exp_var, count)
+        return valid, elapsed, limit
+
+    def summary(self) -> dict[str, dict]:
+        """Statistics of every house with at least one accepted delta (power in kW)."""
+        with self._lock:
+            state = self.state.copy()
+        return {
+            self.house_ids[row]: {
+                "samples": int(state[row, COUNT]),
+                "interval_s": state[row, DT_MEAN],
+                "import_kw": state[row, IMPORT_MEAN],
+                "import_kw_std": float(np.sqrt(state[row, IMPORT_VAR])),
+                "export_kw": state[row, EXPORT_MEAN],
+                "export_kw_std": float(np.sqrt(state[row, EXPORT_VAR])),
+            }
+            for row in np.flatnonzero(state[:, COUNT]).tolist()
+        }
+
+
+def _ewma(mean: float, var: float, value: float, alpha: float, count: float) -> tuple[float, float]:
+    """One step of an exponentially weighted mean and variance."""
+    if count == 0:
+        return value, 0.0
+    diff = value - mean
+    incr = alpha * diff
+    return mean + incr, (1 - alpha) * (var + diff * incr)
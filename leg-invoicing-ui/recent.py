@@ -0,0 +1,138 @@
+"""
+Recent meter readings for the LEG collector.
+
+Keeps the last N readings of every house in fixed-size NumPy ring buffers
+(one row per house), so recent-window views and sanity checks are answered
+from memory instead of an InfluxDB round-trip. RAM is bounded by
+houses x N x 40 bytes, independent of uptime.
+
+A small HTTP server (local only by default) serves the buffers as JSON:
+
+    GET /recent                       latest reading of every house
+    GET /recent/<house_id>?seconds=300  readings of one house, oldest first
+    GET /stats                        per-meter statistics (see meter_stats.py)
+"""
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("time", "ts", "ei", "eo", "import_w", "export_w")
+
+
+class RecentReadings:
+    """Per-house ring buffers of (receive time, meter ts, Ei, Eo, derived import/export power)."""
+
+    def __init__(self, house_ids, capacity: int = 360):
+        self.house_ids = [str(h) for h in house_ids]
+        self._row = {house_id: row for row, house_id in enumerate(self.house_ids)}
+        self.capacity = capacity
+        shape = (len(self.house_ids), capacity)
+        self.time = np.zeros(shape)                   # receive time (unix s)
+        self.ts = np.zeros(shape)                     # meter timestamp (s)
+        self.ei = np.zeros(shape)                     # cumulative kWh
+        self.eo = np.zeros(shape)
+        self.import_w = np.zeros(shape, np.float32)   # from Ei/Eo deltas
+        self.export_w = np.zeros(shape, np.float32)
+        self.count = np.zeros(len(self.house_ids), np.int64)   # readings ever appended
+        self._lock = threading.Lock()
+
+    def append(self, house_id, ts: float, ei: float, eo: float, received: float | None = None) -> None:
+        row = self._row.get(str(house_id))
+        if row is None:
+            return
+        received = time.time() if received is None else received
+        with self._lock:
+            n = self.count[row]
+            pos = n % self.capacity
+            import_w = export_w = 0.0
+            if n:
+                prev = (n - 1) % self.capacity
+                # Meter ts where it advances, receive time otherwise (meter restart)
+                elapsed = ts - self.ts[row, prev]
+                if elapsed <= 0:
+                    elapsed = received - self.time[row, prev]
+                if elapsed > 0:
+                    import_w = max(0.0, ei - self.ei[row, prev]) * 3.6e6 / elapsed
+                    export_w = max(0.0, eo - self.eo[row, prev]) * 3.6e6 / elapsed
+            self.time[row, pos] = received
+            self.ts[row, pos] = ts
+            self.ei[row, pos] = ei
+            self.eo[row, pos] = eo
+            self.import_w[row, pos] = import_w
+            self.export_w[row, pos] = export_w
+            self.count[row] = n + 1
+
+    def window(self, house_id, seconds: float | None = None) -> dict[str, list] | None:
+        """Readings of a house, oldest first, optionally only those received in the last `seconds`; None if unknown."""
+        row = self._row.get(str(house_id))
+        if row is None:
+            return None
+        with self._lock:
+            n = int(self.count[row])
+            size = min(n, self.capacity)
+            order = (np.arange(n - size, n) % self.capacity) if size else np.arange(0)
+            columns = {name: getattr(self, name)[row, order] for name in COLUMNS}
+        if seconds is not None and size:
+            keep = columns["time"] >= time.time() - seconds
+            columns = {name: values[keep] for name, values in columns.items()}
+        return {name: values.tolist() for name, values in columns.items()}
+
+    def latest(self) -> dict[str, dict]:
+        """Most recent reading of every house that has one."""
+        with self._lock:
+            rows = np.flatnonzero(self.count)
+            pos = (self.count[rows] - 1) % self.capacity
+            values = {name: getattr(self, name)[rows, pos].tolist() for name in COLUMNS}
+        return {
+            self.house_ids[row]: {name: values[name][i] for name in COLUMNS}
+            for i, row in enumerate(rows.tolist())
+        }
+
+
+def start_query_server(readings: RecentReadings, host: str = "127.0.0.1", port: int = 8061,
+                       stats=None) -> ThreadingHTTPServer:
+    """Serve the ring buffers over HTTP from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts == ["recent"]:
+                self._send(200, {"houses": readings.latest()})
+            elif len(parts) == 2 and parts[0] == "recent":
+                seconds = parse_qs(url.query).get("seconds", [None])[0]
+                try:
+                    window = readings.window(parts[1], float(seconds) if seconds else None)
+                except ValueError:
+                    return self._send(400, {"error": "seconds must be a number"})
+                if window is None:
+                    return self._send(404, {"error": f"unknown house {parts[1]}"})
+                self._send(200, {"house_id": parts[1], "readings": window})
+            elif parts == ["stats"] and stats is not None:
+                self._send(200, {"max_power_kw": stats.max_power_kw, "houses": stats.summary()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Query API: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="recent-readings").start()
+    logger.info(f"Recent readings served on http://{host}:{port}/recent")
+    return server
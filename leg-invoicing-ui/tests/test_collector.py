@@ -0,0 +1,67 @@
+import asyncio
+import importlib.util
+import os
+import shutil
+
+import pytest
+import yaml
+
+pytest.importorskip("aiomqtt")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MAC = "AA-11-BB-22-CC-01"
+
+
+class FlakyStore:
+    backend = "test"
+
+    def __init__(self):
+        self.fail = True
+        self.written = []
+
+    async def write_async(self, records):
+        if self.fail:
+            raise OSError("store unavailable")
+        self.written.extend(records)
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def collector(tmp_path):
+    """The collector module loaded from a copy next to a test config (SQLite storage)."""
+    with open(os.path.join(ROOT, "config.example.yaml")) as f:
+        config = yaml.safe_load(f)
+    config["storage"] = {"backend": "sqlite", "path": "leg.db"}
+    config["collector"]["query_port"] = 0
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config))
+    shutil.copy(os.path.join(ROOT, "collector.py"), tmp_path / "collector.py")
+    spec = importlib.util.spec_from_file_location("collector_under_test", tmp_path / "collector.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    instance = module.EnergyCollector()
+    instance.store.close()
+    instance.store = FlakyStore()
+    return instance
+
+
+def delta_ei(records):
+    return next(r.fields["delta_ei_kwh"] for r in records if r.measurement == "house_energy")
+
+
+def test_failed_write_keeps_the_interval(collector):
+    collector.process_message(MAC, {"Ei": 100.0, "Eo": 50.0, "ts": 1000})
+    collector.process_message(MAC, {"Ei": 100.01, "Eo": 50.0, "ts": 1010})
+    with pytest.raises(OSError):
+        asyncio.run(collector.store_interval_data())
+    assert collector.current_interval[MAC]["delta_ei"] == pytest.approx(0.01)
+
+    # Readings after the failure are added to the retained interval
+    collector.process_message(MAC, {"Ei": 100.03, "Eo": 50.0, "ts": 1020})
+    collector.store.fail = False
+    asyncio.run(collector.store_interval_data())
+    assert delta_ei(collector.store.written) == pytest.approx(0.03)
+    assert next(r.fields["ei_kwh"] for r in collector.store.written
+                if r.measurement == "house_energy") == pytest.approx(100.03)
+    assert collector.current_interval == {}
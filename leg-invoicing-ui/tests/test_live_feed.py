@@ -0,0 +1,47 @@
+import threading
+
+from live_feed import IntervalFeed
+
+
+def test_new_subscriber_gets_latest_message():
+    feed = IntervalFeed()
+    first = feed.subscribe()
+    assert first.empty()
+    feed.publish("a")
+    feed.publish("b")
+    late = feed.subscribe()
+    assert late.get_nowait() == (2, "b")
+    assert [first.get_nowait(), first.get_nowait()] == [(1, "a"), (2, "b")]
+
+
+def test_slow_subscriber_drops_oldest():
+    feed = IntervalFeed(max_queue=3)
+    q = feed.subscribe()
+    for n in range(10):
+        feed.publish(str(n))
+    assert [q.get_nowait() for _ in range(3)] == [(8, "7"), (9, "8"), (10, "9")]
+    assert q.empty()
+
+
+def test_unsubscribe_and_count():
+    feed = IntervalFeed()
+    queues = [feed.subscribe() for _ in range(3)]
+    assert feed.subscriber_count == 3
+    feed.unsubscribe(queues[0])
+    feed.unsubscribe(queues[0])
+    assert feed.subscriber_count == 2
+    feed.publish("x")
+    assert queues[0].empty()
+    assert queues[1].get_nowait() == (1, "x")
+
+
+def test_concurrent_publishers_keep_sequence_order():
+    feed = IntervalFeed(max_queue=1000)
+    q = feed.subscribe()
+    threads = [threading.Thread(target=lambda: [feed.publish("m") for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sequences = [q.get_nowait()[0] for _ in range(400)]
+    assert sequences == list(range(1, 401))
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+from meter_stats import MeterStats
+
+
+def test_limit_scales_with_elapsed_meter_time():
+    stats = MeterStats(["1"], max_power_kw=36.0)
+    stats.reset("1", ts=1000.0, received=1000.0)
+    valid, elapsed, limit = stats.update("1", 1010.0, 0.05, 0.0, received=1010.0)
+    assert (valid, elapsed) == (True, 10.0)
+    assert limit == pytest.approx(0.1)
+    assert not stats.update("1", 1020.0, 0.2, 0.0, received=1020.0)[0]
+    # After a reconnect gap the same delta is plausible
+    valid, elapsed, _ = stats.update("1", 1320.0, 0.2, 0.0, received=1320.0)
+    assert valid and elapsed == 300.0
+
+
+def test_falls_back_to_receive_time_then_mean_interval():
+    stats = MeterStats(["1"])
+    stats.reset("1", ts=500.0, received=1000.0)
+    assert stats.update("1", 510.0, 0.0, 0.0, received=1010.0)[1] == 10.0
+    # Meter restarted (ts went back): receive time
+    assert stats.update("1", 5.0, 0.0, 0.0, received=1025.0)[1] == 15.0
+    # Neither advanced: mean inter-arrival time
+    elapsed = stats.update("1", 5.0, 0.0, 0.0, received=1025.0)[1]
+    assert 10.0 <= elapsed <= 15.0
+
+
+def test_rejected_first_reading_does_not_set_the_interval():
+    stats = MeterStats(["1"])
+    stats.reset("1", ts=0.0, received=0.0)
+    assert not stats.update("1", 600.0, 50.0, 0.0, received=600.0)[0]   # glitch after a 10 min gap
+    # Neither ts nor receive time advanced: the fallback is not the glitch's 600 s
+    valid, elapsed, _ = stats.update("1", 600.0, 0.1, 0.0, received=600.0)
+    assert elapsed == 1.0 and not valid
+
+
+def test_summary_tracks_accepted_power_only():
+    stats = MeterStats(["1", "2"], alpha=0.5)
+    stats.reset("1", ts=0.0, received=0.0)
+    for step in range(1, 21):
+        stats.update("1", step * 10.0, 0.01, 0.0, received=step * 10.0)   # 3.6 kW import
+    stats.update("1", 210.0, 50.0, 0.0, received=210.0)                  # rejected glitch
+    summary = stats.summary()
+    assert set(summary) == {"1"}
+    assert summary["1"]["samples"] == 20
+    assert summary["1"]["import_kw"] == pytest.approx(3.6)
+    assert summary["1"]["import_kw_std"] == pytest.approx(0.0, abs=1e-9)
+    assert summary["1"]["interval_s"] == pytest.approx(10.0)
+
+
+def test_unknown_house_is_not_validated():
+    valid, elapsed, limit = MeterStats(["1"]).update("99", 1.0, 1e6, 1e6)
+    assert valid and elapsed == 0.0 and math.isinf(limit)
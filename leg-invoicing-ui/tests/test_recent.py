@@ -0,0 +1,62 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from meter_stats import MeterStats
+from recent import RecentReadings, start_query_server
+
+
+def test_ring_buffer_keeps_last_readings_oldest_first():
+    readings = RecentReadings(["1"], capacity=4)
+    for step in range(7):
+        readings.append("1", ts=step * 10.0, ei=step * 0.01, eo=0.0, received=1000.0 + step)
+    window = readings.window("1")
+    assert window["ts"] == [30.0, 40.0, 50.0, 60.0]
+    assert window["import_w"] == pytest.approx([3600.0] * 4)
+    assert readings.latest()["1"]["ei"] == pytest.approx(0.06)
+    assert readings.window("2") is None
+
+
+def test_power_uses_receive_time_after_meter_restart():
+    readings = RecentReadings(["1"])
+    readings.append("1", ts=100.0, ei=1.0, eo=2.0, received=1000.0)
+    readings.append("1", ts=0.0, ei=1.001, eo=2.0, received=1002.0)
+    assert readings.window("1")["import_w"][-1] == pytest.approx(1800.0)
+    assert readings.window("1")["export_w"][-1] == 0.0
+
+
+def test_window_by_seconds():
+    readings = RecentReadings(["1"])
+    now = time.time()
+    readings.append("1", ts=1.0, ei=0.0, eo=0.0, received=now - 600)
+    readings.append("1", ts=2.0, ei=0.0, eo=0.0, received=now - 5)
+    assert readings.window("1", seconds=60)["ts"] == [2.0]
+    assert readings.latest().keys() == {"1"}
+
+
+def fetch(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_query_server():
+    readings = RecentReadings(["1", "2"])
+    readings.append("1", ts=1.0, ei=0.5, eo=0.0)
+    stats = MeterStats(["1", "2"])
+    server = start_query_server(readings, port=0, stats=stats)
+    port = server.server_address[1]
+    try:
+        assert fetch(port, "/recent") == (200, {"houses": {"1": readings.latest()["1"]}})
+        status, body = fetch(port, "/recent/1?seconds=60")
+        assert status == 200 and body["readings"]["ei"] == [0.5]
+        assert fetch(port, "/recent/9")[0] == 404
+        assert fetch(port, "/recent/1?seconds=abc")[0] == 400
+        assert fetch(port, "/stats") == (200, {"max_power_kw": 36.0, "houses": {}})
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,90 @@
+"""
+Local per-house settlement accumulators with per-period checkpoints.
+
+Running totals live in a SQLite file next to the invoicing service. Each
+update adds a range's sums and advances the period checkpoint in the same
+transaction, so an interrupted run never double-counts and resumes from
+the last committed range.
+"""
+
+import sqlite3
+from datetime import datetime
+
+from settlement import INVOICE_FIELDS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS accumulators (
+    period_id TEXT NOT NULL,
+    house_id TEXT NOT NULL,
+    {", ".join(f"{f} REAL NOT NULL DEFAULT 0" for f in INVOICE_FIELDS)},
+    PRIMARY KEY (period_id, house_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    period_id TEXT PRIMARY KEY,
+    through TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open'
+);
+"""
+
+
+class AccumulatorStore:
+    """SQLite-backed running totals per (period, house)."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def checkpoint(self, period_id: str) -> tuple[datetime | None, str]:
+        """Return (accumulated-through time, status) for a period."""
+        row = self.conn.execute(
+            "SELECT through, status FROM checkpoints WHERE period_id = ?", (period_id,)
+        ).fetchone()
+        if row is None:
+            return None, "open"
+        return datetime.fromisoformat(row[0]), row[1]
+
+    def apply(self, period_id: str, totals: dict[str, dict[str, float]], through: datetime):
+        """Add range totals to the accumulators and advance the checkpoint atomically."""
+        columns = ", ".join(INVOICE_FIELDS)
+        placeholders = ", ".join("?" for _ in INVOICE_FIELDS)
+        updates = ", ".join(f"{f} = {f} + excluded.{f}" for f in INVOICE_FIELDS)
+        rows = [
+            (period_id, house_id, *(fields.get(f, 0.0) for f in INVOICE_FIELDS))
+            for house_id, fields in totals.items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO accumulators (period_id, house_id, {columns}) "
+                f"VALUES (?, ?, {placeholders}) "
+                f"ON CONFLICT (period_id, house_id) DO UPDATE SET {updates}",
+                rows,
+            )
+            self.conn.execute(
+                "INSERT INTO checkpoints (period_id, through) VALUES (?, ?) "
+                "ON CONFLICT (period_id) DO UPDATE SET through = excluded.through",
+                (period_id, through.isoformat()),
+            )
+
+    def totals(self, period_id: str) -> dict[str, dict[str, float]]:
+        """Current accumulated totals per house for a period."""
+        cursor = self.conn.execute(
+            f"SELECT house_id, {', '.join(INVOICE_FIELDS)} FROM accumulators WHERE period_id = ?",
+            (period_id,),
+        )
+        return {row[0]: dict(zip(INVOICE_FIELDS, row[1:])) for row in cursor}
+
+    def set_status(self, period_id: str, status: str):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE checkpoints SET status = ? WHERE period_id = ?", (status, period_id)
+            )
+
+    def reset(self, period_id: str):
+        """Drop accumulators and checkpoint so the period is rebuilt from scratch."""
+        with self.conn:
+            self.conn.execute("DELETE FROM accumulators WHERE period_id = ?", (period_id,))
+            self.conn.execute("DELETE FROM checkpoints WHERE period_id = ?", (period_id,))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+LEG archiver - moves closed months from the hot store into the Parquet tier.
+
+Each month is copied one day at a time (one Parquet row group per day),
+committed to the archive manifest and only then deleted from the hot store
+(InfluxDB or SQLite, per storage.backend). Queries through TieredStore,
+the settlement engine and what-if keep returning the same totals.
+
+Usage:
+    python archiver.py                  # archive every closed month older than archive.keep_months
+    python archiver.py --month 2026-01  # archive one month
+    python archiver.py --keep-hot       # copy only, leave the hot data in place
+    python archiver.py --dry-run        # list the months that would be archived
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from archive import ParquetArchive, month_bounds, months_between
+from timeseries import create_store
+
+# Load configuration
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
+with open(CONFIG_FILE, "r") as f:
+    config = yaml.safe_load(f)
+
+_archive = config.get("archive", {})
+# Must match archive.path of every reader (settle.py, whatif.py, the invoicing UI)
+ARCHIVE_PATH = _archive.get("path")
+# Closed months kept in the hot store before they are archived
+KEEP_MONTHS = _archive.get("keep_months", 1)
+MEASUREMENTS = _archive.get("measurements", ["house_energy"])
+
+logging.basicConfig(
+    level=getattr(logging, config.get("logging", {}).get("level", "INFO")),
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def closed_months(store, archive: ParquetArchive, measurement: str, keep_months: int) -> list[str]:
+    """Months not archived yet that ended more than keep_months months ago."""
+    cutoff = datetime.now(UTC).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(keep_months):
+        cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+    start = archive.archived_until(measurement) or store.first_time(measurement)
+    if start is None or start >= cutoff:
+        return []
+    return [month for month in months_between(start, cutoff) if month not in archive.months(measurement)]
+
+
+def next_month(store, archive: ParquetArchive, measurement: str) -> str | None:
+    """The only month that may be archived next: archives grow oldest first, without gaps."""
+    start = archive.archived_until(measurement) or store.first_time(measurement)
+    return start.strftime("%Y-%m") if start else None
+
+
+def archive_month(store, archive: ParquetArchive, measurement: str, month: str, keep_hot: bool = False) -> int:
+    """Copy one month day by day into Parquet, commit it, then drop it from the hot store. Returns rows."""
+    start, stop = month_bounds(month)
+    # Schema from every field of the month, not just the first day's
+    writer = archive.month_writer(measurement, month, store.field_names(measurement, start, stop))
+    try:
+        day = start
+        while day < stop:
+            writer.write(store.read_columns(measurement, day, min(day + timedelta(days=1), stop)))
+            day += timedelta(days=1)
+        writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    if not keep_hot:
+        store.delete_range(measurement, start, stop)
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed months to Parquet")
+    parser.add_argument("--month", help="Archive only this month, YYYY-MM")
+    parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS,
+                        help="Closed months to keep in the hot store")
+    parser.add_argument("--keep-hot", action="store_true", help="Do not delete archived data from the hot store")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the months to archive")
+    args = parser.parse_args()
+
+    if not ARCHIVE_PATH:
+        logger.error("No archive.path in config.yaml")
+        sys.exit(1)
+    if args.month and month_bounds(args.month)[1] > datetime.now(UTC):
+        logger.error(f"Cannot archive {args.month}: month is not closed yet")
+        sys.exit(1)
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    store = create_store(config, base_dir, archived=False)
+    archive = ParquetArchive(os.path.join(base_dir, ARCHIVE_PATH))
+    try:
+        for measurement in MEASUREMENTS:
+            if args.month:
+                # Everything before the archive boundary is read from Parquet only
+                expected = next_month(store, archive, measurement)
+                if args.month != expected:
+                    logger.error(f"{measurement}: cannot archive {args.month}, next month to archive is {expected}")
+                    sys.exit(1)
+                months = [args.month]
+            else:
+                months = closed_months(store, archive, measurement, args.keep_months)
+            if not months:
+                logger.info(f"{measurement}: nothing to archive")
+            for month in months:
+                if args.dry_run:
+                    logger.info(f"{measurement}: would archive {month}")
+                    continue
+                started = time.perf_counter()
+                rows = archive_month(store, archive, measurement, month, args.keep_hot)
+                logger.info(
+                    f"{measurement}: archived {month} ({rows} rows) in {time.perf_counter() - started:.1f}s"
+                    f"{'' if args.keep_hot else ', removed from hot store'}"
+                )
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Invoice and settlement period records (see FSD section 3)."""
+
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+
+
+def period_bounds(period_id: str) -> tuple[datetime, datetime]:
+    """
+    Return the UTC [start, stop) range of a monthly settlement period.
+
+    Args:
+        period_id: Period in "YYYY-MM" format, e.g. "2026-01"
+    """
+    start = datetime.strptime(period_id, "%Y-%m").replace(tzinfo=UTC)
+    if start.month == 12:
+        stop = start.replace(year=start.year + 1, month=1)
+    else:
+        stop = start.replace(month=start.month + 1)
+    return start, stop
+
+
+def format_time(dt: datetime) -> str:
+    """Format a UTC datetime the way the FSD records do (2026-01-01T00:00:00Z)."""
+    return dt.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@dataclass
+class Invoice:
+    invoice_id: str
+    house_id: str
+    period_start: str
+    period_end: str
+    energy_exported_kwh: float
+    energy_imported_kwh: float
+    export_revenue_ct: float
+    import_cost_ct: float
+    net_amount_ct: float
+    status: str = "pending"
+
+    @classmethod
+    def from_totals(cls, period_id: str, house_id: str, totals: dict) -> "Invoice":
+        """Build an invoice from summed house_energy fields for one period."""
+        start, stop = period_bounds(period_id)
+        export_revenue = totals.get("value_pv_delivery_ct", 0.0)
+        import_cost = totals.get("value_consumption_ct", 0.0)
+        return cls(
+            invoice_id=f"INV-{period_id}-{house_id.zfill(3)}",
+            house_id=house_id,
+            period_start=format_time(start),
+            period_end=format_time(stop - timedelta(seconds=1)),
+            energy_exported_kwh=round(totals.get("delta_eo_kwh", 0.0), 3),
+            energy_imported_kwh=round(totals.get("delta_ei_kwh", 0.0), 3),
+            export_revenue_ct=round(export_revenue, 2),
+            import_cost_ct=round(import_cost, 2),
+            net_amount_ct=round(export_revenue - import_cost, 2),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SettlementPeriod:
+    period_id: str
+    start: str
+    end: str
+    status: str = "open"
+    invoices: list[Invoice] = field(default_factory=list)
+
+    @classmethod
+    def for_period(cls, period_id: str) -> "SettlementPeriod":
+        start, stop = period_bounds(period_id)
+        return cls(
+            period_id=period_id,
+            start=format_time(start),
+            end=format_time(stop - timedelta(seconds=1)),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
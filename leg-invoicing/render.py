@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Bulk invoice rendering for LEG-Invoicing.
+
+Renders pre-computed invoice records (a settlement period JSON written by
+settle.py) to one PDF per house and a single CSV for the whole period.
+PDFs are rendered by a process pool; the pool initializer builds each
+worker's page template once and the worker reuses it for every invoice it
+draws. A manifest of content hashes lets a re-issue skip invoices whose
+record, community name and template are unchanged.
+
+Usage:
+    python render.py invoices/2026-01.json
+    python render.py invoices/2026-01.json --workers 8 --force
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+
+from models import Invoice
+
+logger = logging.getLogger(__name__)
+
+# Bump when the PDF layout changes so every invoice is re-rendered
+TEMPLATE_VERSION = "1"
+MANIFEST_FILE = "manifest.json"
+
+CSV_COLUMNS = [
+    "invoice_id",
+    "house_id",
+    "period_start",
+    "period_end",
+    "energy_imported_kwh",
+    "energy_exported_kwh",
+    "import_cost_ct",
+    "export_revenue_ct",
+    "net_amount_ct",
+    "status",
+]
+
+
+def content_hash(invoice: dict, community_name: str) -> str:
+    """Hash of the invoice record, the printed community name and the template version."""
+    payload = json.dumps([invoice, community_name, TEMPLATE_VERSION], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def write_csv(invoices: Iterable[dict], path: str) -> int:
+    """Stream all invoices into one CSV file. Returns the row count."""
+    tmp_path = path + ".tmp"
+    rows = 0
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for invoice in invoices:
+            writer.writerow(invoice)
+            rows += 1
+    os.replace(tmp_path, path)
+    return rows
+
+
+class InvoiceTemplate:
+    """Static PDF page layout, built once per worker process."""
+
+    def __init__(self, community_name: str):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.pdfgen import canvas
+
+        self.canvas_class = canvas.Canvas
+        self.page_size = A4
+        self.community_name = community_name
+        width, height = A4
+        self.left = 20 * mm
+        self.right = width - 20 * mm
+        self.top = height - 25 * mm
+        self.line = 8 * mm
+        self.energy_col = self.right - 60 * mm
+        self.rows = [
+            ("Energy imported", "energy_imported_kwh", "kWh", "import_cost_ct"),
+            ("Energy exported", "energy_exported_kwh", "kWh", "export_revenue_ct"),
+        ]
+
+    def render(self, invoice: dict, path: str):
+        c = self.canvas_class(path, pagesize=self.page_size)
+        y = self.top
+
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(self.left, y, self.community_name)
+        c.setFont("Helvetica", 10)
+        c.drawRightString(self.right, y, f"Invoice {invoice['invoice_id']}")
+        y -= 2 * self.line
+
+        c.setFont("Helvetica", 11)
+        c.drawString(self.left, y, f"House: {invoice['house_id']}")
+        y -= self.line
+        c.drawString(self.left, y, f"Period: {invoice['period_start']} - {invoice['period_end']}")
+        y -= 2 * self.line
+
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(self.left, y, "Item")
+        c.drawRightString(self.energy_col, y, "Energy")
+        c.drawRightString(self.right, y, "Amount (ct)")
+        y -= 2
+        c.line(self.left, y, self.right, y)
+        y -= self.line
+
+        c.setFont("Helvetica", 11)
+        for label, energy_key, unit, amount_key in self.rows:
+            c.drawString(self.left, y, label)
+            c.drawRightString(self.energy_col, y, f"{invoice[energy_key]:.3f} {unit}")
+            c.drawRightString(self.right, y, f"{invoice[amount_key]:.2f}")
+            y -= self.line
+
+        c.line(self.left, y + self.line / 2, self.right, y + self.line / 2)
+        c.setFont("Helvetica-Bold", 12)
+        net = invoice["net_amount_ct"]
+        c.drawString(self.left, y, "Net amount (credit)" if net >= 0 else "Net amount (due)")
+        c.drawRightString(self.right, y, f"{net:.2f} ct  ({net / 100:.2f} CHF)")
+
+        c.showPage()
+        c.save()
+
+
+@cache
+def _worker_template(community_name: str) -> InvoiceTemplate:
+    """The worker process's template for a community, built on first use."""
+    return InvoiceTemplate(community_name)
+
+
+def _init_worker(community_name: str):
+    """Pool initializer: build the template before the worker takes its first job."""
+    _worker_template(community_name)
+
+
+def _render_one(job: tuple) -> str:
+    invoice, path, community_name = job
+    tmp_path = path + ".tmp"
+    _worker_template(community_name).render(invoice, tmp_path)
+    os.replace(tmp_path, path)
+    return invoice["invoice_id"]
+
+
+def load_manifest(out_dir: str) -> dict[str, str]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(out_dir: str, manifest: dict[str, str]):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def render_pdfs(
+    invoices: list[dict],
+    out_dir: str,
+    community_name: str,
+    workers: int = 4,
+    force: bool = False,
+) -> dict[str, int]:
+    """
+    Render one PDF per invoice into out_dir with a process pool.
+
+    Invoices whose content hash matches the manifest (and whose PDF exists)
+    are skipped unless force is set. Returns rendered/skipped counts.
+    """
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        raise RuntimeError("PDF export requires reportlab (pip install reportlab)")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(out_dir)
+
+    jobs = []
+    hashes = {}
+    for invoice in invoices:
+        invoice_id = invoice["invoice_id"]
+        digest = content_hash(invoice, community_name)
+        path = os.path.join(out_dir, f"{invoice_id}.pdf")
+        hashes[invoice_id] = digest
+        if manifest.get(invoice_id) == digest and os.path.exists(path):
+            continue
+        jobs.append((invoice, path, community_name))
+
+    try:
+        if jobs:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(community_name,)
+            ) as pool:
+                for invoice_id in pool.map(_render_one, jobs, chunksize=chunksize):
+                    manifest[invoice_id] = hashes[invoice_id]
+    finally:
+        # Keep progress of an interrupted batch so the re-run skips finished PDFs
+        save_manifest(out_dir, manifest)
+    return {"rendered": len(jobs), "skipped": len(invoices) - len(jobs)}
+
+
+def render_period(
+    period: dict,
+    out_dir: str,
+    community_name: str,
+    workers: int = 4,
+    force: bool = False,
+    pdf: bool = True,
+) -> dict[str, int]:
+    """Render a settlement period dict: <period>.csv plus per-house PDFs."""
+    invoices = period["invoices"]
+    os.makedirs(out_dir, exist_ok=True)
+    rows = write_csv(invoices, os.path.join(out_dir, f"{period['period_id']}.csv"))
+    result = {"csv_rows": rows, "rendered": 0, "skipped": 0}
+    if pdf:
+        result.update(render_pdfs(invoices, out_dir, community_name, workers, force))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render invoices of a settled period")
+    parser.add_argument("settlement", help="Settlement JSON written by settle.py")
+    parser.add_argument("--output", help="Output directory (default: next to the JSON)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--community", default="LEG Community", help="Name printed on invoices")
+    parser.add_argument("--force", action="store_true", help="Re-render unchanged invoices")
+    parser.add_argument("--csv-only", action="store_true", help="Skip PDF rendering")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    with open(args.settlement, "r") as f:
+        period = json.load(f)
+    # Validate records before fanning out to workers
+    for invoice in period["invoices"]:
+        Invoice(**invoice)
+
+    out_dir = args.output or os.path.splitext(args.settlement)[0]
+    started = time.perf_counter()
+    result = render_period(
+        period, out_dir, args.community, args.workers, args.force, pdf=not args.csv_only
+    )
+    logger.info(
+        f"Rendered {period['period_id']}: {result['csv_rows']} CSV rows, "
+        f"{result['rendered']} PDFs, {result['skipped']} unchanged "
+        f"in {time.perf_counter() - started:.2f}s -> {out_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+LEG Invoicing CLI - settles a monthly period and writes its invoices.
+
+Usage:
+    python settle.py 2026-01                 # close period from checkpointed accumulators
+    python settle.py 2026-01 --full          # ignore accumulators, sum the whole month
+    python settle.py --accumulate            # advance the current period (run periodically)
+    python settle.py 2026-01 --render        # also write <period>.csv and per-house PDFs
+    python settle.py 2026-01 --workers 8 --output invoices/
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import UTC, datetime
+
+import yaml
+from accumulators import AccumulatorStore
+from render import render_period
+from settlement import SettlementEngine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from timeseries import create_store
+
+# Load configuration
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
+with open(CONFIG_FILE, "r") as f:
+    config = yaml.safe_load(f)
+
+_invoicing = config.get("invoicing", {})
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), _invoicing.get("output_dir", "invoices"))
+WORKERS = _invoicing.get("workers", 4)
+SHARD_SIZE = _invoicing.get("shard_size", 500)
+STORE_FILE = os.path.join(os.path.dirname(__file__), _invoicing.get("store", "settlement.db"))
+LAG_SECONDS = _invoicing.get("lag_seconds", 120)
+CHUNK_HOURS = _invoicing.get("chunk_hours", 24)
+COMMUNITY_NAME = _invoicing.get("community_name", "LEG Community")
+RENDER_WORKERS = _invoicing.get("render_workers", os.cpu_count() or 4)
+
+logging.basicConfig(
+    level=getattr(logging, config.get("logging", {}).get("level", "INFO")),
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Settle a monthly LEG period")
+    parser.add_argument(
+        "period", nargs="?", default=datetime.now(UTC).strftime("%Y-%m"),
+        help="Settlement period, YYYY-MM (default: current month)",
+    )
+    parser.add_argument("--accumulate", action="store_true",
+                        help="Only advance the period's accumulators, do not close it")
+    parser.add_argument("--full", action="store_true",
+                        help="Sum the whole period from the time-series store, bypassing accumulators")
+    parser.add_argument("--reset", action="store_true",
+                        help="Discard the period's accumulators and checkpoint first")
+    parser.add_argument("--render", action="store_true",
+                        help="Render the period CSV and per-house PDFs after settling")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Parallel house shard queries")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Houses per query shard")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directory for the settlement JSON")
+    args = parser.parse_args(argv)
+    # --full bypasses the accumulators, so options that act on them cannot apply
+    for option in ("accumulate", "reset"):
+        if args.full and getattr(args, option):
+            parser.error(f"--{option} cannot be combined with --full")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    # storage.backend (InfluxDB or SQLite), with the Parquet archive behind it if archive.path is set
+    series_store = create_store(config, os.path.dirname(os.path.abspath(__file__)))
+    engine = SettlementEngine(
+        series_store, workers=args.workers, shard_size=args.shard_size,
+        lag_seconds=LAG_SECONDS, chunk_hours=CHUNK_HOURS,
+    )
+    store = None if args.full else AccumulatorStore(STORE_FILE)
+
+    started = time.perf_counter()
+    try:
+        if args.reset:
+            store.reset(args.period)
+        if args.accumulate:
+            through = engine.accumulate(store, args.period)
+            logger.info(f"{args.period} accumulated through {through.isoformat()}")
+            return
+        period = engine.settle(args.period, store)
+    except ValueError as e:
+        logger.error(f"Cannot settle '{args.period}': {e}")
+        sys.exit(1)
+    finally:
+        series_store.close()
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - started
+
+    os.makedirs(args.output, exist_ok=True)
+    out_file = os.path.join(args.output, f"{args.period}.json")
+    with open(out_file, "w") as f:
+        json.dump(period.to_dict(), f, indent=2)
+
+    total_net = sum(inv.net_amount_ct for inv in period.invoices)
+    logger.info(
+        f"Settled {args.period}: {len(period.invoices)} invoices, "
+        f"net {total_net:.2f} ct in {elapsed:.2f}s -> {out_file}"
+    )
+
+    if args.render:
+        render_dir = os.path.join(args.output, args.period)
+        result = render_period(period.to_dict(), render_dir, COMMUNITY_NAME, RENDER_WORKERS)
+        logger.info(
+            f"Rendered {result['rendered']} PDFs ({result['skipped']} unchanged) "
+            f"and {result['csv_rows']} CSV rows -> {render_dir}"
+        )
+
+
+if __name__ == "__main__":
+    main()
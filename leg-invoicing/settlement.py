@@ -0,0 +1,140 @@
+"""
+Settlement engine for LEG-Invoicing.
+
+Computes per-house invoices for a settlement period from the collector's
+house_energy measurement. Data is read through the leg-common storage
+interface (timeseries.create_store), so InfluxDB and SQLite work alike.
+Summing happens inside the store (Flux or SQL, hourly rollups for SQLite)
+and only per-house totals come back, so memory stays bounded by the number
+of houses rather than the number of stored intervals. Large communities are
+split into house shards that are queried in parallel.
+
+With an AccumulatorStore the engine works incrementally: each run only
+queries the range since the period's checkpoint, and closing a period
+reads the accumulated totals instead of the whole month.
+
+With an archive configured, the store is a TieredStore (leg-common/archive.py):
+ranges before the archive boundary are summed from the Parquet tier
+(invoice columns only) and the rest from the hot store.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+
+from models import Invoice, SettlementPeriod, format_time, period_bounds
+
+logger = logging.getLogger(__name__)
+
+# house_energy fields that make up an invoice
+INVOICE_FIELDS = (
+    "delta_ei_kwh",
+    "delta_eo_kwh",
+    "value_consumption_ct",
+    "value_pv_delivery_ct",
+)
+
+
+class SettlementEngine:
+    """Settles periods with one aggregated query per house shard."""
+
+    def __init__(
+        self,
+        series_store,
+        workers: int = 4,
+        shard_size: int = 500,
+        lag_seconds: int = 120,
+        chunk_hours: int = 24,
+    ):
+        # Time-series store (timeseries.py): InfluxStore, SQLiteStore or a TieredStore over either
+        self.series_store = series_store
+        self.workers = workers
+        self.shard_size = shard_size
+        # Data newer than this is not accumulated yet (collector writes may still arrive)
+        self.lag = timedelta(seconds=lag_seconds)
+        # Catch-up is committed in chunks so an interrupted run resumes mid-period
+        self.chunk = timedelta(hours=chunk_hours)
+
+    def house_ids(self, start: datetime, stop: datetime) -> list[str]:
+        """house_id values that have house_energy data in the range."""
+        return self.series_store.house_ids("house_energy", start, stop)
+
+    def shard_totals(
+        self, start: datetime, stop: datetime, house_ids: list[str] | None = None
+    ) -> dict[str, dict[str, float]]:
+        """Invoice field sums per house for the range, optionally limited to some houses."""
+        return self.series_store.sum_fields(
+            "house_energy", start, stop, by_house=True, fields=list(INVOICE_FIELDS), house_ids=house_ids
+        )
+
+    def period_totals(self, start: datetime, stop: datetime) -> dict[str, dict[str, float]]:
+        """Sum invoice fields per house over the range, querying house shards in parallel."""
+        house_ids = self.house_ids(start, stop)
+        if not house_ids:
+            return {}
+
+        shards = [house_ids[i:i + self.shard_size] for i in range(0, len(house_ids), self.shard_size)]
+        logger.info(f"Settling {len(house_ids)} houses in {len(shards)} shard(s)")
+
+        def run_shard(shard: list[str]) -> dict[str, dict[str, float]]:
+            # Single shard covers everything - skip the house filter
+            return self.shard_totals(start, stop, shard if len(shards) > 1 else None)
+
+        totals: dict[str, dict[str, float]] = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(shards))) as pool:
+            for shard_totals in pool.map(run_shard, shards):
+                totals.update(shard_totals)
+        return totals
+
+    def accumulate(self, store, period_id: str, until: datetime | None = None) -> datetime:
+        """
+        Bring a period's accumulators up to date from its checkpoint.
+
+        Queries only [checkpoint, until) in chunks, committing each chunk
+        with its checkpoint. Returns the new checkpoint.
+        """
+        start, stop = period_bounds(period_id)
+        horizon = datetime.now(UTC) - self.lag
+        until = min(until or horizon, horizon, stop)
+
+        through, status = store.checkpoint(period_id)
+        if status == "closed":
+            return through
+        position = through or start
+
+        while position < until:
+            chunk_end = min(position + self.chunk, until)
+            totals = self.period_totals(position, chunk_end)
+            store.apply(period_id, totals, chunk_end)
+            logger.info(
+                f"Accumulated {period_id} through {format_time(chunk_end)} ({len(totals)} houses)"
+            )
+            position = chunk_end
+        return position
+
+    def settle(self, period_id: str, store=None) -> SettlementPeriod:
+        """
+        Compute all invoices for a monthly period ("YYYY-MM").
+
+        Without a store the whole period is summed in one pass. With a store
+        the accumulators are caught up from the last checkpoint and the
+        period is closed from them.
+        """
+        start, stop = period_bounds(period_id)
+        if store is None:
+            totals = self.period_totals(start, stop)
+        else:
+            through = self.accumulate(store, period_id)
+            if through < stop:
+                raise ValueError(
+                    f"period not complete yet (accumulated through {format_time(through)})"
+                )
+            store.set_status(period_id, "closed")
+            totals = store.totals(period_id)
+
+        period = SettlementPeriod.for_period(period_id)
+        if store is not None:
+            period.status = "closed"
+        for house_id in sorted(totals, key=lambda h: (len(h), h)):
+            period.invoices.append(Invoice.from_totals(period_id, house_id, totals[house_id]))
+        return period
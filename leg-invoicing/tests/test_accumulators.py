@@ -0,0 +1,51 @@
+from datetime import UTC, datetime
+
+import pytest
+from accumulators import AccumulatorStore
+
+THROUGH = datetime(2026, 1, 5, tzinfo=UTC)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AccumulatorStore(str(tmp_path / "settlement.db"))
+    yield store
+    store.close()
+
+
+def test_new_period_is_open_without_checkpoint(store):
+    assert store.checkpoint("2026-01") == (None, "open")
+    assert store.totals("2026-01") == {}
+
+
+def test_apply_adds_up_and_advances_checkpoint(store):
+    store.apply("2026-01", {"1": {"delta_ei_kwh": 1.5, "value_consumption_ct": 30.0}}, THROUGH)
+    store.apply("2026-01", {"1": {"delta_ei_kwh": 0.5}, "2": {"delta_eo_kwh": 2.0}},
+                THROUGH.replace(day=6))
+    totals = store.totals("2026-01")
+    assert totals["1"]["delta_ei_kwh"] == pytest.approx(2.0)
+    assert totals["1"]["value_consumption_ct"] == pytest.approx(30.0)
+    assert totals["2"] == {"delta_ei_kwh": 0.0, "delta_eo_kwh": 2.0,
+                           "value_consumption_ct": 0.0, "value_pv_delivery_ct": 0.0}
+    assert store.checkpoint("2026-01") == (THROUGH.replace(day=6), "open")
+    assert store.totals("2026-02") == {}
+
+
+def test_status_and_reset(store):
+    store.apply("2026-01", {"1": {"delta_ei_kwh": 1.0}}, THROUGH)
+    store.set_status("2026-01", "closed")
+    assert store.checkpoint("2026-01") == (THROUGH, "closed")
+    store.reset("2026-01")
+    assert store.checkpoint("2026-01") == (None, "open")
+    assert store.totals("2026-01") == {}
+
+
+def test_totals_survive_reopen(tmp_path):
+    path = str(tmp_path / "settlement.db")
+    store = AccumulatorStore(path)
+    store.apply("2026-01", {"7": {"value_pv_delivery_ct": 12.5}}, THROUGH)
+    store.close()
+    reopened = AccumulatorStore(path)
+    assert reopened.totals("2026-01")["7"]["value_pv_delivery_ct"] == 12.5
+    assert reopened.checkpoint("2026-01")[0] == THROUGH
+    reopened.close()
@@ -0,0 +1,42 @@
+import csv
+import os
+
+import pytest
+from models import Invoice
+from render import content_hash, render_period
+
+pytest.importorskip("reportlab")
+
+
+def period(houses=3):
+    return {
+        "period_id": "2026-01",
+        "invoices": [Invoice.from_totals("2026-01", str(h), {"delta_ei_kwh": 10.0 * h, "value_consumption_ct": 250.0,
+                                                             "value_pv_delivery_ct": 40.0}).to_dict()
+                     for h in range(1, houses + 1)],
+    }
+
+
+def test_content_hash_covers_community_name():
+    invoice = period(1)["invoices"][0]
+    assert content_hash(invoice, "A") == content_hash(dict(invoice), "A")
+    assert content_hash(invoice, "A") != content_hash(invoice, "B")
+    assert content_hash(invoice, "A") != content_hash({**invoice, "net_amount_ct": 0.0}, "A")
+
+
+def test_render_period_skips_unchanged(tmp_path):
+    out = str(tmp_path / "2026-01")
+    data = period()
+    assert render_period(data, out, "Sonnenweg", workers=2) == {"csv_rows": 3, "rendered": 3, "skipped": 0}
+    assert sorted(os.listdir(out)) == ["2026-01.csv", "INV-2026-01-001.pdf", "INV-2026-01-002.pdf",
+                                       "INV-2026-01-003.pdf", "manifest.json"]
+    with open(os.path.join(out, "2026-01.csv")) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["house_id"] for row in rows] == ["1", "2", "3"]
+
+    assert render_period(data, out, "Sonnenweg", workers=2)["skipped"] == 3
+    data["invoices"][1]["net_amount_ct"] = 1.0
+    assert render_period(data, out, "Sonnenweg", workers=2)["rendered"] == 1
+    # A renamed community changes every PDF
+    assert render_period(data, out, "Sonnenweg 2", workers=2)["rendered"] == 3
+    assert render_period(data, out, "Sonnenweg 2", workers=2, force=True)["rendered"] == 3
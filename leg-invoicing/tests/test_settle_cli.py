@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import shutil
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+@pytest.fixture
+def settle(tmp_path):
+    """The settle CLI module loaded from a copy next to the example config."""
+    shutil.copy(os.path.join(ROOT, "config.example.yaml"), tmp_path / "config.yaml")
+    shutil.copy(os.path.join(ROOT, "settle.py"), tmp_path / "settle.py")
+    spec = importlib.util.spec_from_file_location("settle_under_test", tmp_path / "settle.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("option", ["--reset", "--accumulate"])
+def test_full_rejects_accumulator_options(settle, capsys, option):
+    with pytest.raises(SystemExit) as exit_info:
+        settle.parse_args(["2026-01", "--full", option])
+    assert exit_info.value.code == 2
+    assert f"{option} cannot be combined with --full" in capsys.readouterr().err
+
+
+def test_reset_with_accumulators(settle):
+    args = settle.parse_args(["2026-01", "--reset"])
+    assert (args.period, args.reset, args.full) == ("2026-01", True, False)
@@ -0,0 +1,98 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from accumulators import AccumulatorStore
+from settlement import INVOICE_FIELDS, SettlementEngine
+from timeseries import Record, SQLiteStore
+
+JAN = datetime(2026, 1, 1, tzinfo=UTC)
+HOUSES = 12
+
+
+@pytest.fixture
+def series(tmp_path):
+    """Two readings per day for January and the first day of February."""
+    store = SQLiteStore(str(tmp_path / "leg.db"))
+    time = JAN
+    while time < JAN + timedelta(days=32):
+        store.write([Record("house_energy", {"delta_ei_kwh": 0.1 * h, "delta_eo_kwh": 0.05,
+                                             "value_consumption_ct": 3.0 * h, "value_pv_delivery_ct": 1.0,
+                                             "ei_kwh": 1000.0}, {"house_id": str(h)}, time)
+                     for h in range(1, HOUSES + 1)])
+        time += timedelta(hours=12)
+    yield store
+    store.close()
+
+
+def test_shards_match_single_query(series):
+    stop = JAN + timedelta(days=31)
+    single = SettlementEngine(series, shard_size=1000).period_totals(JAN, stop)
+    sharded = SettlementEngine(series, workers=3, shard_size=5).period_totals(JAN, stop)
+    assert set(single) == {str(h) for h in range(1, HOUSES + 1)}
+    assert sharded.keys() == single.keys()
+    for house, totals in single.items():
+        assert set(totals) == set(INVOICE_FIELDS)
+        assert sharded[house] == pytest.approx(totals)
+
+
+def test_settle_builds_invoices(series):
+    period = SettlementEngine(series, shard_size=4).settle("2026-01")
+    assert [invoice.house_id for invoice in period.invoices] == [str(h) for h in range(1, HOUSES + 1)]
+    invoice = period.invoices[2]
+    assert invoice.invoice_id == "INV-2026-01-003"
+    assert invoice.energy_imported_kwh == pytest.approx(0.3 * 62)
+    assert invoice.net_amount_ct == pytest.approx(62 * (1.0 - 9.0))
+    assert period.status == "open"
+
+
+def test_incremental_matches_one_pass(series, tmp_path):
+    engine = SettlementEngine(series, shard_size=5, chunk_hours=72)
+    store = AccumulatorStore(str(tmp_path / "settlement.db"))
+    assert engine.accumulate(store, "2026-01", until=JAN + timedelta(days=10)) == JAN + timedelta(days=10)
+    closed = engine.settle("2026-01", store)
+    one_pass = engine.settle("2026-01")
+    assert closed.status == "closed"
+    assert [i.to_dict() | {"status": None} for i in closed.invoices] == \
+        [i.to_dict() | {"status": None} for i in one_pass.invoices]
+    store.close()
+
+
+class FailingStore:
+    """Series store that fails after a number of sum queries, like a dropped connection."""
+
+    def __init__(self, store, fail_after):
+        self.store = store
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def house_ids(self, *args, **kwargs):
+        return self.store.house_ids(*args, **kwargs)
+
+    def sum_fields(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise ConnectionError("store went away")
+        return self.store.sum_fields(*args, **kwargs)
+
+
+def test_interrupted_run_resumes_from_checkpoint(series, tmp_path):
+    store = AccumulatorStore(str(tmp_path / "settlement.db"))
+    failing = FailingStore(series, fail_after=3)
+    with pytest.raises(ConnectionError):
+        SettlementEngine(failing, shard_size=1000, chunk_hours=48).settle("2026-01", store)
+    through, status = store.checkpoint("2026-01")
+    assert (through, status) == (JAN + timedelta(days=6), "open")
+
+    resumed = SettlementEngine(series, shard_size=1000, chunk_hours=48).settle("2026-01", store)
+    expected = SettlementEngine(series).settle("2026-01")
+    assert [i.import_cost_ct for i in resumed.invoices] == [i.import_cost_ct for i in expected.invoices]
+    store.close()
+
+
+def test_open_period_cannot_close(series, tmp_path):
+    engine = SettlementEngine(series)
+    store = AccumulatorStore(str(tmp_path / "settlement.db"))
+    month = datetime.now(UTC).strftime("%Y-%m")
+    with pytest.raises(ValueError, match="not complete"):
+        engine.settle(month, store)
+    store.close()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Break-even what-if analysis for LEG-Invoicing.
+
+Re-prices a historical period under alternative tariff policies. The
+period's per-house import/export series is loaded once into interval x
+house arrays; the shared break-even rules (leg-common/breakeven.py,
+FSD 14.5) are then evaluated for all candidate tariff sets at once with
+NumPy broadcasting, so scanning hundreds of scenarios stays interactive.
+
+Usage:
+    python whatif.py 2026-01 --p-pv 10:25:2.5 --p-grid-con 28,30,32 --p-grid-del 6
+    python whatif.py 2026-01 --p-pv 20 --resolution 600 --output whatif.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+import yaml
+from models import period_bounds
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from breakeven import breakeven_tariffs
+from timeseries import create_store
+
+# Load configuration
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
+with open(CONFIG_FILE, "r") as f:
+    config = yaml.safe_load(f)
+
+# Re-pricing resolution; should match the collector interval for exact results
+RESOLUTION_SECONDS = config.get("invoicing", {}).get("whatif_resolution", 60)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PeriodSeries:
+    """Per-interval house imports (ei) and exports (eo) in kWh, shape (intervals, houses)."""
+    start: datetime
+    resolution_s: int
+    house_ids: list[str]
+    ei: np.ndarray
+    eo: np.ndarray
+
+
+@dataclass
+class RepricingResult:
+    """Totals per scenario (axis 0) and, for houses, per house (axis 1)."""
+    scenarios: np.ndarray            # (S, 3): p_pv, p_grid_con, p_grid_del
+    house_ids: list[str]
+    house_cost_ct: np.ndarray        # (S, H) consumption cost
+    house_revenue_ct: np.ndarray     # (S, H) PV delivery credit
+    grid_import_ct: np.ndarray       # (S,)
+    grid_export_ct: np.ndarray       # (S,)
+    mean_p_con: np.ndarray           # (S,) consumption-weighted
+    mean_p_pv: np.ndarray            # (S,) production-weighted
+
+    @property
+    def community_profit_ct(self) -> np.ndarray:
+        return (
+            self.house_cost_ct.sum(axis=1) + self.grid_export_ct
+            - self.house_revenue_ct.sum(axis=1) - self.grid_import_ct
+        )
+
+
+def load_series(series_store, start: datetime, stop: datetime,
+                resolution_s: int = RESOLUTION_SECONDS) -> PeriodSeries:
+    """
+    Load delta_ei/delta_eo per house from the time-series store (archive
+    and hot store alike), one day at a time, summed into fixed windows.
+    Memory is bounded by the (intervals, houses) result plus one day of rows.
+    """
+    intervals = int(-(-(stop - start).total_seconds() // resolution_s))
+    house_index: dict[str, int] = {}
+    rows, cols, ei_values, eo_values = [], [], [], []
+
+    start_ms = int(start.timestamp() * 1000)
+    day = start
+    while day < stop:
+        day_stop = min(day + timedelta(days=1), stop)
+        columns = series_store.read_columns("house_energy", day, day_stop, fields=["delta_ei_kwh", "delta_eo_kwh"])
+        if columns["time"]:
+            count = len(columns["time"])
+            rows.extend(((np.asarray(columns["time"], dtype=np.int64) - start_ms) // (resolution_s * 1000)).tolist())
+            cols.extend(house_index.setdefault(str(h), len(house_index)) for h in columns["house_id"])
+            ei_values.extend(v or 0.0 for v in columns.get("delta_ei_kwh", [None] * count))
+            eo_values.extend(v or 0.0 for v in columns.get("delta_eo_kwh", [None] * count))
+        day = day_stop
+    return _period_series(start, resolution_s, intervals, house_index, rows, cols, ei_values, eo_values)
+
+
+def _period_series(start: datetime, resolution_s: int, intervals: int, house_index: dict[str, int],
+                   rows: list, cols: list, ei_values: list, eo_values: list) -> PeriodSeries:
+    """Scatter (interval, house) values into dense arrays with houses in id order."""
+    ei = np.zeros((intervals, len(house_index)), dtype=np.float64)
+    eo = np.zeros_like(ei)
+    np.add.at(ei, (rows, cols), ei_values)
+    np.add.at(eo, (rows, cols), eo_values)
+
+    house_ids = sorted(house_index, key=lambda h: (len(h), h))
+    order = [house_index[h] for h in house_ids]
+    return PeriodSeries(start, resolution_s, house_ids, ei[:, order], eo[:, order])
+
+
+def reprice(series: PeriodSeries, scenarios: np.ndarray) -> RepricingResult:
+    """
+    Apply the break-even rules for every scenario row (p_pv, p_grid_con, p_grid_del).
+
+    Per-house totals are matrix products of the (S, T) tariff series with the
+    (T, H) energy series.
+    """
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=np.float64))
+    p_pv = scenarios[:, 0:1]
+    p_grid_con = scenarios[:, 1:2]
+    p_grid_del = scenarios[:, 2:3]
+
+    I = series.ei.sum(axis=1)
+    E = series.eo.sum(axis=1)
+    p_con, p_pv_eff = breakeven_tariffs(E, I, p_pv, p_grid_con, p_grid_del)
+
+    grid_import = np.maximum(I - E, 0.0).sum()
+    grid_export = np.maximum(E - I, 0.0).sum()
+    total_i = I.sum()
+    total_e = E.sum()
+
+    return RepricingResult(
+        scenarios=scenarios,
+        house_ids=series.house_ids,
+        house_cost_ct=p_con @ series.ei,
+        house_revenue_ct=p_pv_eff @ series.eo,
+        grid_import_ct=p_grid_con[:, 0] * grid_import,
+        grid_export_ct=p_grid_del[:, 0] * grid_export,
+        mean_p_con=(p_con @ I) / total_i if total_i > 0 else p_grid_con[:, 0],
+        mean_p_pv=(p_pv_eff @ E) / total_e if total_e > 0 else p_pv[:, 0],
+    )
+
+
+def parse_values(spec: str) -> list[float]:
+    """Parse "20", "28,30,32" or a "start:stop:step" range (stop inclusive)."""
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        return list(np.round(np.arange(start, stop + step / 2, step), 6))
+    return [float(v) for v in spec.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-price a period under alternative tariffs")
+    parser.add_argument("period", help="Period, YYYY-MM")
+    parser.add_argument("--p-pv", default=str(config.get("tariffs", {}).get("p_pv", 20.0)))
+    parser.add_argument("--p-grid-con", default=str(config.get("tariffs", {}).get("p_grid_con", 30.0)))
+    parser.add_argument("--p-grid-del", default=str(config.get("tariffs", {}).get("p_grid_del", 6.0)))
+    parser.add_argument("--resolution", type=int, default=RESOLUTION_SECONDS, help="Interval seconds")
+    parser.add_argument("--top", type=int, default=20, help="Scenarios to print")
+    parser.add_argument("--output", help="Write per-house totals for all scenarios as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    scenarios = np.array(list(itertools.product(
+        parse_values(args.p_pv), parse_values(args.p_grid_con), parse_values(args.p_grid_del)
+    )))
+
+    start, stop = period_bounds(args.period)
+    # storage.backend (InfluxDB or SQLite), with the Parquet archive behind it if archive.path is set
+    series_store = create_store(config, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        started = time.perf_counter()
+        series = load_series(series_store, start, stop, args.resolution)
+        loaded = time.perf_counter()
+    finally:
+        series_store.close()
+
+    result = reprice(series, scenarios)
+    priced = time.perf_counter()
+    logger.info(
+        f"{len(series.house_ids)} houses x {series.ei.shape[0]} intervals loaded in "
+        f"{loaded - started:.2f}s, {len(scenarios)} scenarios priced in {priced - loaded:.3f}s"
+    )
+
+    house_cost = result.house_cost_ct.sum(axis=1)
+    house_revenue = result.house_revenue_ct.sum(axis=1)
+    print(f"{'p_pv':>6} {'p_gcon':>6} {'p_gdel':>6} {'cost ct':>12} {'credit ct':>12} "
+          f"{'avg p_con':>9} {'avg p_pv':>8} {'profit ct':>10}")
+    for s in np.argsort(house_cost)[:args.top]:
+        p_pv, p_gcon, p_gdel = result.scenarios[s]
+        print(f"{p_pv:6.2f} {p_gcon:6.2f} {p_gdel:6.2f} {house_cost[s]:12.2f} "
+              f"{house_revenue[s]:12.2f} {result.mean_p_con[s]:9.2f} {result.mean_p_pv[s]:8.2f} "
+              f"{result.community_profit_ct[s]:10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "period_id": args.period,
+                "resolution_s": args.resolution,
+                "scenarios": [
+                    {
+                        "p_pv": float(result.scenarios[s, 0]),
+                        "p_grid_con": float(result.scenarios[s, 1]),
+                        "p_grid_del": float(result.scenarios[s, 2]),
+                        "grid_import_ct": round(float(result.grid_import_ct[s]), 2),
+                        "grid_export_ct": round(float(result.grid_export_ct[s]), 2),
+                        "houses": {
+                            house_id: {
+                                "import_cost_ct": round(float(result.house_cost_ct[s, h]), 2),
+                                "export_revenue_ct": round(float(result.house_revenue_ct[s, h]), 2),
+                            }
+                            for h, house_id in enumerate(result.house_ids)
+                        },
+                    }
+                    for s in range(len(result.scenarios))
+                ],
+            }, f, indent=2)
+        logger.info(f"Wrote per-house totals to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
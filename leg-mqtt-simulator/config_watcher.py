@@ -0,0 +1,95 @@
+"""Hot reload of the simulator's config.yaml."""
+
+import logging
+import os
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Keys every house entry needs (ev_schedule as well when has_ev is set)
+REQUIRED_HOUSE_KEYS = ("id", "mac", "smid", "pv_kwp", "has_ev")
+
+
+def validate_config(config) -> None:
+    """Raise TypeError/ValueError if a config cannot be applied (structure, house entries, simulator section)."""
+    if not isinstance(config, dict):
+        raise TypeError("config is not a mapping")
+    simulator = config.get("simulator")
+    if not isinstance(simulator, dict):
+        raise TypeError("missing 'simulator' section")
+    interval = simulator.get("update_interval")
+    if not isinstance(interval, (int, float)) or interval <= 0:
+        raise ValueError("simulator.update_interval must be a positive number")
+    spread = simulator.get("publish_spread", 0.9)
+    if not isinstance(spread, (int, float)) or not 0 <= spread <= 1:
+        raise ValueError("simulator.publish_spread must be between 0 and 1")
+
+    houses = config.get("houses")
+    if not isinstance(houses, list):
+        raise TypeError("'houses' must be a list")
+    macs = set()
+    for index, house in enumerate(houses):
+        if not isinstance(house, dict):
+            raise TypeError(f"house entry {index} is not a mapping")
+        missing = [key for key in REQUIRED_HOUSE_KEYS if house.get(key) is None]
+        if missing:
+            raise ValueError(f"house entry {index} is missing {', '.join(missing)}")
+        if house["has_ev"] and house.get("ev_schedule") not in ("day", "night"):
+            raise ValueError(f"house {house['id']}: ev_schedule must be 'day' or 'night' with has_ev")
+        if not isinstance(house["pv_kwp"], (int, float)):
+            raise TypeError(f"house {house['id']}: pv_kwp must be a number")
+        if house["mac"] in macs:
+            raise ValueError(f"duplicate house MAC {house['mac']}")
+        macs.add(house["mac"])
+
+
+class ConfigWatcher:
+    """
+    Polls the config file's mtime from the main loop (no extra thread).
+
+    poll() returns the new config once after the file changed, provided it
+    parses and passes validate_config(); a broken edit is logged and the
+    running configuration is kept.
+    """
+
+    def __init__(self, path: str, poll_s: float = 5.0):
+        self.path = path
+        self.poll_s = poll_s
+        self._mtime = os.stat(path).st_mtime_ns
+        self._next_check = time.monotonic() + poll_s
+
+    def poll(self) -> dict | None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.poll_s
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Cannot stat {self.path}: {e}")
+            return None
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+
+        try:
+            with open(self.path, "r") as f:
+                config = yaml.safe_load(f)
+            validate_config(config)
+        except (OSError, yaml.YAMLError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring config change, keeping current configuration: {e}")
+            return None
+        logger.info(f"Config file changed: {self.path}")
+        return config
+
+
+def diff_houses(old: list[dict], new: list[dict]) -> tuple[list[dict], list[str], list[dict]]:
+    """Houses matched by MAC: (added entries, removed MACs, changed entries)."""
+    old_by_mac = {house["mac"]: house for house in old}
+    new_by_mac = {house["mac"]: house for house in new}
+    added = [house for mac, house in new_by_mac.items() if mac not in old_by_mac]
+    removed = [mac for mac in old_by_mac if mac not in new_by_mac]
+    changed = [house for mac, house in new_by_mac.items() if mac in old_by_mac and old_by_mac[mac] != house]
+    return added, removed, changed
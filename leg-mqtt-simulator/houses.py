@@ -2,14 +2,12 @@
 
 import os
 import random
-import json
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from dataclasses import dataclass, field
-from typing import Optional
 
 import yaml
-
+from dateutil.relativedelta import relativedelta
+from load_profiles import default_cache_dir, get_profiles
 from solar import get_pv_production_kw
 
 # Load configuration from YAML
@@ -17,28 +15,76 @@ CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
 with open(CONFIG_FILE, 'r') as f:
     _config = yaml.safe_load(f)
 
-# Extract load parameters
-_load = _config.get('load', {})
-BASE_LOAD_DAY_W = _load.get('base_day_w', 500)
-BASE_LOAD_NIGHT_W = _load.get('base_night_w', 200)
-BASE_LOAD_VARIATION = _load.get('variation', 0.2)
 
-# Extract appliance parameters
-_appliances = _config.get('appliances', {})
-_washing = _appliances.get('washing_machine', {})
-WASHING_MACHINE_KW = _washing.get('power_kw', 2.0)
-WASHING_MACHINE_HOURS = _washing.get('duration_hours', 2.0)
-WASHING_FREQUENCY_DAYS = _washing.get('frequency_days', 7)
+@dataclass(frozen=True)
+class HouseSettings:
+    """Load and appliance settings shared by all houses (config.yaml `load` and `appliances`)."""
+    base_load_day_w: float = 500
+    base_load_night_w: float = 200
+    base_load_variation: float = 0.2
+    # "h0": standard load profile scaled to annual_kwh (load_profiles.py); "step": day/night levels above
+    load_profile: str = "h0"
+    annual_kwh: float = 3500
+    profile_resolution_min: int = 15
+    profile_cache_dir: str | None = None    # None: default_cache_dir()
+    washing_machine_kw: float = 2.0
+    washing_machine_hours: float = 2.0
+    washing_frequency_days: float = 7
+    dishwasher_kw: float = 1.5
+    dishwasher_hours: float = 1.5
+    dishwasher_frequency_days: float = 2
+    ev_charger_kw: float = 11.0
+    ev_charge_kwh: float = 50.0
+    ev_frequency_days: float = 3.5
+
+    @classmethod
+    def from_config(cls, config: dict) -> "HouseSettings":
+        """Settings from a config dict; raises ValueError for values the simulator cannot use."""
+        load = config.get('load') or {}
+        appliances = config.get('appliances') or {}
+        washing = appliances.get('washing_machine') or {}
+        dishwasher = appliances.get('dishwasher') or {}
+        ev = appliances.get('ev_charger') or {}
+        settings = cls(
+            base_load_day_w=float(load.get('base_day_w', cls.base_load_day_w)),
+            base_load_night_w=float(load.get('base_night_w', cls.base_load_night_w)),
+            base_load_variation=float(load.get('variation', cls.base_load_variation)),
+            load_profile=load.get('profile', cls.load_profile),
+            annual_kwh=float(load.get('annual_kwh', cls.annual_kwh)),
+            profile_resolution_min=int(load.get('profile_resolution_min', cls.profile_resolution_min)),
+            profile_cache_dir=load.get('profile_cache_dir', cls.profile_cache_dir),
+            washing_machine_kw=float(washing.get('power_kw', cls.washing_machine_kw)),
+            washing_machine_hours=float(washing.get('duration_hours', cls.washing_machine_hours)),
+            washing_frequency_days=float(washing.get('frequency_days', cls.washing_frequency_days)),
+            dishwasher_kw=float(dishwasher.get('power_kw', cls.dishwasher_kw)),
+            dishwasher_hours=float(dishwasher.get('duration_hours', cls.dishwasher_hours)),
+            dishwasher_frequency_days=float(dishwasher.get('frequency_days', cls.dishwasher_frequency_days)),
+            ev_charger_kw=float(ev.get('power_kw', cls.ev_charger_kw)),
+            ev_charge_kwh=float(ev.get('charge_kwh', cls.ev_charge_kwh)),
+            ev_frequency_days=float(ev.get('frequency_days', cls.ev_frequency_days)),
+        )
+        if settings.load_profile not in ("h0", "step"):
+            raise ValueError(f"load.profile must be 'h0' or 'step', not {settings.load_profile!r}")
+        if settings.profile_resolution_min <= 0 or 24 * 60 % settings.profile_resolution_min:
+            raise ValueError(f"load.profile_resolution_min must divide a day, not {settings.profile_resolution_min}")
+        if settings.ev_charger_kw <= 0:
+            raise ValueError("appliances.ev_charger.power_kw must be positive")
+        return settings
+
+    @property
+    def profile_cache(self) -> str:
+        cache_dir = os.path.expanduser(self.profile_cache_dir) if self.profile_cache_dir else default_cache_dir()
+        return os.path.join(cache_dir, f"load_profiles_{self.profile_resolution_min}min.npy")
+
+    def profiles(self):
+        """The shared profile library for these settings, None for the step profile."""
+        if self.load_profile != "h0":
+            return None
+        return get_profiles(self.profile_cache, self.profile_resolution_min)
 
-_dishwasher = _appliances.get('dishwasher', {})
-DISHWASHER_KW = _dishwasher.get('power_kw', 1.5)
-DISHWASHER_HOURS = _dishwasher.get('duration_hours', 1.5)
-DISHWASHER_FREQUENCY_DAYS = _dishwasher.get('frequency_days', 2)
 
-_ev = _appliances.get('ev_charger', {})
-EV_CHARGER_KW = _ev.get('power_kw', 11.0)
-EV_CHARGE_KWH = _ev.get('charge_kwh', 50.0)
-EV_FREQUENCY_DAYS = _ev.get('frequency_days', 3.5)
+# Settings from config.yaml at startup; a hot reload passes new settings to House.reconfigure()
+SETTINGS = HouseSettings.from_config(_config)
 
 
 def get_simulated_time() -> datetime:
@@ -55,9 +101,9 @@ class ApplianceState:
     duration_hours: float
     frequency_days: float
     active: bool = False
-    start_time: Optional[datetime] = None
-    next_scheduled: Optional[datetime] = None
-    custom_start_hour: Optional[int] = None  # Per-appliance override
+    start_time: datetime | None = None
+    next_scheduled: datetime | None = None
+    custom_start_hour: int | None = None  # Per-appliance override
 
     def schedule_next(self, now: datetime):
         """Schedule the next run."""
@@ -102,73 +148,117 @@ class ApplianceState:
 class House:
     """Simulates a house with PV, appliances, and energy metering."""
 
-    def __init__(self, config: dict, initial_ei: float = 1000.0, initial_eo: float = 500.0):
-        self.id = config["id"]
+    def __init__(self, config: dict, initial_ei: float = 1000.0, initial_eo: float = 500.0,
+                 settings: HouseSettings | None = None):
         self.mac = config["mac"]
-        self.smid = config["smid"]
-        self.pv_kwp = config["pv_kwp"]
-        self.has_ev = config["has_ev"]
-        self.ev_schedule = config["ev_schedule"]
-
-        # Per-house EV configuration (with fallback to global defaults)
-        self.ev_charge_kwh = config.get("ev_charge_kwh", EV_CHARGE_KWH)
-        self.ev_frequency_days = config.get("ev_frequency_days", EV_FREQUENCY_DAYS)
-        self.ev_start_hour = config.get("ev_start_hour", None)
 
         # Energy counters (ever-increasing)
         self.ei = initial_ei  # kWh imported
         self.eo = initial_eo  # kWh exported
 
-        # Timestamp counter (simulates meter uptime in seconds)
+        # Timestamp counter (simulates meter uptime in seconds); the fractional
+        # part of elapsed intervals is carried so ts follows real elapsed time
         self.ts = random.randint(1000, 100000)
+        self._ts_exact = float(self.ts)
 
-        # Initialize appliances
-        now = get_simulated_time()
+        # Appliances are created and scheduled by reconfigure()
+        self.appliances: list[ApplianceState] = []
+        self.reconfigure(config, settings or SETTINGS)
+
+    def reconfigure(self, config: dict, settings: HouseSettings):
+        """
+        Apply the house's config entry and the shared settings.
+
+        Called at creation and on hot reload. Energy counters, ts and the
+        schedules of appliances whose timing did not change are kept.
+        """
+        self.apply(self.prepare(config, settings))
+
+    def prepare(self, config: dict, settings: HouseSettings) -> dict:
+        """
+        New attribute values for a config entry, without changing the house.
 
-        self.appliances = [
-            ApplianceState(
-                name="washing",
-                power_kw=WASHING_MACHINE_KW,
-                duration_hours=WASHING_MACHINE_HOURS,
-                frequency_days=WASHING_FREQUENCY_DAYS,
-            ),
-            ApplianceState(
-                name="dishwasher",
-                power_kw=DISHWASHER_KW,
-                duration_hours=DISHWASHER_HOURS,
-                frequency_days=DISHWASHER_FREQUENCY_DAYS,
-            ),
-        ]
+        Raises KeyError/ValueError for an unusable entry. Appliances are
+        returned as new objects, so a reload can prepare every house first
+        and apply() them only once all of them succeeded.
+        """
+        has_ev = bool(config["has_ev"])
+        ev_schedule = config.get("ev_schedule")
+        if has_ev and ev_schedule not in ("day", "night"):
+            raise ValueError(f"house {config['id']}: ev_schedule must be 'day' or 'night' with has_ev")
+        # Per-house EV configuration (with fallback to the shared defaults)
+        ev_charge_kwh = float(config.get("ev_charge_kwh", settings.ev_charge_kwh))
+        ev_frequency_days = float(config.get("ev_frequency_days", settings.ev_frequency_days))
+        ev_start_hour = config.get("ev_start_hour", None)
 
+        wanted = {
+            "washing": (settings.washing_machine_kw, settings.washing_machine_hours,
+                        settings.washing_frequency_days, None),
+            "dishwasher": (settings.dishwasher_kw, settings.dishwasher_hours,
+                           settings.dishwasher_frequency_days, None),
+        }
         # Add EV if house has one
-        if self.has_ev:
-            ev_duration = self.ev_charge_kwh / EV_CHARGER_KW
-            ev_appliance = ApplianceState(
-                name=f"ev_{self.ev_schedule}",
-                power_kw=EV_CHARGER_KW,
-                duration_hours=ev_duration,
-                frequency_days=self.ev_frequency_days,
+        if has_ev:
+            wanted[f"ev_{ev_schedule}"] = (
+                settings.ev_charger_kw, ev_charge_kwh / settings.ev_charger_kw, ev_frequency_days, ev_start_hour
             )
-            # Store custom start hour if specified
-            ev_appliance.custom_start_hour = self.ev_start_hour
-            self.appliances.append(ev_appliance)
-        
-        # Schedule initial runs
-        for appliance in self.appliances:
-            appliance.schedule_next(now)
-    
+
+        now = get_simulated_time()
+        current = {appliance.name: appliance for appliance in self.appliances}
+        appliances = []
+        for name, (power_kw, duration_hours, frequency_days, start_hour) in wanted.items():
+            appliance = current.get(name)
+            if appliance is None:
+                appliance = ApplianceState(
+                    name=name,
+                    power_kw=power_kw,
+                    duration_hours=duration_hours,
+                    frequency_days=frequency_days,
+                    custom_start_hour=start_hour,
+                )
+                appliance.schedule_next(now)
+            else:
+                reschedule = (frequency_days != appliance.frequency_days
+                              or start_hour != appliance.custom_start_hour)
+                appliance = replace(appliance, power_kw=power_kw, duration_hours=duration_hours,
+                                    frequency_days=frequency_days, custom_start_hour=start_hour)
+                if reschedule and not appliance.active:
+                    appliance.schedule_next(now)
+            appliances.append(appliance)
+
+        return {
+            "id": config["id"],
+            "smid": config["smid"],
+            "pv_kwp": float(config["pv_kwp"]),
+            "has_ev": has_ev,
+            "ev_schedule": ev_schedule,
+            "ev_charge_kwh": ev_charge_kwh,
+            "ev_frequency_days": ev_frequency_days,
+            "ev_start_hour": ev_start_hour,
+            # Base load: shared memory-mapped profile library, scaled per house
+            "annual_kwh": float(config.get("annual_kwh", settings.annual_kwh)),
+            "profiles": settings.profiles(),
+            "settings": settings,
+            "appliances": appliances,
+        }
+
+    def apply(self, attributes: dict):
+        """Take over the values returned by prepare()."""
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
     def get_base_load_kw(self, now: datetime) -> float:
         """Get base load with time-of-day variation."""
-        hour = now.hour
-        
+        if self.profiles is not None:
+            base = self.profiles.power_kw(now, self.annual_kwh) * 1000
         # Day: 06:00-22:00, Night: 22:00-06:00
-        if 6 <= hour < 22:
-            base = BASE_LOAD_DAY_W
+        elif 6 <= now.hour < 22:
+            base = self.settings.base_load_day_w
         else:
-            base = BASE_LOAD_NIGHT_W
+            base = self.settings.base_load_night_w
         
         # Add random variation
-        variation = random.uniform(-BASE_LOAD_VARIATION, BASE_LOAD_VARIATION)
+        variation = random.uniform(-self.settings.base_load_variation, self.settings.base_load_variation)
         load_w = base * (1 + variation)
         
         return load_w / 1000.0  # Convert to kW
@@ -189,7 +279,7 @@ class House:
         Update house state and return MQTT message payload.
         
         Args:
-            interval_seconds: Time since last update
+            interval_seconds: Time since last update (the real elapsed time, see scheduler.py)
         
         Returns:
             Dict matching smart meter JSON format
@@ -221,7 +311,8 @@ class House:
             self.eo += po * hours
         
         # Increment timestamp
-        self.ts += int(interval_seconds)
+        self._ts_exact += interval_seconds
+        self.ts = int(self._ts_exact)
         
         # Generate random values for other fields
         i1 = random.uniform(0.1, 0.5)
@@ -257,3 +348,4 @@ class House:
         self.ei = state.get("ei", self.ei)
         self.eo = state.get("eo", self.eo)
         self.ts = state.get("ts", self.ts)
+        self._ts_exact = float(self.ts)
@@ -1,10 +1,13 @@
-"""InfluxDB state writer for simulator."""
+"""Simulator state writer (InfluxDB or embedded SQLite, see leg-common/timeseries.py)."""
 
-import os
 import logging
+import os
+import sys
+
 import yaml
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from timeseries import Record, create_store
 
 logger = logging.getLogger(__name__)
 
@@ -13,37 +16,28 @@ CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
 with open(CONFIG_FILE, "r") as f:
     _config = yaml.safe_load(f)
 
-_influx = _config.get("influxdb", {})
-INFLUX_URL = _influx.get("url", "http://localhost:8086")
-INFLUX_TOKEN = _influx.get("token", "")
-INFLUX_ORG = _influx.get("org", "LEG")
-INFLUX_BUCKET = _influx.get("bucket", "energy")
+STORAGE_BACKEND = (_config.get("storage") or {}).get("backend", "influxdb")
+INFLUX_TOKEN = _config.get("influxdb", {}).get("token", "")
 
 
 class StateWriter:
-    """Writes simulator state to InfluxDB."""
+    """Writes simulator state to the configured time-series store."""
     
     def __init__(self):
-        self.client = None
-        self.write_api = None
+        self.store = None
         self._last_state = {}  # Track last state per house to detect changes
         
-        if INFLUX_TOKEN:
+        # InfluxDB needs a token; the SQLite store works without any server
+        if STORAGE_BACKEND != "influxdb" or INFLUX_TOKEN:
             try:
-                self.client = InfluxDBClient(
-                    url=INFLUX_URL,
-                    token=INFLUX_TOKEN,
-                    org=INFLUX_ORG,
-                    verify_ssl=False
-                )
-                self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
-                logger.info(f"Connected to InfluxDB at {INFLUX_URL}")
+                self.store = create_store(_config, os.path.dirname(os.path.abspath(__file__)))
+                logger.info(f"Writing simulator state to {self.store.backend}")
             except Exception as e:
-                logger.error(f"Failed to connect to InfluxDB: {e}")
+                logger.error(f"Failed to open {STORAGE_BACKEND} store: {e}")
     
     def write_state(self, house, force: bool = False):
-        """Write house state to InfluxDB if changed or forced."""
-        if not self.write_api:
+        """Write house state to the store if changed or forced."""
+        if not self.store:
             return
         
         # Get current appliance power values (kW)
@@ -70,14 +64,16 @@ class StateWriter:
         self._last_state[house.id] = current_state
         
         try:
-            point = Point("simulator_state") \
-                .tag("house_id", str(house.id)) \
-                .field("pv_kwp", float(house.pv_kwp)) \
-                .field("washing_kw", float(washing_kw)) \
-                .field("dishwasher_kw", float(dishwasher_kw)) \
-                .field("ev_kw", float(ev_kw))
-            
-            self.write_api.write(bucket=INFLUX_BUCKET, record=point)
+            self.store.write([Record(
+                "simulator_state",
+                tags={"house_id": str(house.id)},
+                fields={
+                    "pv_kwp": float(house.pv_kwp),
+                    "washing_kw": float(washing_kw),
+                    "dishwasher_kw": float(dishwasher_kw),
+                    "ev_kw": float(ev_kw),
+                },
+            )])
             
             if washing_kw > 0 or dishwasher_kw > 0 or ev_kw > 0:
                 logger.info(f"House {house.id} state: washing={washing_kw}kW, dishwasher={dishwasher_kw}kW, ev={ev_kw}kW")
@@ -86,6 +82,6 @@ class StateWriter:
             logger.error(f"Failed to write state for house {house.id}: {e}")
     
     def close(self):
-        """Close InfluxDB connection."""
-        if self.client:
-            self.client.close()
+        """Close the store connection."""
+        if self.store:
+            self.store.close()
@@ -0,0 +1,141 @@
+"""
+Standard household load profiles (H0-style) for the simulated base load.
+
+Profiles follow the structure of the BDEW H0 standard load profile: three
+seasons (winter, summer, transition) x three day types (weekday, Saturday,
+Sunday), at 15-minute or 1-minute resolution, in W per 1000 kWh of annual
+consumption, with the H0 dynamisation polynomial applied per day of the
+year. The shapes are synthetic (night trough, morning, midday and evening
+peaks), not the official BDEW table.
+
+The library is built once into a float32 array of shape (3, 3, slots),
+cached as .npy in a cache directory ($XDG_CACHE_HOME/leg-mqtt-simulator by
+default) and memory-mapped on later starts, so all houses share one
+read-only copy; if the cache cannot be written, the built array is kept
+in memory. A lookup is an array index plus
+the dynamisation factor, scaled by the house's annual consumption.
+"""
+
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WINTER, SUMMER, TRANSITION = range(3)
+WEEKDAY, SATURDAY, SUNDAY = range(3)
+
+# Mean power of a 1000 kWh/a household in W
+MEAN_W = 1000 * 1000 / 8760
+
+# Daily peaks per day type: (hour, relative height, width in hours)
+_PEAKS = {
+    WEEKDAY: [(7.0, 0.55, 1.2), (12.5, 0.55, 1.5), (19.0, 0.95, 2.2)],
+    SATURDAY: [(9.0, 0.60, 1.8), (12.5, 0.80, 1.6), (19.0, 0.85, 2.2)],
+    SUNDAY: [(9.5, 0.65, 2.0), (12.5, 1.00, 1.4), (18.5, 0.75, 2.4)],
+}
+# Season shift of the evening peak (darker evenings start earlier) and its scale
+_EVENING = {WINTER: (-1.0, 1.2), SUMMER: (1.0, 0.8), TRANSITION: (0.0, 1.0)}
+
+
+def default_cache_dir() -> str:
+    """$XDG_CACHE_HOME/leg-mqtt-simulator, or ~/.cache/leg-mqtt-simulator if it is not set."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "leg-mqtt-simulator")
+
+
+def dynamisation(day_of_year: int) -> float:
+    """H0 dynamisation factor: higher in winter, lower in summer, about 1 on average."""
+    t = day_of_year
+    return -3.92e-10 * t**4 + 3.2e-7 * t**3 - 7.02e-5 * t**2 + 2.1e-3 * t + 1.24
+
+
+def season(dt: datetime) -> int:
+    """H0 seasons: winter 1 Nov - 20 Mar, summer 15 May - 14 Sep, transition otherwise."""
+    md = (dt.month, dt.day)
+    if md >= (11, 1) or md <= (3, 20):
+        return WINTER
+    if (5, 15) <= md <= (9, 14):
+        return SUMMER
+    return TRANSITION
+
+
+def day_type(dt: datetime) -> int:
+    weekday = dt.weekday()
+    return SATURDAY if weekday == 5 else SUNDAY if weekday == 6 else WEEKDAY
+
+
+def _shape(hours: np.ndarray, season_: int, day: int) -> np.ndarray:
+    shape = np.full_like(hours, 0.45)
+    shift, scale = _EVENING[season_]
+    peaks = _PEAKS[day]
+    for i, (hour, height, width) in enumerate(peaks):
+        if i == len(peaks) - 1:
+            hour, height = hour + shift, height * scale
+        distance = np.abs((hours - hour + 12) % 24 - 12)   # around the clock
+        shape += height * np.exp(-0.5 * (distance / width) ** 2)
+    # Deepest point of the night around 04:00
+    shape -= 0.15 * np.exp(-0.5 * (np.abs((hours - 4 + 12) % 24 - 12) / 1.5) ** 2)
+    return shape
+
+
+def build_profiles(resolution_min: int = 15) -> np.ndarray:
+    """(season, day type, slot) array in W per 1000 kWh/a, float32."""
+    slots = 24 * 60 // resolution_min
+    hours = (np.arange(slots) + 0.5) * resolution_min / 60
+    profiles = np.empty((3, 3, slots), dtype=np.float32)
+    for s in (WINTER, SUMMER, TRANSITION):
+        for d in (WEEKDAY, SATURDAY, SUNDAY):
+            shape = _shape(hours, s, d)
+            profiles[s, d] = shape / shape.mean() * MEAN_W
+    # Dynamisation averages slightly off 1 over a year; scale so a year sums to 1000 kWh
+    annual = sum(dynamisation(t) for t in range(1, 366)) / 365
+    return profiles / np.float32(annual)
+
+
+class LoadProfiles:
+    """Memory-mapped profile library with O(1) lookups (in memory if the cache file cannot be written)."""
+
+    def __init__(self, path: str, resolution_min: int = 15):
+        self.resolution_min = resolution_min
+        shape = (3, 3, 24 * 60 // resolution_min)
+        self.profiles = _load_cached(path, shape)
+        if self.profiles is None:
+            self.profiles = build_profiles(resolution_min)
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, self.profiles)
+                os.replace(tmp, path)
+                self.profiles = np.load(path, mmap_mode="r")
+            except OSError as e:
+                logger.warning(f"Cannot cache load profiles in {path}, keeping them in memory: {e}")
+
+    def power_kw(self, dt: datetime, annual_kwh: float) -> float:
+        """Profile power at dt for a household using annual_kwh per year."""
+        slot = (dt.hour * 60 + dt.minute) // self.resolution_min
+        watts = float(self.profiles[season(dt), day_type(dt), slot])
+        return watts * dynamisation(dt.timetuple().tm_yday) * annual_kwh / 1000 / 1000
+
+
+def _load_cached(path: str, shape: tuple) -> np.ndarray | None:
+    """The memory-mapped cache file, None if it is missing, unreadable or of another resolution."""
+    try:
+        profiles = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return profiles if profiles.shape == shape else None
+
+
+_libraries: dict[tuple[str, int], LoadProfiles] = {}
+
+
+def get_profiles(path: str, resolution_min: int = 15) -> LoadProfiles:
+    """The process-wide library for a cache file, loaded on first use and shared by all houses."""
+    library = _libraries.get((path, resolution_min))
+    if library is None:
+        library = _libraries[(path, resolution_min)] = LoadProfiles(path, resolution_min)
+    return library
@@ -0,0 +1,131 @@
+"""Drift-free tick scheduler and phase-spread publishing on the monotonic clock."""
+
+import logging
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    """
+    Fixed-rate ticks at start + n * interval on time.monotonic().
+
+    wait() sleeps until the next deadline and returns the seconds that really
+    passed since the previous tick, which callers integrate energy over.
+    Deadlines do not drift with the work done per tick, and wall-clock jumps
+    (NTP, DST) do not affect them. A tick whose work overruns the interval
+    is counted as an overrun. If whole intervals were missed, the schedule
+    realigns to now instead of bursting through the missed ticks; the
+    elapsed time still covers them, so no energy is lost.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.ticks = 0
+        self.overruns = 0        # ticks that started after their deadline had passed
+        self.skipped = 0         # whole intervals dropped while realigning
+        self.max_lag = 0.0       # worst lateness of a tick vs. its deadline (s)
+        self._lag_total = 0.0
+        self._deadline = None
+        self._last_tick = None
+
+    @property
+    def tick_time(self) -> float:
+        """Monotonic deadline of the current tick (phases are measured from it)."""
+        return self._deadline
+
+    def wait(self) -> float:
+        """Sleep until the next tick; returns the elapsed seconds since the previous one (0.0 on the first)."""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = self._last_tick = now
+            self.ticks = 1
+            return 0.0
+
+        self._deadline += self.interval
+        if now < self._deadline:
+            time.sleep(self._deadline - now)
+            now = time.monotonic()
+        else:
+            self.overruns += 1
+            late = now - self._deadline
+            missed = int(late // self.interval)
+            if missed:
+                self.skipped += missed
+                self._deadline += missed * self.interval
+                logger.warning(f"Tick overrun: {late:.2f}s late, skipping {missed} tick(s)")
+
+        lag = max(0.0, now - self._deadline)
+        self.max_lag = max(self.max_lag, lag)
+        self._lag_total += lag
+        self.ticks += 1
+        elapsed = now - self._last_tick
+        self._last_tick = now
+        return elapsed
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "mean_lag_ms": 1000 * self._lag_total / max(1, self.ticks - 1),
+            "max_lag_ms": 1000 * self.max_lag,
+        }
+
+
+def phase_offset(key: str, window: float) -> float:
+    """Deterministic offset in [0, window) from the CRC-32 of key (a house MAC)."""
+    return zlib.crc32(key.encode()) / 2**32 * window
+
+
+class PhasedPublisher:
+    """
+    Spreads houses over a tick instead of publishing them back-to-back.
+
+    Each house gets a fixed phase offset from its MAC (stable across
+    restarts, roughly uniform over the window), so messages reach the
+    broker and collector at an even rate, like independent real meters.
+    tick() yields every house at tick_time + offset, together with the
+    real seconds since that house was last published. A house's first
+    publish (startup, or added by a config reload) counts as one interval
+    since its previous slot, so its first reading integrates real energy.
+    """
+
+    def __init__(self, window: float, interval: float):
+        self.window = window
+        self.interval = interval
+        self.late = 0            # slots published after their due time (> 1 ms)
+        self._offsets: dict[str, float] = {}
+        self._last: dict[str, float] = {}
+
+    def tick(self, tick_time: float, houses):
+        """Yield (house, elapsed) in phase order, sleeping until each house's slot."""
+        for house in sorted(houses, key=self._offset):
+            due = tick_time + self._offsets[house.mac]
+            now = time.monotonic()
+            if due > now:
+                time.sleep(due - now)
+                now = time.monotonic()
+            elif now - due > 0.001:
+                self.late += 1
+            last = self._last.get(house.mac, due - self.interval)
+            self._last[house.mac] = now
+            yield house, now - last
+
+    def resize(self, window: float, interval: float):
+        """Change the spread window and interval (config reload); offsets are recomputed, elapsed tracking is kept."""
+        self.window = window
+        self.interval = interval
+        self._offsets.clear()
+
+    def forget(self, mac: str):
+        """Drop a removed house, so a later re-add starts with a fresh baseline."""
+        self._offsets.pop(mac, None)
+        self._last.pop(mac, None)
+
+    def _offset(self, house) -> float:
+        offset = self._offsets.get(house.mac)
+        if offset is None:
+            offset = self._offsets[house.mac] = phase_offset(house.mac, self.window)
+        return offset
@@ -6,19 +6,20 @@ Publishes to MQTT broker every 10 seconds, mimicking real smart meter format.
 """
 
 import json
-import time
+import logging
+import os
 import signal
-import sys
 import ssl
-import os
-import logging
+import sys
+import time
 from datetime import datetime
 
-import yaml
 import paho.mqtt.client as mqtt
-
-from houses import House
+import yaml
+from config_watcher import ConfigWatcher, diff_houses
+from houses import SETTINGS, House, HouseSettings
 from influx_state import StateWriter
+from scheduler import PhasedPublisher, TickScheduler
 
 # Load configuration from YAML
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yaml')
@@ -33,12 +34,12 @@ MQTT_USERNAME = config['mqtt'].get('username', '')
 MQTT_PASSWORD = config['mqtt'].get('password', '')
 
 UPDATE_INTERVAL = config['simulator']['update_interval']
+# Fraction of the interval over which houses are spread by phase (0 = all at the tick start)
+PUBLISH_SPREAD = config['simulator'].get('publish_spread', 0.9)
 STATE_FILE = os.path.join(os.path.dirname(__file__), config['simulator']['state_file'])
 HOUSES = config['houses']
-
-# Load parameters
-LOAD_CONFIG = config.get('load', {})
-APPLIANCE_CONFIG = config.get('appliances', {})
+# How often config.yaml is checked for changes (houses, load, appliances, interval); 0 = never
+RELOAD_POLL_S = config['simulator'].get('reload_poll_s', 5)
 
 # Configure logging
 logging.basicConfig(
@@ -72,9 +73,8 @@ def load_state() -> dict:
         return {}
 
 
-def save_state(houses: list[House]):
-    """Save state to file for persistence."""
-    state = {}
+def save_state(houses: list[House], state: dict):
+    """Save state to file for persistence (houses removed by a reload keep their last state)."""
     for house in houses:
         state[house.mac] = house.get_state()
     
@@ -98,6 +98,76 @@ def on_disconnect(client, userdata, flags, reason_code, properties):
     logger.warning(f"Disconnected from MQTT broker: {reason_code}")
 
 
+def create_house(house_config: dict, state: dict, settings: HouseSettings = SETTINGS) -> House:
+    house = House(house_config, settings=settings)
+    # Restore state if available
+    if house_config["mac"] in state:
+        house.load_state(state[house_config["mac"]])
+        logger.info(f"House {house_config['id']}: Restored Ei={house.ei:.3f}, Eo={house.eo:.3f}")
+    else:
+        logger.info(f"House {house_config['id']}: Starting fresh Ei={house.ei:.3f}, Eo={house.eo:.3f}")
+    return house
+
+
+def apply_config(old: dict, new: dict, houses: list[House], state: dict, state_writer: StateWriter,
+                 scheduler: TickScheduler, publisher: PhasedPublisher) -> list[House]:
+    """
+    Apply a reloaded config: houses are matched by MAC and only added, removed
+    or changed houses are touched. Counters, ts, appliance schedules and the
+    MQTT connection of all other houses carry on.
+
+    Everything that can fail (settings, changed entries, new houses) is built
+    first; the running houses are only touched once all of it succeeded, so
+    a failed reload leaves the simulator exactly on the old config. Returns
+    the new list of houses.
+    """
+    settings = HouseSettings.from_config(new)
+    entries = {house_config["mac"]: house_config for house_config in new["houses"]}
+    by_mac = {house.mac: house for house in houses}
+    # Added and removed houses are taken against the running houses, changed entries against the old config
+    added = [house_config for mac, house_config in entries.items() if mac not in by_mac]
+    removed = [mac for mac in by_mac if mac not in entries]
+    changed = [house_config for house_config in diff_houses(old["houses"], new["houses"])[2]
+               if house_config["mac"] in by_mac]
+
+    # Load and appliance settings apply to every house
+    if any(house.settings != settings for house in houses):
+        logger.info("Load/appliance settings changed, retuning all houses")
+        changed = [entries[mac] for mac in by_mac if mac in entries]
+
+    updates = [(by_mac[house_config["mac"]], by_mac[house_config["mac"]].prepare(house_config, settings))
+               for house_config in changed]
+    new_houses = [create_house(house_config, state, settings) for house_config in added]
+    interval = new["simulator"]["update_interval"]
+    spread = new["simulator"].get("publish_spread", 0.9)
+
+    # Nothing below raises: swap the prepared state in
+    for mac in removed:
+        state[mac] = by_mac[mac].get_state()
+        publisher.forget(mac)
+        logger.info(f"House {by_mac[mac].id} ({mac}) removed")
+    for house, attributes in updates:
+        house.apply(attributes)
+        logger.info(f"House {house.id} ({house.mac}) reconfigured")
+    for house in new_houses:
+        logger.info(f"House {house.id} ({house.mac}) added")
+    houses = [house for house in houses if house.mac not in removed] + new_houses
+
+    if interval != scheduler.interval or interval * spread != publisher.window:
+        scheduler.interval = interval
+        publisher.resize(interval * spread, interval)
+        logger.info(f"Publishing every {interval} seconds (spread {spread})")
+    for section in ("mqtt", "storage", "influxdb"):
+        if old.get(section) != new.get(section):
+            logger.warning(f"Config section '{section}' changed; restart the simulator to apply it")
+
+    for house, _ in updates:
+        state_writer.write_state(house, force=True)
+    for house in new_houses:
+        state_writer.write_state(house, force=True)
+    return houses
+
+
 def main():
     global running
     
@@ -112,24 +182,15 @@ def main():
     state = load_state()
     
     # Initialize houses
-    houses = []
-    for config in HOUSES:
-        house = House(config)
-        # Restore state if available
-        if config["mac"] in state:
-            house.load_state(state[config["mac"]])
-            logger.info(f"House {config['id']}: Restored Ei={house.ei:.3f}, Eo={house.eo:.3f}")
-        else:
-            logger.info(f"House {config['id']}: Starting fresh Ei={house.ei:.3f}, Eo={house.eo:.3f}")
-        houses.append(house)
+    houses = [create_house(house_config, state) for house_config in HOUSES]
     
-    # Initialize InfluxDB state writer
+    # Initialize state writer (InfluxDB or SQLite)
     state_writer = StateWriter()
     
     # Write initial state at startup
     for house in houses:
         state_writer.write_state(house, force=True)
-    logger.info("Initial simulator state written to InfluxDB")
+    logger.info("Initial simulator state written")
     
     # Setup MQTT client
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
@@ -150,22 +211,40 @@ def main():
     try:
         client.connect(MQTT_BROKER, MQTT_PORT, 60)
         client.loop_start()
-    except Exception as e:
+    except (OSError, ValueError) as e:
         logger.error(f"Failed to connect to MQTT broker: {e}")
         sys.exit(1)
     
     logger.info(f"Publishing every {UPDATE_INTERVAL} seconds")
     
-    last_save = time.time()
+    # Ticks on the monotonic clock; each house is published at its own phase within
+    # the tick and integrates energy over the real time since its previous message
+    scheduler = TickScheduler(UPDATE_INTERVAL)
+    publisher = PhasedPublisher(UPDATE_INTERVAL * PUBLISH_SPREAD, UPDATE_INTERVAL)
+    # Fleet changes in config.yaml are applied between ticks, without a restart
+    watcher = ConfigWatcher(CONFIG_FILE, RELOAD_POLL_S) if RELOAD_POLL_S else None
+    active_config = config
+    last_save = time.monotonic()
     save_interval = 60  # Save state every minute
     
     try:
         while running:
-            loop_start = time.time()
+            scheduler.wait()
+            
+            new_config = watcher.poll() if watcher else None
+            if new_config:
+                try:
+                    houses = apply_config(active_config, new_config, houses, state, state_writer,
+                                          scheduler, publisher)
+                    active_config = new_config
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.error(f"Config change not applied, keeping current configuration: {e}")
             
-            for house in houses:
+            for house, elapsed in publisher.tick(scheduler.tick_time, houses):
+                if not running:
+                    break
                 # Update house state and get message
-                payload = house.update(UPDATE_INTERVAL)
+                payload = house.update(elapsed)
                 topic = f"{house.mac}/SENSOR"
                 
                 # Publish to MQTT
@@ -177,12 +256,12 @@ def main():
                 else:
                     logger.error(f"Failed to publish to {topic}: {result.rc}")
                 
-                # Write state to InfluxDB if changed
+                # Write state to the store if changed
                 state_writer.write_state(house)
             
             # Log summary periodically
             now = datetime.now()
-            if now.second < UPDATE_INTERVAL:
+            if now.second < scheduler.interval:
                 for house in houses:
                     pv = house.get_pv_production_kw(now)
                     logger.info(
@@ -191,19 +270,16 @@ def main():
                     )
             
             # Save state periodically
-            if time.time() - last_save > save_interval:
-                save_state(houses)
-                last_save = time.time()
-            
-            # Sleep for remaining interval
-            elapsed = time.time() - loop_start
-            sleep_time = max(0, UPDATE_INTERVAL - elapsed)
-            time.sleep(sleep_time)
+            if time.monotonic() - last_save > save_interval:
+                save_state(houses, state)
+                last_save = time.monotonic()
+                logger.debug(f"Scheduler: {scheduler.stats()}, late publish slots: {publisher.late}")
     
     finally:
+        logger.info(f"Scheduler: {scheduler.stats()}, late publish slots: {publisher.late}")
         # Save state on exit
         logger.info("Saving state before exit...")
-        save_state(houses)
+        save_state(houses, state)
         state_writer.close()
         client.loop_stop()
         client.disconnect()
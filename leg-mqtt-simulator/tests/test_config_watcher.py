@@ -0,0 +1,78 @@
+import os
+
+import pytest
+import yaml
+from config_watcher import ConfigWatcher, diff_houses, validate_config
+
+
+def house(n, **overrides):
+    entry = {"id": n, "mac": f"AA-00-00-00-00-{n:02X}", "smid": f"SM{n}", "pv_kwp": 5.0, "has_ev": False}
+    entry.update(overrides)
+    return entry
+
+
+def config(houses=None, **simulator):
+    return {"simulator": {"update_interval": 10, **simulator},
+            "houses": [house(1), house(2)] if houses is None else houses}
+
+
+def test_valid_config_passes():
+    validate_config(config())
+    validate_config(config([house(1, has_ev=True, ev_schedule="night")], publish_spread=0.5))
+
+
+@pytest.mark.parametrize("broken, error, message", [
+    (None, TypeError, "mapping"),
+    ({"houses": []}, TypeError, "simulator"),
+    (config(update_interval=0), ValueError, "update_interval"),
+    (config(publish_spread=2), ValueError, "publish_spread"),
+    (config(houses={}), TypeError, "list"),
+    (config([house(1, smid=None)]), ValueError, "smid"),
+    (config([house(1, has_ev=True)]), ValueError, "ev_schedule"),
+    (config([house(1, pv_kwp="5")]), TypeError, "pv_kwp"),
+    (config([house(1), house(2, mac="AA-00-00-00-00-01")]), ValueError, "duplicate"),
+])
+def test_invalid_configs_are_rejected(broken, error, message):
+    with pytest.raises(error, match=message):
+        validate_config(broken)
+
+
+def test_diff_houses_by_mac():
+    old = [house(1), house(2), house(3)]
+    new = [house(1), house(3, pv_kwp=8.0), house(4)]
+    added, removed, changed = diff_houses(old, new)
+    assert added == [house(4)]
+    assert removed == [house(2)["mac"]]
+    assert changed == [house(3, pv_kwp=8.0)]
+    assert diff_houses(old, old) == ([], [], [])
+
+
+def write(path, content, mtime):
+    with open(path, "w") as f:
+        f.write(content)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_watcher_returns_valid_changes_once(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write(path, yaml.safe_dump(config()), 1_000_000_000)
+    watcher = ConfigWatcher(path, poll_s=0)
+    assert watcher.poll() is None
+
+    changed = config([house(1)])
+    write(path, yaml.safe_dump(changed), 2_000_000_000)
+    assert watcher.poll() == changed
+    assert watcher.poll() is None
+
+    write(path, "simulator: [", 3_000_000_000)
+    assert watcher.poll() is None
+    write(path, yaml.safe_dump(config([house(1, has_ev=True)])), 4_000_000_000)
+    assert watcher.poll() is None
+
+
+def test_watcher_polls_at_most_every_interval(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write(path, yaml.safe_dump(config()), 1_000_000_000)
+    watcher = ConfigWatcher(path, poll_s=3600)
+    write(path, yaml.safe_dump(config([house(1)])), 2_000_000_000)
+    assert watcher.poll() is None
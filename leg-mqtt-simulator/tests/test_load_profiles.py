@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from load_profiles import (
+    MEAN_W,
+    SATURDAY,
+    SUMMER,
+    SUNDAY,
+    TRANSITION,
+    WEEKDAY,
+    WINTER,
+    LoadProfiles,
+    build_profiles,
+    day_type,
+    default_cache_dir,
+    dynamisation,
+    get_profiles,
+    season,
+)
+
+
+def test_seasons_and_day_types():
+    assert season(datetime(2026, 1, 10)) == WINTER
+    assert season(datetime(2026, 3, 20)) == WINTER
+    assert season(datetime(2026, 3, 21)) == TRANSITION
+    assert season(datetime(2026, 5, 15)) == SUMMER
+    assert season(datetime(2026, 9, 15)) == TRANSITION
+    assert season(datetime(2026, 11, 1)) == WINTER
+    assert [day_type(datetime(2026, 1, d)) for d in (9, 10, 11)] == [WEEKDAY, SATURDAY, SUNDAY]
+
+
+def test_dynamisation_is_higher_in_winter():
+    assert dynamisation(15) > 1.0 > dynamisation(200)
+
+
+@pytest.mark.parametrize("resolution", [15, 1])
+def test_profiles_mean_and_shape(resolution):
+    profiles = build_profiles(resolution)
+    assert profiles.shape == (3, 3, 24 * 60 // resolution)
+    assert profiles.dtype == np.float32
+    assert profiles.mean(axis=2) == pytest.approx(np.full((3, 3), profiles.mean()), rel=1e-5)
+    assert profiles.mean() == pytest.approx(MEAN_W, rel=0.05)
+    # Night trough below the evening peak on every profile
+    night, evening = 4 * 60 // resolution, 19 * 60 // resolution
+    assert (profiles[:, :, night] < profiles[:, :, evening]).all()
+
+
+def test_year_sums_to_annual_consumption(tmp_path):
+    library = LoadProfiles(str(tmp_path / "profiles.npy"), 60)
+    time, total = datetime(2026, 1, 1), 0.0
+    while time.year == 2026:
+        total += library.power_kw(time, 3500.0)
+        time += timedelta(hours=1)
+    assert total == pytest.approx(3500.0, rel=0.05)
+
+
+def test_cache_file_is_memory_mapped_and_rebuilt_on_resolution_change(tmp_path):
+    path = str(tmp_path / "profiles.npy")
+    first = LoadProfiles(path, 15)
+    assert isinstance(first.profiles, np.memmap)
+    assert LoadProfiles(path, 15).profiles.shape == (3, 3, 96)
+    assert LoadProfiles(path, 5).profiles.shape == (3, 3, 288)
+    assert get_profiles(path, 5) is get_profiles(path, 5)
+
+
+def test_unwritable_cache_keeps_profiles_in_memory(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    library = LoadProfiles(str(blocker / "profiles.npy"), 15)
+    assert not isinstance(library.profiles, np.memmap)
+    assert library.profiles.shape == (3, 3, 96)
+    assert library.power_kw(datetime(2026, 1, 9, 19), 3500.0) > 0
+
+
+def test_cache_dir_follows_xdg_cache_home(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache_dir() == str(tmp_path / "leg-mqtt-simulator")
+    library = LoadProfiles(str(tmp_path / "leg-mqtt-simulator" / "profiles.npy"), 15)
+    assert isinstance(library.profiles, np.memmap)
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+import scheduler
+from scheduler import PhasedPublisher, TickScheduler, phase_offset
+
+
+class FakeClock:
+    """Monotonic clock that only moves when slept on or advanced by the test."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(scheduler.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_ticks_do_not_drift_with_work(clock):
+    ticks = TickScheduler(10.0)
+    assert ticks.wait() == 0.0
+    for work in (1.0, 3.5, 0.2):
+        clock.now += work
+        assert ticks.wait() == pytest.approx(10.0)
+    assert ticks.tick_time == pytest.approx(130.0)
+    assert ticks.stats()["overruns"] == 0
+
+
+def test_overrun_realigns_and_elapsed_covers_missed_ticks(clock):
+    ticks = TickScheduler(10.0)
+    ticks.wait()
+    clock.now += 34.0
+    assert ticks.wait() == pytest.approx(34.0)
+    stats = ticks.stats()
+    assert (stats["overruns"], stats["skipped"]) == (1, 2)
+    assert stats["max_lag_ms"] == pytest.approx(4000.0)
+    # Next deadline is on the original grid again
+    assert ticks.wait() == pytest.approx(6.0)
+    assert clock.now == pytest.approx(140.0)
+
+
+def test_phase_offset_is_stable_and_in_window():
+    offsets = [phase_offset(f"AA-00-00-00-00-{n:02X}", 9.0) for n in range(200)]
+    assert all(0 <= offset < 9.0 for offset in offsets)
+    assert phase_offset("AA-00-00-00-00-01", 9.0) == offsets[1]
+    # Roughly uniform: every third of the window gets houses
+    assert {int(offset // 3) for offset in offsets} == {0, 1, 2}
+
+
+def test_publisher_spreads_houses_over_the_window(clock):
+    houses = [SimpleNamespace(mac=f"AA-{n:02X}") for n in range(5)]
+    publisher = PhasedPublisher(9.0, 10.0)
+    published = [(house.mac, clock.now, elapsed) for house, elapsed in publisher.tick(clock.now, houses)]
+    tick_time = 100.0
+    assert [mac for mac, _, _ in published] == sorted((h.mac for h in houses),
+                                                      key=lambda mac: phase_offset(mac, 9.0))
+    for mac, when, elapsed in published:
+        assert when == pytest.approx(tick_time + phase_offset(mac, 9.0))
+        # The first reading covers one interval since the house's previous slot
+        assert elapsed == pytest.approx(10.0)
+
+    clock.now = 110.0
+    second = {house.mac: elapsed for house, elapsed in publisher.tick(110.0, houses)}
+    assert all(elapsed == pytest.approx(10.0) for elapsed in second.values())
+    assert publisher.late == 0
+
+
+def test_publisher_counts_late_slots_and_forgets(clock):
+    house = SimpleNamespace(mac="AA-01")
+    publisher = PhasedPublisher(1.0, 10.0)
+    list(publisher.tick(clock.now, [house]))
+    clock.now += 50.0
+    list(publisher.tick(clock.now - 20.0, [house]))
+    assert publisher.late == 1
+    publisher.forget("AA-01")
+    assert [elapsed for _, elapsed in publisher.tick(clock.now, [house])] == [pytest.approx(10.0)]
+
+
+def test_resize_applies_to_houses_added_later(clock):
+    publisher = PhasedPublisher(9.0, 10.0)
+    publisher.resize(4.5, 5.0)
+    house = SimpleNamespace(mac="AA-02")
+    assert [elapsed for _, elapsed in publisher.tick(clock.now, [house])] == [pytest.approx(5.0)]
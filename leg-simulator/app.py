@@ -1,90 +1,206 @@
-from dash import Dash, dcc, html, callback_context, no_update
+import os
+import sys
+import uuid
+
+from dash import Dash, callback_context, dcc, html, no_update
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+from instrumentation import Instrumentation
+from layout import build_graph, build_graph_patch, lod_patch
+from live import LIVE_UPDATE_MS, start_live_state
+from pricing_table import (
+    DATATABLE_THRESHOLD,
+    pricing_datatable,
+    pricing_table_data,
+    render_pricing_table,
+)
+from scenario import (
+    hour_marks,
+    run_scenario,
+    scenario_fits,
+    scenario_totals,
+    step_label,
+)
+from sessions import create_session_store
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from breakeven import (
+    DEFICIT,
+    NO_CONSUMPTION,
+    SURPLUS,
+    SURPLUS_CAPPED,
+    breakeven_mode,
+    breakeven_tariffs,
+)
+
+HOUSE_COUNT = int(os.environ.get("LEG_SIM_HOUSES", "5"))
+# Placement for communities above layout.LARGE_COMMUNITY_THRESHOLD: "radial" or "grid"
+LAYOUT_MODE = os.environ.get("LEG_SIM_LAYOUT", "radial")
+
+# Per-session state: "memory" (single worker) or "sqlite" (shared by all workers)
+sessions = create_session_store(
+    os.environ.get("LEG_SIM_SESSION_STORE", "memory"),
+    HOUSE_COUNT,
+    max_sessions=int(os.environ.get("LEG_SIM_MAX_SESSIONS", "100")),
+    path=os.environ.get("LEG_SIM_SESSION_DB"),
+)
 
-from layout import build_graph
-from simulation import Simulation
+# Meter data from MQTT (None without live configuration in config.yaml)
+live_state = start_live_state()
 
-HOUSE_COUNT = 5
+# Callback timings on /metrics and a debug panel (LEG_SIM_METRICS=1)
+metrics = Instrumentation(enabled=os.environ.get("LEG_SIM_METRICS") == "1")
 
-simulation = Simulation(HOUSE_COUNT)
+# Scenario lengths in days selectable in the UI ("live" = instantaneous model)
+SCENARIO_DAYS = {"day": 1, "month": 30}
 
 app = Dash(__name__)
-app.layout = html.Div(
-    children=[
-        html.H1("LEG Energy Flow Simulator", style={"textAlign": "center", "color": "#2c3e50"}),
-        html.P("Click on PV, EV, or Washer to edit values", style={"textAlign": "center", "color": "#7f8c8d"}),
-
-        # Energy price inputs
-        html.Div([
-            html.H3("Energy Prices (ct/kWh)", style={"marginBottom": "10px"}),
+server = app.server  # WSGI entry point, e.g. gunicorn -w 4 app:server
+metrics.install(server)
+
+
+def debug_panel():
+    """Callback timings and cProfile capture; only part of the layout with LEG_SIM_METRICS=1."""
+    if not metrics.enabled:
+        return html.Div()
+    return html.Div([
+        html.H3("Debug: callback timings", style={"marginBottom": "10px"}),
+        html.Div(id="debug-metrics", style={"fontSize": "12px"}),
+        html.Button("Profile next update", id="debug-profile", n_clicks=0,
+                    style={"marginTop": "10px", "padding": "5px 15px"}),
+        html.Pre(id="debug-profile-output", style={"fontSize": "11px", "maxHeight": "400px", "overflow": "auto"}),
+        dcc.Interval(id="debug-interval", interval=5000),
+    ], style={"padding": "15px", "backgroundColor": "#fdf6e3", "borderRadius": "8px", "marginTop": "20px"})
+
+
+def serve_layout():
+    """Layout per page load; the session id is assigned by init_session (kept in tab session storage)."""
+    return html.Div(
+        children=[
+            html.H1("LEG Energy Flow Simulator", style={"textAlign": "center", "color": "#2c3e50"}),
+            html.P("Click on PV, EV, or Washer to edit values", style={"textAlign": "center", "color": "#7f8c8d"}),
+
+            # Energy price inputs
             html.Div([
+                html.H3("Energy Prices (ct/kWh)", style={"marginBottom": "10px"}),
                 html.Div([
-                    html.Label("Grid Delivery (sell):"),
-                    dcc.Input(id="price-grid-delivery", type="number", value=6, min=0, step=0.01,
-                              style={"width": "80px", "marginLeft": "10px"}),
-                    html.Span(" ct/kWh", style={"marginLeft": "5px"}),
-                ], style={"display": "inline-block", "marginRight": "30px"}),
-                html.Div([
-                    html.Label("Grid Consumption (buy):"),
-                    dcc.Input(id="price-grid-consumption", type="number", value=30, min=0, step=0.01,
-                              style={"width": "80px", "marginLeft": "10px"}),
-                    html.Span(" ct/kWh", style={"marginLeft": "5px"}),
-                ], style={"display": "inline-block", "marginRight": "30px"}),
-                html.Div([
-                    html.Label("PV Delivery:"),
-                    dcc.Input(id="price-pv-delivery", type="number", value=20, min=0, step=0.01,
-                              style={"width": "80px", "marginLeft": "10px"}),
-                    html.Span(" ct/kWh", style={"marginLeft": "5px"}),
-                ], style={"display": "inline-block", "marginRight": "30px"}),
-                html.Div([
-                    html.Label("House Consumption:"),
-                    dcc.Input(id="price-house-consumption", type="number", value=25, min=0, step=0.01,
-                              style={"width": "80px", "marginLeft": "10px"}),
-                    html.Span(" ct/kWh", style={"marginLeft": "5px"}),
-                ], style={"display": "inline-block"}),
-            ], style={"display": "flex", "flexWrap": "wrap", "gap": "10px"}),
-        ], style={"padding": "15px", "backgroundColor": "#ecf0f1", "borderRadius": "8px", "marginBottom": "20px"}),
-
-        # Edit modal
-        html.Div(id="edit-modal", children=[
+                    html.Div([
+                        html.Label("Grid Delivery (sell):"),
+                        dcc.Input(id="price-grid-delivery", type="number", value=6, min=0, step=0.01,
+                                  style={"width": "80px", "marginLeft": "10px"}),
+                        html.Span(" ct/kWh", style={"marginLeft": "5px"}),
+                    ], style={"display": "inline-block", "marginRight": "30px"}),
+                    html.Div([
+                        html.Label("Grid Consumption (buy):"),
+                        dcc.Input(id="price-grid-consumption", type="number", value=30, min=0, step=0.01,
+                                  style={"width": "80px", "marginLeft": "10px"}),
+                        html.Span(" ct/kWh", style={"marginLeft": "5px"}),
+                    ], style={"display": "inline-block", "marginRight": "30px"}),
+                    html.Div([
+                        html.Label("PV Delivery:"),
+                        dcc.Input(id="price-pv-delivery", type="number", value=20, min=0, step=0.01,
+                                  style={"width": "80px", "marginLeft": "10px"}),
+                        html.Span(" ct/kWh", style={"marginLeft": "5px"}),
+                    ], style={"display": "inline-block", "marginRight": "30px"}),
+                    html.Div([
+                        html.Label("House Consumption:"),
+                        dcc.Input(id="price-house-consumption", type="number", value=25, min=0, step=0.01,
+                                  style={"width": "80px", "marginLeft": "10px"}),
+                        html.Span(" ct/kWh", style={"marginLeft": "5px"}),
+                    ], style={"display": "inline-block"}),
+                ], style={"display": "flex", "flexWrap": "wrap", "gap": "10px"}),
+            ], style={"padding": "15px", "backgroundColor": "#ecf0f1", "borderRadius": "8px", "marginBottom": "20px"}),
+
+            # Scenario: live state or a precomputed day/month to scrub through
             html.Div([
-                html.H4(id="modal-title", style={"marginBottom": "15px"}),
+                html.H3("Scenario", style={"marginBottom": "10px"}),
+                dcc.RadioItems(
+                    id="scenario-mode",
+                    # Scenarios too large for the scenario cache (LEG_SIM_SCENARIO_CACHE_MB) are disabled
+                    options=[{"label": " Live", "value": "live"},
+                             {"label": " Day (1 min)", "value": "day",
+                              "disabled": not scenario_fits(HOUSE_COUNT, SCENARIO_DAYS["day"])},
+                             {"label": " Month (1 min)", "value": "month",
+                              "disabled": not scenario_fits(HOUSE_COUNT, SCENARIO_DAYS["month"])}]
+                            + ([{"label": " Meters (MQTT)", "value": "meters"}] if live_state else []),
+                    value="live", inline=True, inputStyle={"marginLeft": "15px"},
+                ),
                 html.Div([
-                    html.Label("Power (kW): "),
-                    dcc.Input(id="modal-input", type="number", min=0, step=0.1,
-                              style={"width": "100px", "marginLeft": "10px"}),
-                ]),
+                    dcc.Slider(id="scenario-step", min=0, max=0, step=1, value=0, marks=None,
+                               updatemode="drag", disabled=True),
+                ], style={"marginTop": "10px"}),
+                html.Div(id="scenario-time", style={"fontWeight": "bold", "marginTop": "5px"}),
+                html.Div(id="scenario-summary", style={"marginTop": "10px", "fontSize": "13px"}),
+                dcc.Interval(id="live-interval", interval=LIVE_UPDATE_MS, disabled=True),
+                # Meter data version last rendered in this tab
+                dcc.Store(id="live-version", data=None),
+            ], style={"padding": "15px", "backgroundColor": "#ecf0f1", "borderRadius": "8px", "marginBottom": "20px"}),
+
+            # Edit modal
+            html.Div(id="edit-modal", children=[
                 html.Div([
-                    html.Button("Apply", id="modal-apply", n_clicks=0,
-                                style={"marginRight": "10px", "marginTop": "15px", "padding": "8px 20px",
-                                       "backgroundColor": "#3498db", "color": "white", "border": "none", "cursor": "pointer"}),
-                    html.Button("Cancel", id="modal-cancel", n_clicks=0,
-                                style={"marginTop": "15px", "padding": "8px 20px",
-                                       "backgroundColor": "#95a5a6", "color": "white", "border": "none", "cursor": "pointer"}),
-                ]),
-            ], style={"backgroundColor": "white", "padding": "25px", "borderRadius": "8px",
-                      "boxShadow": "0 4px 20px rgba(0,0,0,0.3)", "minWidth": "300px"}),
-        ], style={"display": "none", "position": "fixed", "top": "0", "left": "0", "right": "0", "bottom": "0",
-                  "backgroundColor": "rgba(0,0,0,0.5)", "zIndex": "1000",
-                  "justifyContent": "center", "alignItems": "center"}),
-
-        # Pricing table (top right)
-        html.Div([
-            html.H3("Energy Costs (ct/h)", style={"marginBottom": "10px"}),
-            html.Div(id="pricing-table"),
-            html.Div(id="breakeven-indicator", style={"marginTop": "15px", "padding": "10px",
-                      "backgroundColor": "#e8f4f8", "borderRadius": "5px", "borderLeft": "4px solid #3498db"}),
-        ], style={"padding": "10px", "backgroundColor": "#f8f9fa", "borderRadius": "8px", "marginBottom": "20px"}),
-
-        # Graph
-        html.Div([
-            dcc.Graph(id="energy-graph", config={"displayModeBar": False}),
-        ]),
-
-        dcc.Store(id="edit-store", data={"house_idx": None, "device_type": None}),
-    ],
-    style={"maxWidth": "1600px", "margin": "0 auto", "fontFamily": "Arial, sans-serif", "padding": "20px"},
+                    html.H4(id="modal-title", style={"marginBottom": "15px"}),
+                    html.Div([
+                        html.Label("Power (kW): "),
+                        dcc.Input(id="modal-input", type="number", min=0, step=0.1,
+                                  style={"width": "100px", "marginLeft": "10px"}),
+                    ]),
+                    html.Div([
+                        html.Button("Apply", id="modal-apply", n_clicks=0,
+                                    style={"marginRight": "10px", "marginTop": "15px", "padding": "8px 20px",
+                                           "backgroundColor": "#3498db", "color": "white", "border": "none", "cursor": "pointer"}),
+                        html.Button("Cancel", id="modal-cancel", n_clicks=0,
+                                    style={"marginTop": "15px", "padding": "8px 20px",
+                                           "backgroundColor": "#95a5a6", "color": "white", "border": "none", "cursor": "pointer"}),
+                    ]),
+                ], style={"backgroundColor": "white", "padding": "25px", "borderRadius": "8px",
+                          "boxShadow": "0 4px 20px rgba(0,0,0,0.3)", "minWidth": "300px"}),
+            ], style={"display": "none", "position": "fixed", "top": "0", "left": "0", "right": "0", "bottom": "0",
+                      "backgroundColor": "rgba(0,0,0,0.5)", "zIndex": "1000",
+                      "justifyContent": "center", "alignItems": "center"}),
+
+            # Pricing table (top right)
+            html.Div([
+                html.H3("Energy Costs (ct/h)", style={"marginBottom": "10px"}),
+                html.Div(id="pricing-table"),
+                html.Div(pricing_datatable("pricing-datatable"), id="pricing-datatable-container",
+                         style={} if HOUSE_COUNT > DATATABLE_THRESHOLD else {"display": "none"}),
+                html.Div(id="breakeven-indicator", style={"marginTop": "15px", "padding": "10px",
+                          "backgroundColor": "#e8f4f8", "borderRadius": "5px", "borderLeft": "4px solid #3498db"}),
+            ], style={"padding": "10px", "backgroundColor": "#f8f9fa", "borderRadius": "8px", "marginBottom": "20px"}),
+
+            # Graph
+            html.Div([
+                dcc.Graph(id="energy-graph", config={"displayModeBar": False}),
+            ]),
+
+            debug_panel(),
+
+            dcc.Store(id="edit-store", data={"house_idx": None, "device_type": None}),
+            # Empty until init_session; callbacks that need a session wait for it
+            dcc.Store(id="session-id", storage_type="session"),
+            # Bumped after an edit is stored, so the graph update always sees it
+            dcc.Store(id="edit-version", data=0),
+            # House count of the figure currently shown (meter data may differ from LEG_SIM_HOUSES)
+            dcc.Store(id="graph-houses", data=HOUSE_COUNT),
+        ],
+        style={"maxWidth": "1600px", "margin": "0 auto", "fontFamily": "Arial, sans-serif", "padding": "20px"},
+    )
+
+
+app.layout = serve_layout
+
+
+@app.callback(
+    Output("session-id", "data"),
+    [Input("session-id", "modified_timestamp")],
+    [State("session-id", "data")],
 )
+def init_session(_, session_id):
+    """Give a new tab its session id; a reload keeps the one restored from tab session storage."""
+    if session_id:
+        raise PreventUpdate
+    return str(uuid.uuid4())
 
 
 @app.callback(
@@ -94,11 +210,15 @@ app.layout = html.Div(
      Output("edit-store", "data")],
     [Input("energy-graph", "clickData"),
      Input("modal-cancel", "n_clicks")],
-    [State("edit-store", "data")],
+    [State("edit-store", "data"),
+     State("session-id", "data"),
+     State("scenario-mode", "value")],
     prevent_initial_call=True
 )
-def handle_click(click_data, cancel_clicks, edit_store):
+def handle_click(click_data, cancel_clicks, edit_store, session_id, mode):
     """Handle clicks on components to open edit modal."""
+    if not session_id:
+        raise PreventUpdate
     ctx = callback_context
     trigger = ctx.triggered[0]["prop_id"] if ctx.triggered else ""
 
@@ -110,6 +230,10 @@ def handle_click(click_data, cancel_clicks, edit_store):
     if "modal-cancel" in trigger:
         return modal_hidden, "", 0, {"house_idx": None, "device_type": None}
 
+    # Meter data is read-only: its houses come from config.yaml, not from the session model
+    if mode == "meters":
+        return no_update, no_update, no_update, no_update
+
     if click_data and "points" in click_data:
         point = click_data["points"][0]
         if "customdata" in point:
@@ -119,20 +243,20 @@ def handle_click(click_data, cancel_clicks, edit_store):
                 house_idx = custom.get("id")
 
                 if device_type in ["pv", "ev", "washer", "base"]:
-                    house = simulation.model._houses[house_idx]
+                    model = sessions.simulation(session_id).model
 
                     if device_type == "pv":
                         title = f"Edit PV Power - House {house_idx + 1}"
-                        current_value = house["pv_power_w"] / 1000
+                        current_value = model.get(house_idx, "pv_power_w") / 1000
                     elif device_type == "ev":
                         title = f"Edit EV Power - House {house_idx + 1}"
-                        current_value = house["ev_load_w"] / 1000
+                        current_value = model.get(house_idx, "ev_load_w") / 1000
                     elif device_type == "washer":
                         title = f"Edit Washer Power - House {house_idx + 1}"
-                        current_value = house["washer_load_w"] / 1000
+                        current_value = model.get(house_idx, "washer_load_w") / 1000
                     elif device_type == "base":
                         title = f"Edit Base Load - House {house_idx + 1}"
-                        current_value = house["base_load_w"] / 1000
+                        current_value = model.get(house_idx, "base_load_w") / 1000
 
                     return modal_visible, title, current_value, {"house_idx": house_idx, "device_type": device_type}
 
@@ -140,46 +264,166 @@ def handle_click(click_data, cancel_clicks, edit_store):
 
 
 @app.callback(
-    Output("edit-modal", "style", allow_duplicate=True),
+    [Output("edit-modal", "style", allow_duplicate=True),
+     Output("edit-version", "data")],
     [Input("modal-apply", "n_clicks")],
     [State("modal-input", "value"),
-     State("edit-store", "data")],
+     State("edit-store", "data"),
+     State("session-id", "data"),
+     State("edit-version", "data"),
+     State("scenario-mode", "value")],
     prevent_initial_call=True
 )
-def apply_edit(apply_clicks, new_value, edit_store):
+def apply_edit(apply_clicks, new_value, edit_store, session_id, edit_version, mode):
     """Apply the edited value."""
-    if apply_clicks and edit_store and edit_store.get("house_idx") is not None:
+    if not session_id:
+        raise PreventUpdate
+    if apply_clicks and mode != "meters" and edit_store and edit_store.get("house_idx") is not None:
         house_idx = edit_store["house_idx"]
         device_type = edit_store["device_type"]
-        house = simulation.model._houses[house_idx]
+        simulation = sessions.simulation(session_id)
+        model = simulation.model
 
         if new_value is not None and new_value >= 0:
             if device_type == "pv":
-                house["pv_power_w"] = new_value * 1000  # Convert kW to W
+                model.set(house_idx, "pv_power_w", new_value * 1000)  # Convert kW to W
             elif device_type == "ev":
-                house["ev_load_w"] = new_value * 1000  # Convert kW to W
+                model.set(house_idx, "ev_load_w", new_value * 1000)  # Convert kW to W
             elif device_type == "washer":
-                house["washer_load_w"] = new_value * 1000  # Convert kW to W
+                model.set(house_idx, "washer_load_w", new_value * 1000)  # Convert kW to W
             elif device_type == "base":
-                house["base_load_w"] = new_value * 1000  # Convert kW to W
+                model.set(house_idx, "base_load_w", new_value * 1000)  # Convert kW to W
+            sessions.save_simulation(session_id, simulation)
 
     return {"display": "none", "position": "fixed", "top": "0", "left": "0", "right": "0", "bottom": "0",
             "backgroundColor": "rgba(0,0,0,0.5)", "zIndex": "1000",
-            "justifyContent": "center", "alignItems": "center"}
+            "justifyContent": "center", "alignItems": "center"}, (edit_version or 0) + 1
 
 
 @app.callback(
-    [Output("energy-graph", "figure"), Output("pricing-table", "children"), Output("breakeven-indicator", "children")],
+    [Output("scenario-step", "max"),
+     Output("scenario-step", "marks"),
+     Output("scenario-step", "value"),
+     Output("scenario-step", "disabled"),
+     Output("live-interval", "disabled")],
+    [Input("scenario-mode", "value")],
+    [State("session-id", "data")],
+    prevent_initial_call=True
+)
+def select_scenario(mode, session_id):
+    """Run (or fetch the cached) scenario and size the time slider to it."""
+    if not session_id:
+        raise PreventUpdate
+    if mode not in SCENARIO_DAYS:
+        return 0, None, 0, True, mode != "meters"
+    result = run_scenario(sessions.simulation(session_id).model, SCENARIO_DAYS[mode])
+    return result.steps - 1, hour_marks(result), 0, False, True
+
+
+@app.callback(
+    Output("scenario-summary", "children"),
+    [Input("scenario-mode", "value"),
+     Input("price-grid-delivery", "value"),
+     Input("price-grid-consumption", "value"),
+     Input("price-pv-delivery", "value"),
+     Input("edit-version", "data"),
+     Input("session-id", "data")],
+)
+def update_scenario_summary(mode, price_grid_del, price_grid_con, price_pv_del, edit_version, session_id):
+    """Energy-weighted totals of the whole scenario; independent of the slider position."""
+    if not session_id:
+        raise PreventUpdate
+    if mode == "live":
+        return html.Span("Live mode: instantaneous state of the edited values", style={"color": "#7f8c8d"})
+    if mode == "meters":
+        return html.Span(f"Meter data from MQTT, refreshed every {LIVE_UPDATE_MS / 1000:g} s when new readings arrive",
+                         style={"color": "#7f8c8d"})
+
+    result = run_scenario(sessions.simulation(session_id).model, SCENARIO_DAYS[mode])
+    totals = scenario_totals(result, price_pv_del or 20, price_grid_con or 30, price_grid_del or 6)
+    return [
+        html.Span(f"Exports E = {totals['export_kwh']:.1f} kWh | Imports I = {totals['import_kwh']:.1f} kWh | "
+                  f"Grid import = {totals['grid_import_kwh']:.1f} kWh | Grid export = {totals['grid_export_kwh']:.1f} kWh"),
+        html.Br(),
+        html.Span("Energy-weighted p_con = ", style={"fontWeight": "bold"}),
+        html.Span(f"{totals['mean_p_con']:.2f} ct/kWh", style={"fontWeight": "bold", "color": "#2980b9"}),
+        html.Span(f" | Mean PV payout = {totals['mean_p_pv']:.2f} ct/kWh | Self-consumption = {totals['self_consumption'] * 100:.0f}% | "
+                  f"Community profit = {totals['community_profit_ct']:.1f} ct"),
+    ]
+
+
+@app.callback(
+    Output("scenario-time", "children"),
+    [Input("scenario-step", "value"), Input("scenario-mode", "value")],
+)
+def update_scenario_time(step, mode):
+    return step_label(step or 0) if mode in SCENARIO_DAYS else ""
+
+
+@app.callback(
+    Output("energy-graph", "figure", allow_duplicate=True),
+    [Input("energy-graph", "relayoutData")],
+    [State("graph-houses", "data")],
+    prevent_initial_call=True
+)
+def update_detail_level(relayout_data, num_houses):
+    """Show or collapse component nodes of large communities on zoom."""
+    patch = lod_patch(relayout_data, num_houses or 0)
+    return no_update if patch is None else patch
+
+
+@app.callback(
+    [Output("energy-graph", "figure"),
+     Output("pricing-table", "children"),
+     Output("pricing-datatable", "data"),
+     Output("pricing-datatable-container", "style"),
+     Output("breakeven-indicator", "children"),
+     Output("live-version", "data"),
+     Output("graph-houses", "data")],
     [Input("price-grid-delivery", "value"),
      Input("price-grid-consumption", "value"),
      Input("price-pv-delivery", "value"),
      Input("price-house-consumption", "value"),
-     Input("modal-apply", "n_clicks")],
+     Input("edit-version", "data"),
+     Input("scenario-step", "value"),
+     Input("scenario-mode", "value"),
+     Input("live-interval", "n_intervals"),
+     Input("session-id", "data")],
+    [State("live-version", "data")],
 )
-def update_graph(price_grid_del, price_grid_con, price_pv_del, price_house_con, apply_clicks):
+def update_graph(price_grid_del, price_grid_con, price_pv_del, price_house_con, edit_version, step, mode,
+                 n_intervals, session_id, live_version):
     """Update graph and pricing table."""
-    snapshot = simulation.tick()
-    fig = build_graph(snapshot)
+    if not session_id:
+        raise PreventUpdate
+    triggered = callback_context.triggered_prop_ids
+    simulation = sessions.simulation(session_id)
+
+    if mode == "meters" and live_state is not None:
+        # Interval ticks without new meter readings send nothing
+        if "live-interval.n_intervals" in triggered and live_state.version == live_version:
+            raise PreventUpdate
+        live_version = live_state.version
+        snapshot = live_state.snapshot()
+    elif mode in SCENARIO_DAYS:
+        # Scrubbing reads the cached scenario arrays; nothing is recalculated
+        snapshot = run_scenario(simulation.model, SCENARIO_DAYS[mode]).snapshot(step or 0)
+    else:
+        with metrics.stage("model_update"):
+            snapshot = simulation.tick()
+
+    # Full figure on page load, once a new tab got its session id, and on mode switches
+    # (house count may differ); afterwards only Patch deltas of the dynamic values
+    num_houses = len(snapshot.houses)
+    full_build = (callback_context.triggered_id is None or "scenario-mode.value" in triggered
+                  or "session-id.data" in triggered)
+    with metrics.stage("figure_build"):
+        if full_build:
+            fig = build_graph(snapshot, LAYOUT_MODE)
+            sessions.save_graph_values(session_id, None)
+        else:
+            fig, graph_values = build_graph_patch(snapshot, sessions.graph_values(session_id), LAYOUT_MODE)
+            sessions.save_graph_values(session_id, graph_values)
 
     # Calculate E (total exports) and I (total imports) for break-even optimization
     E_total = 0.0  # Total exports from houses (kWh)
@@ -191,156 +435,32 @@ def update_graph(price_grid_del, price_grid_con, price_pv_del, price_house_con,
         else:
             I_total += abs(net_kw)
 
-    # Calculate optimal p_con (break-even house consumption price) BEFORE building table
-    # Formula: p_con = p_grid + (E/I) * (p_pv - p_grid)
+    # Break-even house consumption price (shared rules, leg-common/breakeven.py)
     p_pv = price_pv_del or 20
     p_grid_del = price_grid_del or 6
     p_grid_con = price_grid_con or 30
-
-    if I_total == 0:
-        # No imports - use default price
-        optimal_p_con = price_house_con or 25
-    elif E_total == 0:
-        # No exports - pass-through from grid
-        optimal_p_con = p_grid_con
-    else:
-        # Normal case: calculate break-even price
-        if E_total >= I_total:
-            p_grid = p_grid_del  # Surplus mode
+    optimal_p_con, effective_p_pv = breakeven_tariffs(E_total, I_total, p_pv, p_grid_con, p_grid_del)
+    mode = breakeven_mode(E_total, I_total, p_pv, p_grid_con, p_grid_del)
+
+    # Pricing table (ct/h): memoized on rounded inputs; large communities only send DataTable rows.
+    # Which of the two is shown follows the rendered house count and switches with the figure.
+    prices = (p_pv, price_house_con or 25, p_grid_con, p_grid_del)
+    large_table = num_houses > DATATABLE_THRESHOLD
+    with metrics.stage("table_build"):
+        if large_table:
+            pricing_table, pricing_data = [] if full_build else no_update, pricing_table_data(snapshot, *prices)
         else:
-            p_grid = p_grid_con  # Deficit mode
-        optimal_p_con = p_grid + (E_total / I_total) * (p_pv - p_grid)
-
-    # Build pricing table with 7 columns: Title, House Buy/Sell, Community Buy/Sell, Grid Buy/Sell
-    # Logic: House sells to Community (same kWh), Community sells to Grid (same kWh)
-    # Build pricing table using user's price settings
-    table_rows = []
-    totals = {"house_buy": 0, "house_sell": 0, "comm_buy": 0, "comm_sell": 0}
-
-    for idx, house in enumerate(snapshot.houses):
-        # Convert W to kW for calculations
-        net_kw = house.net_power_w / 1000
-
-        # House: Net exchange with community
-        # If net > 0: House exports (sells) to community
-        # If net < 0: House imports (buys) from community
-        if net_kw > 0:  # House exports to community
-            house_buy = 0
-            house_sell = net_kw * p_pv  # House sells at PV rate
-            comm_buy = house_sell  # Community buys same amount
-            comm_sell = 0
-        else:  # House imports from community
-            house_buy = abs(net_kw) * (price_house_con or 25)  # House buys at user-set rate
-            house_sell = 0
-            comm_buy = 0
-            comm_sell = house_buy  # Community sells same amount
-
-        totals["house_buy"] += house_buy
-        totals["house_sell"] += house_sell
-        totals["comm_buy"] += comm_buy
-        totals["comm_sell"] += comm_sell
-
-        # Cell styling with borders to group columns
-        cell_buy = {"color": "#d95f02", "padding": "2px 4px", "textAlign": "right", "borderLeft": "2px solid #333"}
-        cell_sell = {"color": "#1b9e77", "padding": "2px 4px", "textAlign": "right", "borderRight": "2px solid #333"}
-        cell_na = {"color": "#999", "padding": "2px 4px", "textAlign": "right"}
-
-        table_rows.append(html.Tr([
-            html.Td(f"House {idx + 1}", style={"fontWeight": "bold", "padding": "4px"}),
-            html.Td(f"{house_buy:.1f}", style=cell_buy),
-            html.Td(f"{house_sell:.1f}", style=cell_sell),
-            html.Td(f"{comm_buy:.1f}", style=cell_buy),
-            html.Td(f"{comm_sell:.1f}", style=cell_sell),
-            html.Td("-", style={**cell_na, "borderLeft": "2px solid #333"}),
-            html.Td("-", style={**cell_na, "borderRight": "2px solid #333"}),
-        ]))
-
-    # Grid: same kWh as community net, at grid prices
-    community_net_kw = snapshot.community.net_community_power_w / 1000
-    if community_net_kw > 0:  # Community exports to grid
-        grid_buy = community_net_kw * p_grid_del  # Grid buys at delivery rate
-        grid_sell = 0
-        # Community earns from selling to grid
-        totals["comm_sell"] += grid_buy  # Community sells to grid (same amount grid buys)
-    else:  # Community imports from grid
-        grid_buy = 0
-        grid_sell = abs(community_net_kw) * p_grid_con  # Grid sells at consumption rate
-        # Community pays for buying from grid
-        totals["comm_buy"] += grid_sell  # Community buys from grid (same amount grid sells)
-
-    # Grid row (between houses and total)
-    cell_buy = {"color": "#d95f02", "padding": "2px 4px", "textAlign": "right", "borderLeft": "2px solid #333"}
-    cell_sell = {"color": "#1b9e77", "padding": "2px 4px", "textAlign": "right", "borderRight": "2px solid #333"}
-    cell_na = {"color": "#999", "padding": "2px 4px", "textAlign": "right"}
-
-    table_rows.append(html.Tr([
-        html.Td("Grid", style={"fontWeight": "bold", "padding": "4px", "backgroundColor": "#e8e8e8"}),
-        html.Td("-", style={**cell_na, "borderLeft": "2px solid #333", "backgroundColor": "#e8e8e8"}),
-        html.Td("-", style={**cell_na, "borderRight": "2px solid #333", "backgroundColor": "#e8e8e8"}),
-        html.Td(f"{grid_sell:.1f}" if grid_sell > 0 else "-", style={**cell_buy, "backgroundColor": "#e8e8e8"}),
-        html.Td(f"{grid_buy:.1f}" if grid_buy > 0 else "-", style={**cell_sell, "backgroundColor": "#e8e8e8"}),
-        html.Td(f"{grid_buy:.1f}", style={**cell_buy, "backgroundColor": "#e8e8e8"}),
-        html.Td(f"{grid_sell:.1f}", style={**cell_sell, "backgroundColor": "#e8e8e8"}),
-    ]))
-
-    # Total row with matching borders
-    tot_base = {"fontWeight": "bold", "borderTop": "2px solid #333", "padding": "2px 4px", "textAlign": "right"}
-    tot_buy = {**tot_base, "color": "#d95f02", "borderLeft": "2px solid #333"}
-    tot_sell = {**tot_base, "color": "#1b9e77", "borderRight": "2px solid #333"}
-
-    table_rows.append(html.Tr([
-        html.Td("TOTAL", style={**tot_base, "textAlign": "left"}),
-        html.Td(f"{totals['house_buy']:.1f}", style=tot_buy),
-        html.Td(f"{totals['house_sell']:.1f}", style=tot_sell),
-        html.Td(f"{totals['comm_buy']:.1f}", style=tot_buy),
-        html.Td(f"{totals['comm_sell']:.1f}", style=tot_sell),
-        html.Td(f"{grid_buy:.1f}", style=tot_buy),
-        html.Td(f"{grid_sell:.1f}", style=tot_sell),
-    ]))
-
-    # Community Profit row - prominent display with large font
-    community_profit = totals["comm_sell"] - totals["comm_buy"]
-    profit_color = "#27ae60" if abs(community_profit) < 0.1 else ("#27ae60" if community_profit > 0 else "#e74c3c")
-    table_rows.append(html.Tr([
-        html.Td("Community Profit:", colSpan=5, style={"fontWeight": "bold", "fontSize": "24px",
-                "padding": "12px 4px", "textAlign": "right", "borderTop": "2px solid #333"}),
-        html.Td(f"{community_profit:.1f} ct/h", colSpan=2, style={"fontWeight": "bold", "fontSize": "28px",
-                "padding": "12px 20px 12px 4px", "textAlign": "right", "color": profit_color,
-                "borderTop": "2px solid #333", "backgroundColor": "#f0f8f0" if abs(community_profit) < 0.1 else "#fff"}),
-    ]))
-
-    # Column group styling
-    group_style = {"textAlign": "center", "padding": "4px 2px", "borderLeft": "2px solid #333", "backgroundColor": "#e8e8e8"}
-    sub_buy = {"color": "#d95f02", "padding": "2px 4px", "textAlign": "right", "fontSize": "11px"}
-    sub_sell = {"color": "#1b9e77", "padding": "2px 4px", "textAlign": "right", "fontSize": "11px", "borderRight": "2px solid #333"}
-
-    pricing_table = html.Table([
-        html.Thead([
-            html.Tr([
-                html.Th("", rowSpan=2, style={"padding": "4px", "width": "70px"}),
-                html.Th("House", colSpan=2, style={**group_style}),
-                html.Th("Community", colSpan=2, style={**group_style}),
-                html.Th("Grid", colSpan=2, style={**group_style}),
-            ]),
-            html.Tr([
-                html.Th("Buy", style={**sub_buy, "borderLeft": "2px solid #333"}),
-                html.Th("Sell", style=sub_sell),
-                html.Th("Buy", style={**sub_buy, "borderLeft": "2px solid #333"}),
-                html.Th("Sell", style=sub_sell),
-                html.Th("Buy", style={**sub_buy, "borderLeft": "2px solid #333"}),
-                html.Th("Sell", style=sub_sell),
-            ]),
-        ]),
-        html.Tbody(table_rows),
-    ], style={"width": "100%", "borderCollapse": "collapse", "fontSize": "12px"})
+            pricing_table, pricing_data = render_pricing_table(snapshot, *prices), no_update
+    table_style = ({} if large_table else {"display": "none"}) if full_build else no_update
 
     # Break-even indicator: show the optimal p_con being used
-    if I_total == 0:
-        mode = "No imports"
+    if mode == NO_CONSUMPTION:
         breakeven_content = [
             html.Strong("Break-Even Optimization"),
             html.Br(),
-            html.Span("No house imports (I=0) - using default price", style={"color": "#7f8c8d"}),
+            html.Span("No house imports (I=0) - ", style={"color": "#7f8c8d"}),
+            html.Span(f"p_con = {optimal_p_con:.2f} ct/kWh", style={"fontWeight": "bold", "color": "#2980b9", "fontSize": "14px"}),
+            html.Span(" (= grid price)", style={"color": "#7f8c8d"}),
         ]
     elif E_total == 0:
         breakeven_content = [
@@ -353,18 +473,59 @@ def update_graph(price_grid_del, price_grid_con, price_pv_del, price_house_con,
             html.Span(" (= grid price)", style={"color": "#7f8c8d"}),
         ]
     else:
-        mode = "Surplus" if E_total >= I_total else "Deficit"
+        mode_label = {SURPLUS: "Surplus", SURPLUS_CAPPED: "Surplus (capped)", DEFICIT: "Deficit"}[mode]
         breakeven_content = [
             html.Strong("Break-Even Optimization"),
             html.Br(),
             html.Span(f"Exports = {E_total:.1f} kWh | Imports = {I_total:.1f} kWh | Mode: "),
-            html.Span(mode, style={"color": "#1b9e77", "fontWeight": "bold"}),
+            html.Span(mode_label, style={"color": "#1b9e77", "fontWeight": "bold"}),
             html.Br(),
-            html.Span(f"p_con = ", style={"fontWeight": "bold"}),
+            html.Span("p_con = ", style={"fontWeight": "bold"}),
             html.Span(f"{optimal_p_con:.2f} ct/kWh", style={"fontWeight": "bold", "color": "#2980b9", "fontSize": "14px"}),
         ]
-
-    return fig, pricing_table, breakeven_content
+        if mode == SURPLUS_CAPPED:
+            breakeven_content += [
+                html.Span(f" (capped at grid price) | PV payout reduced to {effective_p_pv:.2f} ct/kWh",
+                          style={"color": "#7f8c8d"}),
+            ]
+
+    return (fig, pricing_table, pricing_data, table_style, breakeven_content, live_version,
+            num_houses if full_build else no_update)
+
+
+if metrics.enabled:
+    @app.callback(
+        Output("debug-metrics", "children"),
+        Input("debug-interval", "n_intervals"),
+    )
+    def update_debug_metrics(n_intervals):
+        """Rolling p50/p90/p99 per callback and measurement (same data as /metrics)."""
+        header = html.Tr([html.Th(h, style={"textAlign": "left", "paddingRight": "15px"})
+                          for h in ("Callback", "Measurement", "Count", "p50", "p90", "p99", "Max")])
+        rows = []
+        for callback, measurements in metrics.summaries().items():
+            for measurement, summary in measurements.items():
+                if not summary["window"]:
+                    continue
+                seconds = measurement.endswith("_seconds")
+                rows.append(html.Tr(
+                    [html.Td(callback), html.Td(measurement), html.Td(summary["count"])]
+                    + [html.Td(f"{summary[k] * 1000:.1f} ms" if seconds else f"{summary[k] / 1024:.1f} KB")
+                       for k in ("p50", "p90", "p99", "max")]
+                ))
+        return html.Table([header] + rows) if rows else "No callback requests recorded yet"
+
+    @app.callback(
+        Output("debug-profile-output", "children"),
+        [Input("debug-profile", "n_clicks"),
+         Input("debug-interval", "n_intervals")],
+    )
+    def update_debug_profile(n_clicks, n_intervals):
+        """Arm a one-shot cProfile capture; show the last captured profile."""
+        if callback_context.triggered_id == "debug-profile":
+            metrics.arm_profile()
+            return "Profiling the next graph/table update..."
+        return metrics.last_profile or no_update
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the simulator's update path.
+
+For each community size, times one model tick (EnergyModel.update), the full
+figure (build_graph, static skeleton cached as after the first page load),
+a Patch update (build_graph_patch), the figure's JSON serialization as Dash
+sends it, and the pricing table as update_graph builds it (HTML table up to
+20 houses, DataTable rows above; memo caches cleared so every call builds).
+Peak memory is traced over one complete cold update: tick, figure with
+empty caches, serialization and table.
+
+Results can be saved as a baseline and later runs compared against it;
+--compare exits non-zero when a time regresses by more than --tolerance.
+
+Usage:
+    python bench_scaling.py
+    python bench_scaling.py --sizes 5 50 500 --save bench_baseline.json
+    python bench_scaling.py --compare bench_baseline.json --tolerance 1.5
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import layout
+import plotly.io as pio
+import pricing_table
+from layout import build_graph, build_graph_patch
+from pricing_table import DATATABLE_THRESHOLD, pricing_table_data, render_pricing_table
+from simulation import Simulation
+
+PRICES = (20.0, 25.0, 30.0, 6.0)  # p_pv, p_house_con, p_grid_con, p_grid_del
+TIMED_CASES = ("model_update", "build_graph", "build_graph_patch", "figure_json", "pricing_table")
+
+
+def best_of(stmt, repeat: int, number: int) -> float:
+    """Best time per call in seconds."""
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def calls_for(houses: int) -> int:
+    """Calls per timing run, so small communities are not dominated by timer noise."""
+    return max(1, 500 // houses)
+
+
+def clear_caches() -> None:
+    for cached in (layout._static_figure, layout._large_static_figure, layout._large_positions,
+                   pricing_table._table_values, pricing_table._html_table, pricing_table._datatable_rows):
+        cached.cache_clear()
+
+
+def build_table(snapshot):
+    if len(snapshot.houses) > DATATABLE_THRESHOLD:
+        return pricing_table_data(snapshot, *PRICES)
+    return render_pricing_table(snapshot, *PRICES)
+
+
+def cold_update(simulation: Simulation) -> None:
+    clear_caches()
+    snapshot = simulation.tick()
+    pio.to_json(build_graph(snapshot), validate=False)
+    build_table(snapshot)
+
+
+def bench_size(houses: int, repeat: int) -> dict:
+    simulation = Simulation(houses)
+    model = simulation.model
+    snapshot = simulation.tick()
+    number = calls_for(houses)
+
+    fig = build_graph(snapshot)
+    _, graph_values = build_graph_patch(snapshot, None, "radial")
+    next_snapshot = simulation.tick()
+
+    def table():
+        pricing_table._table_values.cache_clear()
+        pricing_table._html_table.cache_clear()
+        pricing_table._datatable_rows.cache_clear()
+        return build_table(snapshot)
+
+    result = {
+        "model_update": best_of(model.update, repeat, number),
+        "build_graph": best_of(lambda: build_graph(snapshot), repeat, number),
+        "build_graph_patch": best_of(lambda: build_graph_patch(next_snapshot, graph_values, "radial"), repeat, number),
+        "figure_json": best_of(lambda: pio.to_json(fig, validate=False), repeat, number),
+        "pricing_table": best_of(table, repeat, number),
+        "figure_bytes": len(pio.to_json(fig, validate=False)),
+    }
+
+    tracemalloc.start()
+    cold_update(simulation)
+    _, result["peak_bytes"] = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list[str]:
+    """Timed cases slower than baseline * tolerance and by more than min_delta seconds."""
+    regressions = []
+    for size, cases in results.items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+        for case in TIMED_CASES:
+            if case in base and cases[case] > base[case] * tolerance and cases[case] - base[case] > min_delta:
+                regressions.append(f"{size} houses {case}: {cases[case] * 1e3:.2f}ms "
+                                   f"(baseline {base[case] * 1e3:.2f}ms, {cases[case] / base[case]:.1f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulator update path across community sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500, 5000], help="House counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Write results as a baseline JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor vs. baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Ignore slowdowns smaller than this (timer noise on sub-millisecond cases)")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'houses':>7} " + " ".join(f"{case:>17}" for case in TIMED_CASES) + f" {'fig KiB':>9} {'peak MiB':>9}")
+    for houses in args.sizes:
+        result = bench_size(houses, args.repeat)
+        results[str(houses)] = result
+        print(f"{houses:>7} " + " ".join(f"{result[case] * 1e3:>15.3f}ms" for case in TIMED_CASES)
+              + f" {result['figure_bytes'] / 1024:>9.1f} {result['peak_bytes'] / 2**20:>9.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms / 1e3)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance}x)")
+
+
+if __name__ == "__main__":
+    main()
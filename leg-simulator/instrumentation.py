@@ -0,0 +1,170 @@
+"""
+Opt-in callback instrumentation for the LEG simulator.
+
+Enabled with LEG_SIM_METRICS=1. Every Dash callback request is timed end to
+end (including Dash's JSON serialization) and its response size recorded;
+callbacks can add stage timings (model update, figure build, table build)
+with `metrics.stage(name)`. Samples go into rolling windows per callback
+and stage, served as Prometheus text on /metrics (JSON with ?format=json)
+and shown in the on-page debug panel. One callback request at a time can
+be captured with cProfile (armed via POST /metrics/profile or the panel).
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+from flask import Response, g, request
+
+DASH_UPDATE_PATH = "/_dash-update-component"
+QUANTILES = (0.5, 0.9, 0.99)
+# Callbacks updating these outputs (the debug panel itself) are not recorded
+IGNORED_OUTPUT_PREFIXES = ("debug-",)
+
+
+class RollingHistogram:
+    """Last `size` samples of one measurement."""
+
+    def __init__(self, size: int = 1000) -> None:
+        self.samples = deque(maxlen=size)
+        self.total_count = 0
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+        self.total_count += 1
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": self.total_count, "window": 0}
+        values = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+        quantiles = np.quantile(values, QUANTILES)
+        return {
+            "count": self.total_count,
+            "window": len(values),
+            "mean": float(values.mean()),
+            "max": float(values.max()),
+            **{f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles)},
+        }
+
+
+class Instrumentation:
+    """Rolling per-callback timings and response sizes; no-op unless enabled."""
+
+    def __init__(self, enabled: bool = False, window: int = 1000) -> None:
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str], RollingHistogram] = defaultdict(
+            lambda: RollingHistogram(self.window)
+        )
+        self._profile_armed = False
+        self.last_profile: str = ""
+
+    def install(self, server) -> None:
+        """Register request hooks and the /metrics routes on the Flask server."""
+        if not self.enabled:
+            return
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+        server.add_url_rule("/metrics", "metrics", self._metrics_view)
+        server.add_url_rule("/metrics/profile", "metrics_profile", self._profile_view, methods=["GET", "POST"])
+
+    def record(self, callback: str, measurement: str, value: float) -> None:
+        with self._lock:
+            self._histograms[(callback, measurement)].add(value)
+
+    @contextmanager
+    def _timed_stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = getattr(g, "metrics_stages", None)
+            if stages is not None:
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+    def stage(self, name: str):
+        """Time a block inside a callback as a stage of the current request."""
+        return self._timed_stage(name) if self.enabled else nullcontext()
+
+    def arm_profile(self) -> None:
+        """Profile the next recorded callback request with cProfile."""
+        with self._lock:
+            self._profile_armed = True
+
+    # Flask hooks
+
+    def _before_request(self):
+        if request.path != DASH_UPDATE_PATH:
+            return
+        body = request.get_json(silent=True) or {}
+        output = body.get("output", "").strip(".")
+        callback = output.split("...")[0] or "unknown"
+        if callback.startswith(IGNORED_OUTPUT_PREFIXES):
+            return
+
+        g.metrics_callback = callback
+        g.metrics_stages = {}
+        g.metrics_started = time.perf_counter()
+        with self._lock:
+            armed, self._profile_armed = self._profile_armed, False
+        if armed:
+            g.metrics_profiler = cProfile.Profile()
+            g.metrics_profiler.enable()
+
+    def _after_request(self, response):
+        callback = getattr(g, "metrics_callback", None)
+        if callback is None:
+            return response
+
+        profiler = getattr(g, "metrics_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            self.last_profile = f"{callback} at {time.strftime('%H:%M:%S')}\n{out.getvalue()}"
+
+        self.record(callback, "total_seconds", time.perf_counter() - g.metrics_started)
+        self.record(callback, "response_bytes", response.calculate_content_length() or 0)
+        for stage, seconds in g.metrics_stages.items():
+            self.record(callback, f"{stage}_seconds", seconds)
+        return response
+
+    # Views
+
+    def summaries(self) -> dict:
+        with self._lock:
+            items = list(self._histograms.items())
+        result: dict = {}
+        for (callback, measurement), histogram in sorted(items):
+            result.setdefault(callback, {})[measurement] = histogram.summary()
+        return result
+
+    def _metrics_view(self):
+        summaries = self.summaries()
+        if request.args.get("format") == "json":
+            return Response(json.dumps(summaries, indent=2), mimetype="application/json")
+
+        lines = []
+        for callback, measurements in summaries.items():
+            for measurement, summary in measurements.items():
+                name = f"leg_sim_callback_{measurement}"
+                labels = f'callback="{callback}"'
+                for q in QUANTILES:
+                    key = f"p{int(q * 100)}"
+                    if key in summary:
+                        lines.append(f'{name}{{{labels},quantile="{q}"}} {summary[key]:.6g}')
+                lines.append(f"{name}_count{{{labels}}} {summary['count']}")
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+    def _profile_view(self):
+        if request.method == "POST":
+            self.arm_profile()
+            return Response("armed\n", mimetype="text/plain")
+        return Response(self.last_profile or "no profile captured\n", mimetype="text/plain")
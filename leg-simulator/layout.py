@@ -1,7 +1,9 @@
+import copy
 import math
+from functools import lru_cache
 
 import plotly.graph_objects as go
-
+from dash import Patch
 from simulation import SimulationSnapshot
 
 
@@ -16,209 +18,147 @@ def _format_power(watts: float) -> str:
 LINE_WIDTH = 2
 ARROW_WIDTH = 2
 
+# Component arrangement around house (radius from house center)
+COMP_RADIUS = 1.2
+PV_ANGLE = math.pi / 2       # top
+BASE_ANGLE = -math.pi / 2    # bottom
+EV_ANGLE = math.pi           # left
+WASHER_ANGLE = 0             # right
+
+HOUSE_SPACING = 3.5
+HOUSE_Y = 4
+COMM_X, COMM_Y = 0, -2       # Community position (below houses)
+GRID_X, GRID_Y = 0, -6       # Grid position (below community)
+
+# Per-house figure slots: 5 shapes (PV, base, EV, washer, community link)
+# and 2 annotations (flow arrow, flow label)
+SHAPES_PER_HOUSE = 5
+ANNOTATIONS_PER_HOUSE = 2
+
+EXPORT_COLOR = "#1b9e77"
+IMPORT_COLOR = "#d95f02"
+IDLE_COLOR = "#ccc"
+
+# Above this many houses the single-row SVG layout is replaced by the
+# large-community layout: clustered positions, WebGL line traces and
+# component nodes that only appear when zoomed in
+LARGE_COMMUNITY_THRESHOLD = 20
+LARGE_HOUSE_SPACING = 3.0
+LARGE_COMP_RADIUS = 0.7
+# Component nodes are shown once the visible x-range is narrower than this
+LOD_DETAIL_SPAN = 40.0
+
+# Trace indices of the large-community figure
+TRACE_LINK_EXPORT, TRACE_LINK_IMPORT, TRACE_LINK_IDLE = 0, 1, 2
+TRACE_GRID_LINK = 3
+TRACE_COMP_LINKS, TRACE_COMPONENTS = 4, 5
+TRACE_HOUSES, TRACE_MAIN = 6, 7
+
+LEGEND_ANNOTATIONS = [
+    dict(x=10, y=4, text="<b>Legend</b>", showarrow=False, font=dict(size=14), xanchor="left"),
+    dict(x=10, y=3.2, text="☀️ PV (production)", showarrow=False, font=dict(size=13, color="#f4d03f"), xanchor="left"),
+    dict(x=10, y=2.4, text="💡 Base load", showarrow=False, font=dict(size=13, color="#d95f02"), xanchor="left"),
+    dict(x=10, y=1.6, text="🚗 EV charger", showarrow=False, font=dict(size=13, color="#e74c3c"), xanchor="left"),
+    dict(x=10, y=0.8, text="🧺 Washer", showarrow=False, font=dict(size=13, color="#9b59b6"), xanchor="left"),
+    dict(x=10, y=-0.2, text="<b>→</b> Green = Export", showarrow=False, font=dict(size=12, color="#1b9e77"), xanchor="left"),
+    dict(x=10, y=-1.0, text="<b>→</b> Orange = Import", showarrow=False, font=dict(size=12, color="#d95f02"), xanchor="left"),
+]
+
+
+def _house_position(idx: int, num_houses: int) -> tuple[float, float]:
+    """Houses arranged horizontally at top."""
+    return (idx - (num_houses - 1) / 2) * HOUSE_SPACING, HOUSE_Y
+
+
+def _component_positions(house_x: float, house_y: float) -> list[tuple[float, float]]:
+    """PV, base, EV, washer positions around a house."""
+    return [
+        (house_x + COMP_RADIUS * math.cos(angle), house_y + COMP_RADIUS * math.sin(angle))
+        for angle in (PV_ANGLE, BASE_ANGLE, EV_ANGLE, WASHER_ANGLE)
+    ]
 
-def build_graph(snapshot: SimulationSnapshot) -> go.Figure:
-    """Build the energy flow graph with house components arranged in a circle."""
-
-    # Main nodes (text below): houses, community, grid
-    main_x, main_y, main_text, main_color, main_size, main_hover, main_customdata = [], [], [], [], [], [], []
-
-    # Component nodes (text inside): PV, base load, EV, washer
-    comp_x, comp_y, comp_text, comp_color, comp_size, comp_hover, comp_customdata = [], [], [], [], [], [], []
 
-    annotations = []
+def _arrow_slot(font_size: int) -> tuple[dict, dict]:
+    """Hidden flow arrow and flow label annotations, filled in per update."""
+    arrow = dict(
+        x=0, y=0, ax=0, ay=0,
+        xref="x", yref="y", axref="x", ayref="y",
+        showarrow=True, arrowhead=2, arrowsize=1.2, arrowwidth=ARROW_WIDTH, arrowcolor=IDLE_COLOR,
+        visible=False,
+    )
+    label = dict(x=0, y=0, text="", showarrow=False, font=dict(size=font_size, color=IDLE_COLOR), visible=False)
+    return arrow, label
+
+
+@lru_cache(maxsize=8)
+def _static_figure(num_houses: int) -> dict:
+    """
+    Static figure skeleton for a community size: node positions, connection
+    geometry, legend and hidden flow-arrow slots. Built once per size; only
+    the values from _dynamic_values change between updates.
+    """
+    main_x, main_y, main_text, main_color, main_size, main_customdata = [], [], [], [], [], []
+    comp_x, comp_y, comp_size, comp_customdata = [], [], [], []
     shapes = []
+    annotations = []
 
-    # Component arrangement around house (radius from house center)
-    COMP_RADIUS = 1.2
-    PV_ANGLE = math.pi / 2       # top
-    BASE_ANGLE = -math.pi / 2    # bottom
-    EV_ANGLE = math.pi           # left
-    WASHER_ANGLE = 0             # right
-
-    HOUSE_SPACING = 3.5
-    num_houses = len(snapshot.houses)
-
-    for idx, house in enumerate(snapshot.houses):
-        # Houses arranged horizontally at top
-        house_x = (idx - (num_houses - 1) / 2) * HOUSE_SPACING
-        house_y = 4
+    for idx in range(num_houses):
+        house_x, house_y = _house_position(idx, num_houses)
 
-        # Main house node
         main_x.append(house_x)
         main_y.append(house_y)
         main_text.append(f"House {idx+1}")
         main_color.append("#4a90d9")
         main_size.append(40)
-        main_hover.append(f"<b>House {idx+1}</b><br>Net: {_format_power(house.net_power_w)}")
         main_customdata.append({"type": "house", "id": idx})
 
-        # PV panel (top)
-        pv_x = house_x + COMP_RADIUS * math.cos(PV_ANGLE)
-        pv_y = house_y + COMP_RADIUS * math.sin(PV_ANGLE)
-        comp_x.append(pv_x)
-        comp_y.append(pv_y)
-        pv_power = house.pv_power_w
-        comp_text.append(f"☀️<br>{_format_power(pv_power)}")
-        comp_color.append("#f4d03f" if pv_power > 100 else "#bbb")
-        comp_size.append(55)
-        comp_hover.append(f"<b>PV Panel</b><br>{_format_power(pv_power)} - Click to edit")
-        comp_customdata.append({"type": "pv", "id": idx})
-        # Line: PV - House
-        shapes.append(dict(
-            type="line", x0=pv_x, y0=pv_y, x1=house_x, y1=house_y,
-            line=dict(color="#1b9e77", width=LINE_WIDTH), layer="below",
-        ))
-
-        # Base load (bottom)
-        base_x = house_x + COMP_RADIUS * math.cos(BASE_ANGLE)
-        base_y = house_y + COMP_RADIUS * math.sin(BASE_ANGLE)
-        comp_x.append(base_x)
-        comp_y.append(base_y)
-        base_power = house.base_load_w
-        comp_text.append(f"💡<br>{_format_power(base_power)}")
-        comp_color.append("#d95f02")
-        comp_size.append(55)
-        comp_hover.append(f"<b>Base Load</b><br>{_format_power(base_power)} - Click to edit")
-        comp_customdata.append({"type": "base", "id": idx, "clickable": True})
-        # Line: House - Base
-        shapes.append(dict(
-            type="line", x0=house_x, y0=house_y, x1=base_x, y1=base_y,
-            line=dict(color="#d95f02", width=LINE_WIDTH), layer="below",
-        ))
-
-        # EV Charger (left)
-        ev_x = house_x + COMP_RADIUS * math.cos(EV_ANGLE)
-        ev_y = house_y + COMP_RADIUS * math.sin(EV_ANGLE)
-        comp_x.append(ev_x)
-        comp_y.append(ev_y)
-        ev_power = house.ev_load_w
-        ev_on = ev_power > 0
-        comp_text.append(f"🚗<br>{_format_power(ev_power)}" if ev_on else "🚗<br>0kW")
-        comp_color.append("#e74c3c" if ev_on else "#95a5a6")
-        comp_size.append(55)
-        comp_hover.append(f"<b>EV Charger</b><br>{_format_power(ev_power)} - Click to edit")
-        comp_customdata.append({"type": "ev", "id": idx, "clickable": True})
-        # Line: House - EV
-        shapes.append(dict(
-            type="line", x0=house_x, y0=house_y, x1=ev_x, y1=ev_y,
-            line=dict(color="#e74c3c" if ev_on else "#ccc", width=LINE_WIDTH), layer="below",
-        ))
-
-        # Washer (right)
-        washer_x = house_x + COMP_RADIUS * math.cos(WASHER_ANGLE)
-        washer_y = house_y + COMP_RADIUS * math.sin(WASHER_ANGLE)
-        comp_x.append(washer_x)
-        comp_y.append(washer_y)
-        washer_power = house.washer_load_w
-        washer_on = washer_power > 0
-        comp_text.append(f"🧺<br>{_format_power(washer_power)}" if washer_on else "🧺<br>0kW")
-        comp_color.append("#9b59b6" if washer_on else "#95a5a6")
-        comp_size.append(55)
-        comp_hover.append(f"<b>Washer</b><br>{_format_power(washer_power)} - Click to edit")
-        comp_customdata.append({"type": "washer", "id": idx, "clickable": True})
-        # Line: House - Washer
-        shapes.append(dict(
-            type="line", x0=house_x, y0=house_y, x1=washer_x, y1=washer_y,
-            line=dict(color="#9b59b6" if washer_on else "#ccc", width=LINE_WIDTH), layer="below",
-        ))
+        positions = _component_positions(house_x, house_y)
+        customdata = [
+            {"type": "pv", "id": idx},
+            {"type": "base", "id": idx, "clickable": True},
+            {"type": "ev", "id": idx, "clickable": True},
+            {"type": "washer", "id": idx, "clickable": True},
+        ]
+        for (comp_pos_x, comp_pos_y), custom in zip(positions, customdata):
+            comp_x.append(comp_pos_x)
+            comp_y.append(comp_pos_y)
+            comp_size.append(55)
+            comp_customdata.append(custom)
+            # Line: House - component
+            shapes.append(dict(
+                type="line", x0=comp_pos_x, y0=comp_pos_y, x1=house_x, y1=house_y,
+                line=dict(color=IDLE_COLOR, width=LINE_WIDTH), layer="below",
+            ))
 
         # Line from house to community (always visible)
-        comm_x, comm_y = 0, -2  # Community position (below houses)
-        flow = house.net_power_w
-        flow_color = "#1b9e77" if flow > 0 else "#d95f02" if flow < 0 else "#ccc"
-
-        # Always draw base connection line
         shapes.append(dict(
-            type="line", x0=house_x, y0=house_y, x1=comm_x, y1=comm_y,
-            line=dict(color="#ccc" if abs(flow) <= 10 else flow_color, width=LINE_WIDTH), layer="below",
+            type="line", x0=house_x, y0=house_y, x1=COMM_X, y1=COMM_Y,
+            line=dict(color=IDLE_COLOR, width=LINE_WIDTH), layer="below",
         ))
-
-        if abs(flow) > 10:
-            if flow > 0:  # Export: House -> Community
-                annotations.append(dict(
-                    x=comm_x, y=comm_y,
-                    ax=house_x, ay=house_y,
-                    xref="x", yref="y", axref="x", ayref="y",
-                    showarrow=True, arrowhead=2, arrowsize=1.2, arrowwidth=ARROW_WIDTH, arrowcolor=flow_color,
-                ))
-            else:  # Import: Community -> House
-                annotations.append(dict(
-                    x=house_x, y=house_y,
-                    ax=comm_x, ay=comm_y,
-                    xref="x", yref="y", axref="x", ayref="y",
-                    showarrow=True, arrowhead=2, arrowsize=1.2, arrowwidth=ARROW_WIDTH, arrowcolor=flow_color,
-                ))
-            # Flow label
-            mid_x = (house_x + comm_x) / 2
-            mid_y = (house_y + comm_y) / 2
-            annotations.append(dict(
-                x=mid_x + 0.5, y=mid_y,
-                text=f"<b>{_format_power(abs(flow))}</b>",
-                showarrow=False,
-                font=dict(size=10, color=flow_color),
-            ))
+        annotations.extend(_arrow_slot(font_size=10))
 
     # Community bus (below houses, centered)
-    comm_x, comm_y = 0, -2
-    main_x.append(comm_x)
-    main_y.append(comm_y)
+    main_x.append(COMM_X)
+    main_y.append(COMM_Y)
     main_text.append("Community")
     main_color.append("#3498db")
     main_size.append(60)
-    main_hover.append(
-        f"<b>Community Bus</b><br>"
-        f"Total PV: {_format_power(snapshot.community.total_production_w)}<br>"
-        f"Total Load: {_format_power(snapshot.community.total_consumption_w)}<br>"
-        f"Net: {_format_power(snapshot.community.net_community_power_w)}"
-    )
     main_customdata.append({"type": "community"})
 
     # Grid (below community, centered)
-    grid_x, grid_y = 0, -6
-    main_x.append(grid_x)
-    main_y.append(grid_y)
+    main_x.append(GRID_X)
+    main_y.append(GRID_Y)
     main_text.append("Grid")
     main_color.append("#7f8c8d")
     main_size.append(55)
-    main_hover.append(
-        f"<b>External Grid</b><br>"
-        f"Import: {_format_power(snapshot.grid.grid_import_w)}<br>"
-        f"Export: {_format_power(snapshot.grid.grid_export_w)}"
-    )
     main_customdata.append({"type": "grid"})
 
     # Community to grid connection (always visible)
-    community_flow = snapshot.community.net_community_power_w
-    grid_color = "#1b9e77" if community_flow > 0 else "#d95f02" if community_flow < 0 else "#ccc"
-
-    # Always draw base connection line
     shapes.append(dict(
-        type="line", x0=comm_x, y0=comm_y, x1=grid_x, y1=grid_y,
-        line=dict(color="#ccc" if abs(community_flow) <= 10 else grid_color, width=LINE_WIDTH), layer="below",
+        type="line", x0=COMM_X, y0=COMM_Y, x1=GRID_X, y1=GRID_Y,
+        line=dict(color=IDLE_COLOR, width=LINE_WIDTH), layer="below",
     ))
-
-    if abs(community_flow) > 10:
-        if community_flow > 0:  # Export
-            annotations.append(dict(
-                x=grid_x, y=grid_y,
-                ax=comm_x, ay=comm_y,
-                xref="x", yref="y", axref="x", ayref="y",
-                showarrow=True, arrowhead=2, arrowsize=1.2, arrowwidth=ARROW_WIDTH, arrowcolor=grid_color,
-            ))
-        else:  # Import
-            annotations.append(dict(
-                x=comm_x, y=comm_y,
-                ax=grid_x, ay=grid_y,
-                xref="x", yref="y", axref="x", ayref="y",
-                showarrow=True, arrowhead=2, arrowsize=1.2, arrowwidth=ARROW_WIDTH, arrowcolor=grid_color,
-            ))
-        annotations.append(dict(
-            x=0.5, y=(comm_y + grid_y) / 2,
-            text=f"<b>{_format_power(abs(community_flow))}</b>",
-            showarrow=False,
-            font=dict(size=12, color=grid_color),
-        ))
+    annotations.extend(_arrow_slot(font_size=12))
 
     # Main nodes trace
     main_trace = go.Scatter(
@@ -228,7 +168,7 @@ def build_graph(snapshot: SimulationSnapshot) -> go.Figure:
         text=main_text,
         textposition='bottom center',
         textfont=dict(size=12, color='black', family='Arial Black'),
-        hovertext=main_hover,
+        hovertext=[""] * len(main_x),
         hoverinfo='text',
         marker=dict(
             size=main_size,
@@ -243,30 +183,19 @@ def build_graph(snapshot: SimulationSnapshot) -> go.Figure:
         x=comp_x,
         y=comp_y,
         mode='markers+text',
-        text=comp_text,
+        text=[""] * len(comp_x),
         textposition='middle center',
         textfont=dict(size=10, color='black', family='Arial Black'),
-        hovertext=comp_hover,
+        hovertext=[""] * len(comp_x),
         hoverinfo='text',
         marker=dict(
             size=comp_size,
-            color=comp_color,
+            color=["#bbb"] * len(comp_x),
             line=dict(width=2, color='#333'),
         ),
         customdata=comp_customdata,
     )
 
-    # Legend with icons (positioned to the right)
-    legend_annotations = [
-        dict(x=10, y=4, text="<b>Legend</b>", showarrow=False, font=dict(size=14), xanchor="left"),
-        dict(x=10, y=3.2, text="☀️ PV (production)", showarrow=False, font=dict(size=13, color="#f4d03f"), xanchor="left"),
-        dict(x=10, y=2.4, text="💡 Base load", showarrow=False, font=dict(size=13, color="#d95f02"), xanchor="left"),
-        dict(x=10, y=1.6, text="🚗 EV charger", showarrow=False, font=dict(size=13, color="#e74c3c"), xanchor="left"),
-        dict(x=10, y=0.8, text="🧺 Washer", showarrow=False, font=dict(size=13, color="#9b59b6"), xanchor="left"),
-        dict(x=10, y=-0.2, text="<b>→</b> Green = Export", showarrow=False, font=dict(size=12, color="#1b9e77"), xanchor="left"),
-        dict(x=10, y=-1.0, text="<b>→</b> Orange = Import", showarrow=False, font=dict(size=12, color="#d95f02"), xanchor="left"),
-    ]
-
     fig = go.Figure(data=[main_trace, comp_trace])
 
     fig.update_layout(
@@ -280,7 +209,462 @@ def build_graph(snapshot: SimulationSnapshot) -> go.Figure:
         height=1000,
         title=dict(text="LEG Energy Flow Simulator", x=0.5, font=dict(size=20)),
         shapes=shapes,
-        annotations=annotations + legend_annotations,
+        annotations=annotations + LEGEND_ANNOTATIONS,
     )
 
-    return fig
+    return fig.to_plotly_json()
+
+
+def _flow_values(flow: float, src: tuple[float, float], dst: tuple[float, float],
+                 label_pos: tuple[float, float]) -> tuple[str, dict, dict]:
+    """
+    Line color plus arrow/label annotation values for a flow between two nodes.
+
+    Positive flow points from src to dst (export), negative from dst to src.
+    """
+    flow_color = EXPORT_COLOR if flow > 0 else IMPORT_COLOR if flow < 0 else IDLE_COLOR
+    active = abs(flow) > 10
+    line_color = flow_color if active else IDLE_COLOR
+
+    tail, head = (src, dst) if flow > 0 else (dst, src)
+    arrow = dict(x=head[0], y=head[1], ax=tail[0], ay=tail[1], arrowcolor=flow_color, visible=active)
+    label = dict(
+        x=label_pos[0], y=label_pos[1],
+        text=f"<b>{_format_power(abs(flow))}</b>" if active else "",
+        font_color=flow_color, visible=active,
+    )
+    return line_color, arrow, label
+
+
+def _dynamic_values(snapshot: SimulationSnapshot) -> dict:
+    """Everything in the figure that depends on power values."""
+    num_houses = len(snapshot.houses)
+    main_hover = []
+    comp_text, comp_color, comp_hover = [], [], []
+    shape_colors = []
+    annotations = []
+
+    for idx, house in enumerate(snapshot.houses):
+        house_x, house_y = _house_position(idx, num_houses)
+        main_hover.append(f"<b>House {idx+1}</b><br>Net: {_format_power(house.net_power_w)}")
+
+        # PV panel (top)
+        pv_power = house.pv_power_w
+        comp_text.append(f"☀️<br>{_format_power(pv_power)}")
+        comp_color.append("#f4d03f" if pv_power > 100 else "#bbb")
+        comp_hover.append(f"<b>PV Panel</b><br>{_format_power(pv_power)} - Click to edit")
+        shape_colors.append("#1b9e77")
+
+        # Base load (bottom)
+        base_power = house.base_load_w
+        comp_text.append(f"💡<br>{_format_power(base_power)}")
+        comp_color.append("#d95f02")
+        comp_hover.append(f"<b>Base Load</b><br>{_format_power(base_power)} - Click to edit")
+        shape_colors.append("#d95f02")
+
+        # EV Charger (left)
+        ev_power = house.ev_load_w
+        ev_on = ev_power > 0
+        comp_text.append(f"🚗<br>{_format_power(ev_power)}" if ev_on else "🚗<br>0kW")
+        comp_color.append("#e74c3c" if ev_on else "#95a5a6")
+        comp_hover.append(f"<b>EV Charger</b><br>{_format_power(ev_power)} - Click to edit")
+        shape_colors.append("#e74c3c" if ev_on else "#ccc")
+
+        # Washer (right)
+        washer_power = house.washer_load_w
+        washer_on = washer_power > 0
+        comp_text.append(f"🧺<br>{_format_power(washer_power)}" if washer_on else "🧺<br>0kW")
+        comp_color.append("#9b59b6" if washer_on else "#95a5a6")
+        comp_hover.append(f"<b>Washer</b><br>{_format_power(washer_power)} - Click to edit")
+        shape_colors.append("#9b59b6" if washer_on else "#ccc")
+
+        # House <-> community flow
+        label_pos = ((house_x + COMM_X) / 2 + 0.5, (house_y + COMM_Y) / 2)
+        line_color, arrow, label = _flow_values(
+            house.net_power_w, (house_x, house_y), (COMM_X, COMM_Y), label_pos
+        )
+        shape_colors.append(line_color)
+        annotations.extend([arrow, label])
+
+    main_hover.append(
+        f"<b>Community Bus</b><br>"
+        f"Total PV: {_format_power(snapshot.community.total_production_w)}<br>"
+        f"Total Load: {_format_power(snapshot.community.total_consumption_w)}<br>"
+        f"Net: {_format_power(snapshot.community.net_community_power_w)}"
+    )
+    main_hover.append(
+        f"<b>External Grid</b><br>"
+        f"Import: {_format_power(snapshot.grid.grid_import_w)}<br>"
+        f"Export: {_format_power(snapshot.grid.grid_export_w)}"
+    )
+
+    # Community <-> grid flow
+    line_color, arrow, label = _flow_values(
+        snapshot.community.net_community_power_w, (COMM_X, COMM_Y), (GRID_X, GRID_Y),
+        (0.5, (COMM_Y + GRID_Y) / 2),
+    )
+    shape_colors.append(line_color)
+    annotations.extend([arrow, label])
+
+    return {
+        "main_hover": main_hover,
+        "comp_text": comp_text,
+        "comp_color": comp_color,
+        "comp_hover": comp_hover,
+        "shape_colors": shape_colors,
+        "annotations": annotations,
+    }
+
+
+def build_graph(snapshot: SimulationSnapshot, layout_mode: str = "radial") -> go.Figure:
+    """Build the energy flow graph with house components arranged in a circle."""
+    if len(snapshot.houses) > LARGE_COMMUNITY_THRESHOLD:
+        return _build_large_graph(snapshot, layout_mode)
+
+    fig = copy.deepcopy(_static_figure(len(snapshot.houses)))
+    values = _dynamic_values(snapshot)
+
+    main_trace, comp_trace = fig["data"]
+    main_trace["hovertext"] = values["main_hover"]
+    comp_trace["text"] = values["comp_text"]
+    comp_trace["marker"]["color"] = values["comp_color"]
+    comp_trace["hovertext"] = values["comp_hover"]
+
+    for shape, color in zip(fig["layout"]["shapes"], values["shape_colors"]):
+        shape["line"]["color"] = color
+    for annotation, dynamic in zip(fig["layout"]["annotations"], values["annotations"]):
+        _apply_annotation(annotation, dynamic)
+
+    return go.Figure(fig)
+
+
+def _apply_annotation(annotation: dict, dynamic: dict):
+    for key, value in dynamic.items():
+        if key == "font_color":
+            annotation["font"]["color"] = value
+        else:
+            annotation[key] = value
+
+
+def build_graph_patch(snapshot: SimulationSnapshot, previous: dict | None,
+                      layout_mode: str = "radial") -> tuple[Patch, dict]:
+    """
+    Partial update of a figure previously produced by build_graph.
+
+    Trace text, colors and hover text are replaced as arrays; shape colors
+    and flow annotations are only patched where they differ from the
+    previous values. Returns the patch and the values to pass next time.
+    """
+    if len(snapshot.houses) > LARGE_COMMUNITY_THRESHOLD:
+        return _large_graph_patch(snapshot, previous, layout_mode)
+
+    values = _dynamic_values(snapshot)
+    patch = Patch()
+
+    if previous is None or previous["main_hover"] != values["main_hover"]:
+        patch["data"][0]["hovertext"] = values["main_hover"]
+    for key, path in (("comp_text", ("text",)), ("comp_hover", ("hovertext",))):
+        if previous is None or previous[key] != values[key]:
+            patch["data"][1][path[0]] = values[key]
+    if previous is None or previous["comp_color"] != values["comp_color"]:
+        patch["data"][1]["marker"]["color"] = values["comp_color"]
+
+    for i, color in enumerate(values["shape_colors"]):
+        if previous is None or previous["shape_colors"][i] != color:
+            patch["layout"]["shapes"][i]["line"]["color"] = color
+
+    for i, dynamic in enumerate(values["annotations"]):
+        old = previous["annotations"][i] if previous is not None else {}
+        for key, value in dynamic.items():
+            if old.get(key) == value:
+                continue
+            if key == "font_color":
+                patch["layout"]["annotations"][i]["font"]["color"] = value
+            else:
+                patch["layout"]["annotations"][i][key] = value
+
+    return patch, values
+
+
+# ---------------------------------------------------------------------------
+# Large-community layout
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=8)
+def _large_positions(num_houses: int, layout_mode: str) -> tuple:
+    """
+    House, community and grid positions for large communities.
+
+    radial: community at the center, houses on concentric rings whose
+            capacity grows with their circumference.
+    grid:   houses in a square block above the community bus.
+    """
+    house_xy = []
+    if layout_mode == "grid":
+        columns = math.ceil(math.sqrt(num_houses))
+        rows = math.ceil(num_houses / columns)
+        for idx in range(num_houses):
+            row, col = divmod(idx, columns)
+            house_xy.append((
+                (col - (columns - 1) / 2) * LARGE_HOUSE_SPACING,
+                (rows - row) * LARGE_HOUSE_SPACING + 2,
+            ))
+        comm = (0.0, 0.0)
+        grid = (0.0, -4.0)
+    else:
+        ring, placed = 1, 0
+        while placed < num_houses:
+            radius = ring * LARGE_HOUSE_SPACING + 2
+            capacity = max(1, int(2 * math.pi * radius / LARGE_HOUSE_SPACING))
+            count = min(capacity, num_houses - placed)
+            for k in range(count):
+                angle = 2 * math.pi * k / count + ring * 0.5
+                house_xy.append((radius * math.cos(angle), radius * math.sin(angle)))
+            placed += count
+            ring += 1
+        comm = (0.0, 0.0)
+        outer = max(math.hypot(x, y) for x, y in house_xy)
+        grid = (0.0, -(outer + 4))
+    return tuple(house_xy), comm, grid
+
+
+def _line_xy(segments) -> tuple[list, list]:
+    """Flatten line segments into one x/y array pair separated by None."""
+    xs, ys = [], []
+    for (x0, y0), (x1, y1) in segments:
+        xs.extend((x0, x1, None))
+        ys.extend((y0, y1, None))
+    return xs, ys
+
+
+def _flow_color(flow: float) -> str:
+    if abs(flow) <= 10:
+        return IDLE_COLOR
+    return EXPORT_COLOR if flow > 0 else IMPORT_COLOR
+
+
+def _large_dynamic_values(snapshot: SimulationSnapshot, layout_mode: str) -> dict:
+    """Link groups, node colors and texts of the large-community figure."""
+    house_xy, comm, _ = _large_positions(len(snapshot.houses), layout_mode)
+
+    links = {EXPORT_COLOR: [], IMPORT_COLOR: [], IDLE_COLOR: []}
+    house_color, house_hover = [], []
+    comp_text, comp_color, comp_hover = [], [], []
+
+    for idx, house in enumerate(snapshot.houses):
+        flow = house.net_power_w
+        color = _flow_color(flow)
+        links[color].append((house_xy[idx], comm))
+        house_color.append(color if color != IDLE_COLOR else "#4a90d9")
+        house_hover.append(
+            f"<b>House {idx+1}</b><br>"
+            f"PV: {_format_power(house.pv_power_w)}<br>"
+            f"Load: {_format_power(house.base_load_w + house.ev_load_w + house.washer_load_w)}<br>"
+            f"Net: {_format_power(flow)}"
+        )
+
+        comp_text.extend([
+            _format_power(house.pv_power_w),
+            _format_power(house.base_load_w),
+            _format_power(house.ev_load_w),
+            _format_power(house.washer_load_w),
+        ])
+        comp_color.extend([
+            "#f4d03f" if house.pv_power_w > 100 else "#bbb",
+            "#d95f02",
+            "#e74c3c" if house.ev_load_w > 0 else "#95a5a6",
+            "#9b59b6" if house.washer_load_w > 0 else "#95a5a6",
+        ])
+        comp_hover.extend([
+            f"<b>PV Panel - House {idx+1}</b><br>{_format_power(house.pv_power_w)} - Click to edit",
+            f"<b>Base Load - House {idx+1}</b><br>{_format_power(house.base_load_w)} - Click to edit",
+            f"<b>EV Charger - House {idx+1}</b><br>{_format_power(house.ev_load_w)} - Click to edit",
+            f"<b>Washer - House {idx+1}</b><br>{_format_power(house.washer_load_w)} - Click to edit",
+        ])
+
+    community_flow = snapshot.community.net_community_power_w
+    return {
+        "links": {color: _line_xy(segments) for color, segments in links.items()},
+        "grid_link_color": _flow_color(community_flow),
+        "house_color": house_color,
+        "house_hover": house_hover,
+        "comp_text": comp_text,
+        "comp_color": comp_color,
+        "comp_hover": comp_hover,
+        "main_hover": [
+            (
+                f"<b>Community Bus</b><br>"
+                f"Total PV: {_format_power(snapshot.community.total_production_w)}<br>"
+                f"Total Load: {_format_power(snapshot.community.total_consumption_w)}<br>"
+                f"Net: {_format_power(community_flow)}"
+            ),
+            (
+                f"<b>External Grid</b><br>"
+                f"Import: {_format_power(snapshot.grid.grid_import_w)}<br>"
+                f"Export: {_format_power(snapshot.grid.grid_export_w)}"
+            ),
+        ],
+        "main_text": [
+            f"Community<br>{_format_power(community_flow)}",
+            "Grid",
+        ],
+    }
+
+
+@lru_cache(maxsize=8)
+def _large_static_figure(num_houses: int, layout_mode: str) -> dict:
+    """Static skeleton of the large-community figure (WebGL traces, no per-link shapes)."""
+    house_xy, comm, grid = _large_positions(num_houses, layout_mode)
+
+    comp_x, comp_y, comp_customdata, comp_segments = [], [], [], []
+    angles = (PV_ANGLE, BASE_ANGLE, EV_ANGLE, WASHER_ANGLE)
+    types = ("pv", "base", "ev", "washer")
+    for idx, (house_x, house_y) in enumerate(house_xy):
+        for angle, comp_type in zip(angles, types):
+            x = house_x + LARGE_COMP_RADIUS * math.cos(angle)
+            y = house_y + LARGE_COMP_RADIUS * math.sin(angle)
+            comp_x.append(x)
+            comp_y.append(y)
+            comp_customdata.append({"type": comp_type, "id": idx, "clickable": comp_type != "pv"})
+            comp_segments.append(((house_x, house_y), (x, y)))
+
+    def link_trace(color: str) -> go.Scattergl:
+        return go.Scattergl(
+            x=[], y=[], mode="lines", hoverinfo="skip",
+            line={"color": color, "width": 1 if color == IDLE_COLOR else LINE_WIDTH},
+        )
+
+    comp_link_x, comp_link_y = _line_xy(comp_segments)
+    xs = [x for x, _ in house_xy] + [comm[0], grid[0]]
+    ys = [y for _, y in house_xy] + [comm[1], grid[1]]
+    pad = LARGE_HOUSE_SPACING
+
+    fig = go.Figure(data=[
+        link_trace(EXPORT_COLOR),
+        link_trace(IMPORT_COLOR),
+        link_trace(IDLE_COLOR),
+        go.Scatter(
+            x=[comm[0], grid[0]], y=[comm[1], grid[1]], mode="lines", hoverinfo="skip",
+            line={"color": IDLE_COLOR, "width": LINE_WIDTH * 2},
+        ),
+        go.Scattergl(
+            x=comp_link_x, y=comp_link_y, mode="lines", hoverinfo="skip",
+            line={"color": "#ccc", "width": 1}, visible=False,
+        ),
+        go.Scattergl(
+            x=comp_x, y=comp_y, mode="markers+text",
+            text=[""] * len(comp_x), textposition="middle center",
+            textfont={"size": 8, "color": "black"},
+            hovertext=[""] * len(comp_x), hoverinfo="text",
+            marker={"size": 18, "color": ["#bbb"] * len(comp_x), "line": {"width": 1, "color": "#333"}},
+            customdata=comp_customdata, visible=False,
+        ),
+        go.Scattergl(
+            x=[x for x, _ in house_xy], y=[y for _, y in house_xy], mode="markers",
+            hovertext=[""] * num_houses, hoverinfo="text",
+            marker={"size": 10, "color": ["#4a90d9"] * num_houses, "line": {"width": 1, "color": "#333"}},
+            customdata=[{"type": "house", "id": idx} for idx in range(num_houses)],
+        ),
+        go.Scatter(
+            x=[comm[0], grid[0]], y=[comm[1], grid[1]], mode="markers+text",
+            text=["Community", "Grid"], textposition="bottom center",
+            textfont={"size": 12, "color": "black", "family": "Arial Black"},
+            hovertext=["", ""], hoverinfo="text",
+            marker={"size": [60, 55], "color": ["#3498db", "#7f8c8d"], "line": {"width": 2, "color": "#333"}},
+            customdata=[{"type": "community"}, {"type": "grid"}],
+        ),
+    ])
+
+    fig.update_layout(
+        showlegend=False,
+        hovermode="closest",
+        margin={"l": 20, "r": 20, "t": 50, "b": 20},
+        xaxis={"showgrid": False, "zeroline": False, "showticklabels": False,
+               "range": [min(xs) - pad, max(xs) + pad]},
+        yaxis={"showgrid": False, "zeroline": False, "showticklabels": False,
+               "range": [min(ys) - pad, max(ys) + pad], "scaleanchor": "x"},
+        plot_bgcolor="#f8f9fa",
+        paper_bgcolor="#f8f9fa",
+        height=1000,
+        title={"text": f"LEG Energy Flow Simulator - {num_houses} houses (zoom in for devices)",
+               "x": 0.5, "font": {"size": 20}},
+        annotations=[
+            {"xref": "paper", "yref": "paper", "x": 1, "y": 1, "xanchor": "right", "yanchor": "top",
+             "showarrow": False, "align": "right",
+             "text": "<b>→</b> Green = Export<br><b>→</b> Orange = Import<br>Grey = Idle",
+             "font": {"size": 12}},
+        ],
+    )
+    return fig.to_plotly_json()
+
+
+# Large-figure link traces and the remaining dynamic values: (values key, trace, property path)
+_LARGE_LINK_TRACES = ((TRACE_LINK_EXPORT, EXPORT_COLOR), (TRACE_LINK_IMPORT, IMPORT_COLOR),
+                      (TRACE_LINK_IDLE, IDLE_COLOR))
+_LARGE_VALUE_PATHS = (
+    ("grid_link_color", TRACE_GRID_LINK, ("line", "color")),
+    ("comp_text", TRACE_COMPONENTS, ("text",)),
+    ("comp_color", TRACE_COMPONENTS, ("marker", "color")),
+    ("comp_hover", TRACE_COMPONENTS, ("hovertext",)),
+    ("house_color", TRACE_HOUSES, ("marker", "color")),
+    ("house_hover", TRACE_HOUSES, ("hovertext",)),
+    ("main_hover", TRACE_MAIN, ("hovertext",)),
+    ("main_text", TRACE_MAIN, ("text",)),
+)
+
+
+def _apply_large_values(target, values: dict, previous: dict | None = None):
+    """Write large-figure dynamic values into a figure dict or a Patch, skipping those equal to previous."""
+    data = target["data"]
+    for trace, color in _LARGE_LINK_TRACES:
+        if previous is None or previous["links"][color] != values["links"][color]:
+            data[trace]["x"], data[trace]["y"] = values["links"][color]
+    for key, trace, path in _LARGE_VALUE_PATHS:
+        if previous is None or previous[key] != values[key]:
+            node = data[trace]
+            for name in path[:-1]:
+                node = node[name]
+            node[path[-1]] = values[key]
+
+
+def _build_large_graph(snapshot: SimulationSnapshot, layout_mode: str) -> go.Figure:
+    fig = copy.deepcopy(_large_static_figure(len(snapshot.houses), layout_mode))
+    _apply_large_values(fig, _large_dynamic_values(snapshot, layout_mode))
+    return go.Figure(fig)
+
+
+def _large_graph_patch(snapshot: SimulationSnapshot, previous: dict | None,
+                       layout_mode: str) -> tuple[Patch, dict]:
+    values = _large_dynamic_values(snapshot, layout_mode)
+    patch = Patch()
+    _apply_large_values(patch, values, previous)
+    return patch, values
+
+
+def lod_patch(relayout_data: dict | None, num_houses: int) -> Patch | None:
+    """
+    Level-of-detail switch for the large-community figure.
+
+    Shows component nodes when the visible x-range is narrower than
+    LOD_DETAIL_SPAN, hides them when zoomed out. Returns None when there is
+    nothing to change.
+    """
+    if num_houses <= LARGE_COMMUNITY_THRESHOLD or not relayout_data:
+        return None
+
+    if relayout_data.get("xaxis.autorange") or relayout_data.get("autosize"):
+        detail = False
+    elif "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        span = abs(relayout_data["xaxis.range[1]"] - relayout_data["xaxis.range[0]"])
+        detail = span < LOD_DETAIL_SPAN
+    elif "xaxis.range" in relayout_data:
+        x0, x1 = relayout_data["xaxis.range"]
+        detail = abs(x1 - x0) < LOD_DETAIL_SPAN
+    else:
+        return None
+
+    patch = Patch()
+    patch["data"][TRACE_COMP_LINKS]["visible"] = detail
+    patch["data"][TRACE_COMPONENTS]["visible"] = detail
+    patch["data"][TRACE_HOUSES]["marker"]["size"] = 16 if detail else 10
+    return patch
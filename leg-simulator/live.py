@@ -0,0 +1,172 @@
+"""
+Live meter data for the LEG simulator.
+
+Subscribes to the smart meters (`+/SENSOR`, instantaneous Pi/Po in kW) or
+to the collector's interval topic (per-house kWh deltas) and keeps a
+compact rolling state per house: smoothed import and export power in two
+NumPy arrays plus a version counter. The Dash app polls snapshot() from a
+dcc.Interval; snapshots are built once per version and shared by all
+viewers, and an unchanged version means nothing needs to be sent.
+
+Meters only report net exchange, so in live mode a house's export shows
+as "PV" and its import as "base load"; EV and washer stay at zero.
+"""
+
+import json
+import logging
+import os
+import ssl
+import threading
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+import yaml
+from model import CommunityState, GridExchange, HouseStates
+from simulation import SimulationSnapshot
+
+# Load configuration (optional: live mode is disabled without config.yaml)
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.yaml")
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, "r") as f:
+        config = yaml.safe_load(f) or {}
+else:
+    config = {}
+
+LIVE_CONFIG = config.get("live", {})
+LIVE_SOURCE = LIVE_CONFIG.get("source", "sensor")
+LIVE_TOPIC = LIVE_CONFIG.get("topic", "+/SENSOR" if LIVE_SOURCE == "sensor" else "leg/collector/interval")
+# Browser poll period; also the minimum time between two sends to a viewer
+LIVE_UPDATE_MS = LIVE_CONFIG.get("update_interval_ms", 2000)
+# EWMA weight of a new reading (1.0 = no smoothing)
+LIVE_SMOOTHING = LIVE_CONFIG.get("smoothing", 0.5)
+
+logger = logging.getLogger(__name__)
+
+
+class LiveState:
+    """Rolling per-house import/export power (W) fed from MQTT messages."""
+
+    def __init__(self, houses: dict, smoothing: float = LIVE_SMOOTHING) -> None:
+        # houses: MAC -> {"id": ..., "name": ...}, ordered by house id
+        ordered = sorted(houses.items(), key=lambda item: item[1]["id"])
+        self.house_ids = [f"house_{info['id']}" for _, info in ordered]
+        self._index_by_mac = {mac: idx for idx, (mac, _) in enumerate(ordered)}
+        self._index_by_id = {str(info["id"]): idx for idx, (_, info) in enumerate(ordered)}
+        self.smoothing = smoothing
+
+        self.import_w = np.zeros(len(ordered))
+        self.export_w = np.zeros(len(ordered))
+        self.last_seen = np.zeros(len(ordered))
+        self.version = 0
+        self.client: mqtt.Client | None = None
+
+        self._lock = threading.Lock()
+        self._snapshot: SimulationSnapshot | None = None
+        self._snapshot_version = -1
+
+    def _apply(self, idx: int, import_w: float, export_w: float) -> None:
+        with self._lock:
+            alpha = self.smoothing if self.last_seen[idx] else 1.0
+            self.import_w[idx] += alpha * (import_w - self.import_w[idx])
+            self.export_w[idx] += alpha * (export_w - self.export_w[idx])
+            self.last_seen[idx] = time.time()
+            self.version += 1
+
+    def on_sensor(self, mac: str, payload: dict) -> None:
+        """Smart meter message: Pi/Po in kW."""
+        idx = self._index_by_mac.get(mac)
+        if idx is not None:
+            self._apply(idx, payload.get("Pi", 0.0) * 1000, payload.get("Po", 0.0) * 1000)
+
+    def on_interval(self, payload: dict) -> None:
+        """Collector interval message: per-house kWh deltas over interval_s."""
+        to_w = 3600 * 1000 / max(payload.get("interval_s", 60), 1)
+        for house_id, house in payload.get("houses", {}).items():
+            idx = self._index_by_id.get(str(house_id))
+            if idx is not None:
+                self._apply(idx, house.get("delta_ei_kwh", 0.0) * to_w, house.get("delta_eo_kwh", 0.0) * to_w)
+
+    def snapshot(self) -> SimulationSnapshot:
+        """Current state as a simulation snapshot; rebuilt only when a message arrived."""
+        with self._lock:
+            if self._snapshot_version == self.version:
+                return self._snapshot
+            import_w = np.round(self.import_w, 1)
+            export_w = np.round(self.export_w, 1)
+            version = self.version
+
+        zeros = np.zeros_like(import_w)
+        net = export_w - import_w
+        total_prod = float(export_w.sum())
+        total_cons = float(import_w.sum())
+        net_community = total_prod - total_cons
+        snapshot = SimulationSnapshot(
+            houses=HouseStates(self.house_ids, {
+                "pv_power_w": export_w,
+                "base_load_w": import_w,
+                "ev_load_w": zeros,
+                "washer_load_w": zeros,
+                "net_power_w": net,
+            }),
+            community=CommunityState(
+                total_production_w=round(total_prod, 1),
+                total_consumption_w=round(total_cons, 1),
+                net_community_power_w=round(net_community, 1),
+            ),
+            grid=GridExchange(
+                grid_import_w=round(-net_community, 1) if net_community < 0 else 0.0,
+                grid_export_w=round(net_community, 1) if net_community > 0 else 0.0,
+            ),
+        )
+        with self._lock:
+            self._snapshot, self._snapshot_version = snapshot, version
+        return snapshot
+
+
+def _on_connect(client, userdata, flags, reason_code, properties=None):
+    if reason_code == 0:
+        client.subscribe(LIVE_TOPIC)
+        logger.info(f"Live mode subscribed to {LIVE_TOPIC}")
+    else:
+        logger.error(f"Live mode failed to connect: {reason_code}")
+
+
+def _on_message(client, userdata, msg):
+    try:
+        payload = json.loads(msg.payload.decode())
+        if LIVE_SOURCE == "collector":
+            userdata.on_interval(payload)
+        else:
+            userdata.on_sensor(msg.topic.split("/")[0], payload)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        logger.error(f"Error processing live message: {e}")
+
+
+def start_live_state() -> LiveState | None:
+    """Start the background MQTT subscription; None if live mode is not configured."""
+    mqtt_config = config.get("mqtt")
+    houses = config.get("houses")
+    if not mqtt_config or not houses:
+        logger.info("No mqtt/houses configuration - live mode disabled")
+        return None
+
+    state = LiveState(houses)
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, userdata=state)
+    client.on_connect = _on_connect
+    client.on_message = _on_message
+
+    if mqtt_config.get("use_tls", False):
+        client.tls_set(cert_reqs=ssl.CERT_NONE)
+        client.tls_insecure_set(True)
+    if mqtt_config.get("username") and mqtt_config.get("password"):
+        client.username_pw_set(mqtt_config["username"], mqtt_config["password"])
+
+    try:
+        client.connect_async(mqtt_config["broker"], mqtt_config["port"], 60)
+        client.loop_start()
+    except (OSError, ValueError) as e:
+        logger.error(f"Live mode could not connect to MQTT broker: {e}")
+        return None
+    state.client = client
+    return state
@@ -1,8 +1,13 @@
-import random
+from collections.abc import Sequence
 from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass
+# Editable per-house power columns (W)
+POWER_FIELDS = ("pv_power_w", "base_load_w", "ev_load_w", "washer_load_w")
+
+
+@dataclass(slots=True)
 class HouseState:
     house_id: str
     pv_power_w: float
@@ -25,49 +30,77 @@ class GridExchange:
     grid_export_w: float
 
 
+class HouseStates(Sequence):
+    """
+    Read-only view of one tick's per-house results.
+
+    Holds the rounded column arrays; HouseState objects are only created
+    for the houses that are actually accessed.
+    """
+
+    __slots__ = ("_columns", "_house_ids")
+
+    def __init__(self, house_ids: list[str], columns: dict[str, np.ndarray]) -> None:
+        self._house_ids = house_ids
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._house_ids)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        c = self._columns
+        return HouseState(
+            house_id=self._house_ids[idx],
+            pv_power_w=float(c["pv_power_w"][idx]),
+            base_load_w=float(c["base_load_w"][idx]),
+            ev_load_w=float(c["ev_load_w"][idx]),
+            washer_load_w=float(c["washer_load_w"][idx]),
+            net_power_w=float(c["net_power_w"][idx]),
+        )
+
+    def __iter__(self):
+        c = self._columns
+        for values in zip(
+            self._house_ids,
+            c["pv_power_w"].tolist(),
+            c["base_load_w"].tolist(),
+            c["ev_load_w"].tolist(),
+            c["washer_load_w"].tolist(),
+            c["net_power_w"].tolist(),
+        ):
+            yield HouseState(*values)
+
+    def column(self, field: str) -> np.ndarray:
+        """Rounded values of one field for all houses."""
+        return self._columns[field]
+
+
 class EnergyModel:
     def __init__(self, house_count: int) -> None:
         self.house_count = house_count
-        self._houses = []
-        for idx in range(house_count):
-            self._houses.append(
-                {
-                    "house_id": f"house_{idx + 1}",
-                    "base_load_w": random.randint(5, 20) * 100,  # Random 500-2000W
-                    "pv_power_w": 0,
-                    "ev_load_w": 0,  # User-editable EV charger power
-                    "washer_load_w": 0,  # User-editable washer power
-                }
-            )
-
-    def update(self) -> tuple[list[HouseState], CommunityState, GridExchange]:
-        house_states: list[HouseState] = []
-        total_prod = 0.0
-        total_cons = 0.0
-
-        for house in self._houses:
-            pv_power = house["pv_power_w"]
-            base_load = house["base_load_w"]
-            ev_load = house["ev_load_w"]
-            washer_load = house["washer_load_w"]
-
-            total_load = base_load + ev_load + washer_load
-            net_power = pv_power - total_load
-
-            total_prod += pv_power
-            total_cons += total_load
-
-            house_states.append(
-                HouseState(
-                    house_id=house["house_id"],
-                    pv_power_w=round(pv_power, 1),
-                    base_load_w=round(base_load, 1),
-                    ev_load_w=round(ev_load, 1),
-                    washer_load_w=round(washer_load, 1),
-                    net_power_w=round(net_power, 1),
-                )
-            )
+        self.house_ids = [f"house_{idx + 1}" for idx in range(house_count)]
+        self._columns = {field: np.zeros(house_count) for field in POWER_FIELDS}
+        self._columns["base_load_w"][:] = np.random.randint(5, 21, house_count) * 100  # Random 500-2000W
+
+    def get(self, idx: int, field: str) -> float:
+        return float(self._columns[field][idx])
+
+    def set(self, idx: int, field: str, value: float) -> None:
+        self._columns[field][idx] = value
+
+    def update(self) -> tuple[HouseStates, CommunityState, GridExchange]:
+        pv_power = self._columns["pv_power_w"]
+        total_load = self._columns["base_load_w"] + self._columns["ev_load_w"] + self._columns["washer_load_w"]
+        net_power = pv_power - total_load
+
+        columns = {field: np.round(self._columns[field], 1) for field in POWER_FIELDS}
+        columns["net_power_w"] = np.round(net_power, 1)
+        house_states = HouseStates(self.house_ids, columns)
 
+        total_prod = float(pv_power.sum())
+        total_cons = float(total_load.sum())
         net_community = total_prod - total_cons
         community_state = CommunityState(
             total_production_w=round(total_prod, 1),
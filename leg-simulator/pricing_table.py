@@ -0,0 +1,237 @@
+"""
+Pricing table rendering for the LEG simulator.
+
+Costs (ct/h) per house, grid row, totals and community profit, computed
+with NumPy and memoized on the rounded inputs (house net powers in whole
+watts plus the four prices). Small communities get an html.Table built
+from prebuilt style objects; large ones use a DataTable whose columns and
+styles are sent once with the layout, so each update only carries rows.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from dash import dash_table, html
+
+# Above this many houses the pricing table is a DataTable with data-only updates
+DATATABLE_THRESHOLD = 20
+
+BUY_COLOR = "#d95f02"
+SELL_COLOR = "#1b9e77"
+GROUP_BORDER = "2px solid #333"
+GRID_BACKGROUND = "#e8e8e8"
+
+# Prebuilt cell styles, shared by all rows
+CELL_LABEL = {"fontWeight": "bold", "padding": "4px"}
+CELL_BUY = {"color": BUY_COLOR, "padding": "2px 4px", "textAlign": "right", "borderLeft": GROUP_BORDER}
+CELL_SELL = {"color": SELL_COLOR, "padding": "2px 4px", "textAlign": "right", "borderRight": GROUP_BORDER}
+CELL_NA = {"color": "#999", "padding": "2px 4px", "textAlign": "right"}
+CELL_NA_LEFT = {**CELL_NA, "borderLeft": GROUP_BORDER}
+CELL_NA_RIGHT = {**CELL_NA, "borderRight": GROUP_BORDER}
+
+GRID_LABEL = {**CELL_LABEL, "backgroundColor": GRID_BACKGROUND}
+GRID_BUY = {**CELL_BUY, "backgroundColor": GRID_BACKGROUND}
+GRID_SELL = {**CELL_SELL, "backgroundColor": GRID_BACKGROUND}
+GRID_NA_LEFT = {**CELL_NA_LEFT, "backgroundColor": GRID_BACKGROUND}
+GRID_NA_RIGHT = {**CELL_NA_RIGHT, "backgroundColor": GRID_BACKGROUND}
+
+TOTAL_BASE = {"fontWeight": "bold", "borderTop": GROUP_BORDER, "padding": "2px 4px", "textAlign": "right"}
+TOTAL_LABEL = {**TOTAL_BASE, "textAlign": "left"}
+TOTAL_BUY = {**TOTAL_BASE, "color": BUY_COLOR, "borderLeft": GROUP_BORDER}
+TOTAL_SELL = {**TOTAL_BASE, "color": SELL_COLOR, "borderRight": GROUP_BORDER}
+
+PROFIT_LABEL = {"fontWeight": "bold", "fontSize": "24px", "padding": "12px 4px", "textAlign": "right",
+                "borderTop": GROUP_BORDER}
+PROFIT_VALUE = {"fontWeight": "bold", "fontSize": "28px", "padding": "12px 20px 12px 4px", "textAlign": "right",
+                "borderTop": GROUP_BORDER}
+
+GROUP_HEADER = {"textAlign": "center", "padding": "4px 2px", "borderLeft": GROUP_BORDER,
+                "backgroundColor": GRID_BACKGROUND}
+SUB_BUY = {"color": BUY_COLOR, "padding": "2px 4px", "textAlign": "right", "fontSize": "11px",
+           "borderLeft": GROUP_BORDER}
+SUB_SELL = {"color": SELL_COLOR, "padding": "2px 4px", "textAlign": "right", "fontSize": "11px",
+            "borderRight": GROUP_BORDER}
+TABLE_STYLE = {"width": "100%", "borderCollapse": "collapse", "fontSize": "12px"}
+
+TABLE_HEADER = html.Thead([
+    html.Tr([
+        html.Th("", rowSpan=2, style={"padding": "4px", "width": "70px"}),
+        html.Th("House", colSpan=2, style=GROUP_HEADER),
+        html.Th("Community", colSpan=2, style=GROUP_HEADER),
+        html.Th("Grid", colSpan=2, style=GROUP_HEADER),
+    ]),
+    html.Tr([
+        html.Th("Buy", style=SUB_BUY),
+        html.Th("Sell", style=SUB_SELL),
+        html.Th("Buy", style=SUB_BUY),
+        html.Th("Sell", style=SUB_SELL),
+        html.Th("Buy", style=SUB_BUY),
+        html.Th("Sell", style=SUB_SELL),
+    ]),
+])
+
+VALUE_COLUMNS = ("house_buy", "house_sell", "comm_buy", "comm_sell", "grid_buy", "grid_sell")
+
+
+def table_key(snapshot, p_pv: float, p_house_con: float, p_grid_con: float, p_grid_del: float) -> tuple:
+    """Memoization key: house net powers in whole watts plus prices in 0.01 ct."""
+    net_w = np.rint(snapshot.houses.column("net_power_w")).astype(np.int64)
+    return (
+        tuple(net_w.tolist()),
+        round(p_pv, 2), round(p_house_con, 2), round(p_grid_con, 2), round(p_grid_del, 2),
+    )
+
+
+@lru_cache(maxsize=64)
+def _table_values(net_w: tuple, p_pv: float, p_house_con: float, p_grid_con: float, p_grid_del: float) -> dict:
+    """
+    Per-house and grid costs in ct/h.
+
+    House sells to the community (same kWh), the community sells to the
+    grid (same kWh); community net is the sum of house nets.
+    """
+    net_kw = np.asarray(net_w, dtype=np.float64) / 1000
+    exports = np.maximum(net_kw, 0.0)
+    imports = np.maximum(-net_kw, 0.0)
+
+    house_sell = exports * p_pv          # House sells at PV rate
+    house_buy = imports * p_house_con    # House buys at user-set rate
+    comm_buy = house_sell                # Community buys same amount
+    comm_sell = house_buy                # Community sells same amount
+
+    community_net_kw = float(net_kw.sum())
+    grid_buy = max(community_net_kw, 0.0) * p_grid_del    # Grid buys at delivery rate
+    grid_sell = max(-community_net_kw, 0.0) * p_grid_con  # Grid sells at consumption rate
+
+    totals = {
+        "house_buy": float(house_buy.sum()),
+        "house_sell": float(house_sell.sum()),
+        "comm_buy": float(comm_buy.sum()) + grid_sell,   # Community buys from grid
+        "comm_sell": float(comm_sell.sum()) + grid_buy,  # Community sells to grid
+        "grid_buy": grid_buy,
+        "grid_sell": grid_sell,
+    }
+    return {
+        "house_buy": house_buy.tolist(),
+        "house_sell": house_sell.tolist(),
+        "comm_buy": comm_buy.tolist(),
+        "comm_sell": comm_sell.tolist(),
+        "grid_buy": grid_buy,
+        "grid_sell": grid_sell,
+        "totals": totals,
+        "profit": totals["comm_sell"] - totals["comm_buy"],
+    }
+
+
+def _profit_color(profit: float) -> str:
+    return "#27ae60" if abs(profit) < 0.1 or profit > 0 else "#e74c3c"
+
+
+@lru_cache(maxsize=64)
+def _html_table(key: tuple) -> html.Table:
+    values = _table_values(*key)
+    rows = [
+        html.Tr([
+            html.Td(f"House {idx + 1}", style=CELL_LABEL),
+            html.Td(f"{house_buy:.1f}", style=CELL_BUY),
+            html.Td(f"{house_sell:.1f}", style=CELL_SELL),
+            html.Td(f"{comm_buy:.1f}", style=CELL_BUY),
+            html.Td(f"{comm_sell:.1f}", style=CELL_SELL),
+            html.Td("-", style=CELL_NA_LEFT),
+            html.Td("-", style=CELL_NA_RIGHT),
+        ])
+        for idx, (house_buy, house_sell, comm_buy, comm_sell) in enumerate(zip(
+            values["house_buy"], values["house_sell"], values["comm_buy"], values["comm_sell"]
+        ))
+    ]
+
+    grid_buy, grid_sell, totals, profit = values["grid_buy"], values["grid_sell"], values["totals"], values["profit"]
+    rows.append(html.Tr([
+        html.Td("Grid", style=GRID_LABEL),
+        html.Td("-", style=GRID_NA_LEFT),
+        html.Td("-", style=GRID_NA_RIGHT),
+        html.Td(f"{grid_sell:.1f}" if grid_sell > 0 else "-", style=GRID_BUY),
+        html.Td(f"{grid_buy:.1f}" if grid_buy > 0 else "-", style=GRID_SELL),
+        html.Td(f"{grid_buy:.1f}", style=GRID_BUY),
+        html.Td(f"{grid_sell:.1f}", style=GRID_SELL),
+    ]))
+    rows.append(html.Tr([
+        html.Td("TOTAL", style=TOTAL_LABEL),
+        html.Td(f"{totals['house_buy']:.1f}", style=TOTAL_BUY),
+        html.Td(f"{totals['house_sell']:.1f}", style=TOTAL_SELL),
+        html.Td(f"{totals['comm_buy']:.1f}", style=TOTAL_BUY),
+        html.Td(f"{totals['comm_sell']:.1f}", style=TOTAL_SELL),
+        html.Td(f"{grid_buy:.1f}", style=TOTAL_BUY),
+        html.Td(f"{grid_sell:.1f}", style=TOTAL_SELL),
+    ]))
+    rows.append(html.Tr([
+        html.Td("Community Profit:", colSpan=5, style=PROFIT_LABEL),
+        html.Td(f"{profit:.1f} ct/h", colSpan=2, style={
+            **PROFIT_VALUE,
+            "color": _profit_color(profit),
+            "backgroundColor": "#f0f8f0" if abs(profit) < 0.1 else "#fff",
+        }),
+    ]))
+    return html.Table([TABLE_HEADER, html.Tbody(rows)], style=TABLE_STYLE)
+
+
+def render_pricing_table(snapshot, p_pv: float, p_house_con: float, p_grid_con: float,
+                         p_grid_del: float) -> html.Table:
+    """Pricing table as html components, memoized on the rounded inputs."""
+    return _html_table(table_key(snapshot, p_pv, p_house_con, p_grid_con, p_grid_del))
+
+
+@lru_cache(maxsize=64)
+def _datatable_rows(key: tuple) -> list[dict]:
+    values = _table_values(*key)
+    rows = [
+        {"name": f"House {idx + 1}", "house_buy": round(house_buy, 1), "house_sell": round(house_sell, 1),
+         "comm_buy": round(comm_buy, 1), "comm_sell": round(comm_sell, 1), "grid_buy": None, "grid_sell": None}
+        for idx, (house_buy, house_sell, comm_buy, comm_sell) in enumerate(zip(
+            values["house_buy"], values["house_sell"], values["comm_buy"], values["comm_sell"]
+        ))
+    ]
+    grid_buy, grid_sell, totals = values["grid_buy"], values["grid_sell"], values["totals"]
+    rows.append({"name": "Grid", "house_buy": None, "house_sell": None,
+                 "comm_buy": round(grid_sell, 1) or None, "comm_sell": round(grid_buy, 1) or None,
+                 "grid_buy": round(grid_buy, 1), "grid_sell": round(grid_sell, 1)})
+    rows.append({"name": "TOTAL", **{column: round(totals[column], 1) for column in VALUE_COLUMNS}})
+    rows.append({"name": "Community Profit (ct/h)", "grid_sell": round(values["profit"], 1)})
+    return rows
+
+
+def pricing_table_data(snapshot, p_pv: float, p_house_con: float, p_grid_con: float,
+                       p_grid_del: float) -> list[dict]:
+    """DataTable rows (data only), memoized on the rounded inputs."""
+    return _datatable_rows(table_key(snapshot, p_pv, p_house_con, p_grid_con, p_grid_del))
+
+
+def pricing_datatable(table_id: str) -> dash_table.DataTable:
+    """DataTable with static columns and styles; updates only replace `data`."""
+    groups = (("House", "house"), ("Community", "comm"), ("Grid", "grid"))
+    columns = [{"name": ["", ""], "id": "name"}] + [
+        {"name": [group, side.capitalize()], "id": f"{prefix}_{side}", "type": "numeric",
+         "format": {"specifier": ".1f"}}
+        for group, prefix in groups for side in ("buy", "sell")
+    ]
+    return dash_table.DataTable(
+        id=table_id,
+        columns=columns,
+        data=[],
+        merge_duplicate_headers=True,
+        fixed_rows={"headers": True},
+        page_action="none",
+        style_table={"maxHeight": "500px", "overflowY": "auto"},
+        style_cell={"padding": "2px 4px", "fontSize": "12px", "fontFamily": "Arial, sans-serif"},
+        style_header={"backgroundColor": GRID_BACKGROUND, "fontWeight": "bold", "textAlign": "center"},
+        style_data_conditional=[
+            {"if": {"column_id": "name"}, "fontWeight": "bold", "textAlign": "left"},
+            *({"if": {"column_id": f"{prefix}_buy"}, "color": BUY_COLOR, "borderLeft": GROUP_BORDER}
+              for _, prefix in groups),
+            *({"if": {"column_id": f"{prefix}_sell"}, "color": SELL_COLOR, "borderRight": GROUP_BORDER}
+              for _, prefix in groups),
+            {"if": {"filter_query": '{name} = "Grid"'}, "backgroundColor": GRID_BACKGROUND},
+            {"if": {"filter_query": '{name} = "TOTAL"'}, "fontWeight": "bold", "borderTop": GROUP_BORDER},
+            {"if": {"filter_query": '{name} contains "Profit"'}, "fontWeight": "bold", "fontSize": "16px"},
+        ],
+    )
@@ -0,0 +1,278 @@
+"""
+Time-stepped scenario engine for the LEG simulator.
+
+Runs a whole day or month at 1-minute resolution for the configured houses:
+a clear-sky PV curve with daily cloudiness, a household base-load profile
+and scheduled EV / washer runs. All steps are computed in bulk into
+(steps x houses) arrays; the UI then scrubs through the cached result
+instead of recalculating per frame.
+"""
+
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from model import POWER_FIELDS, CommunityState, EnergyModel, GridExchange, HouseStates
+from simulation import SimulationSnapshot
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "leg-common"))
+from breakeven import breakeven_tariffs
+
+STEP_SECONDS = 60
+STEPS_PER_DAY = 24 * 3600 // STEP_SECONDS
+STEP_HOURS = STEP_SECONDS / 3600
+
+SUNRISE_H, SUNSET_H = 6.0, 20.0
+DEFAULT_PV_PEAK_W = (3000, 8000)
+DEFAULT_EV_W = 11000
+DEFAULT_WASHER_W = 2000
+
+# Relative base load per hour of day (mean 1.0): night trough, morning and evening peaks
+BASE_LOAD_SHAPE = np.array([
+    0.55, 0.50, 0.48, 0.47, 0.48, 0.60, 0.95, 1.30, 1.20, 1.00, 0.95, 1.05,
+    1.15, 1.05, 0.95, 0.95, 1.05, 1.35, 1.65, 1.70, 1.55, 1.30, 0.95, 0.70,
+])
+BASE_LOAD_SHAPE = BASE_LOAD_SHAPE / BASE_LOAD_SHAPE.mean()
+
+# Memory budget of the result cache; a scenario that alone would exceed it is refused
+CACHE_BYTES = int(os.environ.get("LEG_SIM_SCENARIO_CACHE_MB", "512")) * 1024 * 1024
+# float32 (steps, houses) arrays held per result
+_ARRAYS_PER_RESULT = 6
+
+
+@dataclass
+class ScenarioResult:
+    """Per-step house powers (W, shape (steps, houses)) and per-step community values."""
+    house_ids: list[str]
+    days: int
+    pv_w: np.ndarray
+    base_w: np.ndarray
+    ev_w: np.ndarray
+    washer_w: np.ndarray
+    net_w: np.ndarray
+    export_kwh: np.ndarray     # (steps,) E per step
+    import_kwh: np.ndarray     # (steps,) I per step
+    house_import_kwh: np.ndarray
+
+    @property
+    def steps(self) -> int:
+        return self.net_w.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in (
+            "pv_w", "base_w", "ev_w", "washer_w", "net_w", "export_kwh", "import_kwh", "house_import_kwh"))
+
+    def snapshot(self, step: int) -> SimulationSnapshot:
+        """Instantaneous state at a step, in the shape Simulation.tick() returns."""
+        columns = {
+            "pv_power_w": np.round(self.pv_w[step], 1),
+            "base_load_w": np.round(self.base_w[step], 1),
+            "ev_load_w": np.round(self.ev_w[step], 1),
+            "washer_load_w": np.round(self.washer_w[step], 1),
+            "net_power_w": np.round(self.net_w[step], 1),
+        }
+        total_prod = float(self.pv_w[step].sum())
+        net_community = float(self.net_w[step].sum())
+        total_cons = total_prod - net_community
+        return SimulationSnapshot(
+            houses=HouseStates(self.house_ids, columns),
+            community=CommunityState(
+                total_production_w=round(total_prod, 1),
+                total_consumption_w=round(total_cons, 1),
+                net_community_power_w=round(net_community, 1),
+            ),
+            grid=GridExchange(
+                grid_import_w=round(-net_community, 1) if net_community < 0 else 0.0,
+                grid_export_w=round(net_community, 1) if net_community > 0 else 0.0,
+            ),
+        )
+
+
+def step_label(step: int) -> str:
+    """Day and time of a step, e.g. "Day 3 14:05"."""
+    day, minute = divmod(step * STEP_SECONDS // 60, 24 * 60)
+    return f"Day {day + 1} {minute // 60:02d}:{minute % 60:02d}"
+
+
+def _pv_profile(days: int, rng: np.random.Generator) -> np.ndarray:
+    """Relative PV output (0..1) per step: half-sine between sunrise and sunset, scaled per day by cloudiness."""
+    hours = (np.arange(STEPS_PER_DAY) * STEP_HOURS)
+    daylight = (hours - SUNRISE_H) / (SUNSET_H - SUNRISE_H)
+    clear_sky = np.where((daylight > 0) & (daylight < 1), np.sin(np.pi * np.clip(daylight, 0, 1)) ** 1.5, 0.0)
+    cloudiness = rng.uniform(0.25, 1.0, days)
+    return (cloudiness[:, None] * clear_sky[None, :]).reshape(-1)
+
+
+def _base_profile(days: int) -> np.ndarray:
+    """Relative base load per step, interpolated from the hourly shape (mean 1.0)."""
+    hours = np.arange(STEPS_PER_DAY) * STEP_HOURS
+    day = np.interp(hours, np.arange(25), np.append(BASE_LOAD_SHAPE, BASE_LOAD_SHAPE[0]))
+    return np.tile(day, days)
+
+
+def _schedule(days: int, houses: int, rng: np.random.Generator, probability: float,
+              start_h: tuple[float, float], duration_h: tuple[float, float]) -> np.ndarray:
+    """On/off matrix (steps, houses) with at most one run per house and day."""
+    on = np.zeros((days * STEPS_PER_DAY, houses), dtype=bool)
+    runs = rng.random((days, houses)) < probability
+    starts = (rng.uniform(*start_h, (days, houses)) / STEP_HOURS).astype(int)
+    lengths = (rng.uniform(*duration_h, (days, houses)) / STEP_HOURS).astype(int)
+    for day, house in zip(*np.nonzero(runs)):
+        begin = day * STEPS_PER_DAY + starts[day, house]
+        on[begin:begin + lengths[day, house], house] = True
+    return on
+
+
+def result_bytes(houses: int, days: int) -> int:
+    """Approximate cache size of a scenario result (the float32 per-house arrays)."""
+    return days * STEPS_PER_DAY * houses * _ARRAYS_PER_RESULT * 4
+
+
+def scenario_fits(houses: int, days: int) -> bool:
+    """Whether a scenario of this size can be computed and cached within CACHE_BYTES."""
+    return result_bytes(houses, days) <= CACHE_BYTES
+
+
+class _ResultCache:
+    """
+    LRU cache of scenario results bounded by their total array size, not their count.
+
+    Dash callbacks run on the server's worker threads, so all access is
+    locked; results are computed outside the lock.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._results: OrderedDict[tuple, ScenarioResult] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: tuple, result: ScenarioResult) -> None:
+        with self._lock:
+            # Two threads may compute the same scenario; the later result replaces the earlier
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._results[key] = result
+            self._bytes += result.nbytes
+            while self._bytes > self.max_bytes and len(self._results) > 1:
+                _, evicted = self._results.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+
+
+_cache = _ResultCache(CACHE_BYTES)
+
+
+def _run(house_ids: tuple[str, ...], days: int, seed: int, pv_peak_w: tuple, base_w: tuple,
+         ev_w: tuple, washer_w: tuple) -> ScenarioResult:
+    key = (house_ids, days, seed, pv_peak_w, base_w, ev_w, washer_w)
+    result = _cache.get(key)
+    if result is None:
+        result = _compute(house_ids, days, seed, pv_peak_w, base_w, ev_w, washer_w)
+        _cache.put(key, result)
+    return result
+
+
+def _compute(house_ids: tuple[str, ...], days: int, seed: int, pv_peak_w: tuple, base_w: tuple,
+             ev_w: tuple, washer_w: tuple) -> ScenarioResult:
+    """All steps in float32, so the peak is a few (steps, houses) arrays beyond the result itself."""
+    rng = np.random.default_rng(seed)
+    houses = len(house_ids)
+
+    def per_house(values: tuple) -> np.ndarray:
+        return np.asarray(values, dtype=np.float32)[None, :]
+
+    pv = _pv_profile(days, rng).astype(np.float32)[:, None] * per_house(pv_peak_w)
+    base = _base_profile(days).astype(np.float32)[:, None] * per_house(base_w)
+    ev = _schedule(days, houses, rng, 0.5, (17, 22), (1.5, 4)) * per_house(ev_w)
+    washer = _schedule(days, houses, rng, 0.6, (8, 20), (1, 2)) * per_house(washer_w)
+    net = pv - base - ev - washer
+
+    house_import_kwh = np.maximum(-net, 0.0) * np.float32(STEP_HOURS / 1000)
+    return ScenarioResult(
+        house_ids=list(house_ids),
+        days=days,
+        pv_w=pv,
+        base_w=base,
+        ev_w=ev,
+        washer_w=washer,
+        net_w=net,
+        export_kwh=np.maximum(net, 0.0).sum(axis=1, dtype=np.float64) * (STEP_HOURS / 1000),
+        import_kwh=house_import_kwh.sum(axis=1, dtype=np.float64),
+        house_import_kwh=house_import_kwh,
+    )
+
+
+def run_scenario(model: EnergyModel, days: int = 1, seed: int = 0) -> ScenarioResult:
+    """
+    Simulate `days` days for the model's houses.
+
+    Current model values act as the scenario parameters: pv_power_w is the
+    PV peak, base_load_w the mean base load, ev_load_w / washer_load_w the
+    power of scheduled runs. Unset (zero) PV, EV and washer values get
+    defaults so every house has a realistic day. Results are cached per
+    parameter set within CACHE_BYTES; a scenario that does not fit at all
+    (see scenario_fits) raises ValueError.
+    """
+    if not scenario_fits(model.house_count, days):
+        raise ValueError(f"{days}-day scenario for {model.house_count} houses exceeds the "
+                         f"{CACHE_BYTES // (1024 * 1024)} MB scenario cache")
+    rng = np.random.default_rng(seed + 1)
+    values = {field: np.array([model.get(i, field) for i in range(model.house_count)]) for field in POWER_FIELDS}
+    pv_peak = np.where(values["pv_power_w"] > 0, values["pv_power_w"],
+                       rng.integers(*DEFAULT_PV_PEAK_W, model.house_count, endpoint=True).round(-2))
+    ev = np.where(values["ev_load_w"] > 0, values["ev_load_w"], DEFAULT_EV_W)
+    washer = np.where(values["washer_load_w"] > 0, values["washer_load_w"], DEFAULT_WASHER_W)
+    return _run(tuple(model.house_ids), days, seed, tuple(pv_peak.tolist()),
+                tuple(values["base_load_w"].tolist()), tuple(ev.tolist()), tuple(washer.tolist()))
+
+
+def scenario_totals(result: ScenarioResult, p_pv: float, p_grid_con: float, p_grid_del: float) -> dict:
+    """Break-even p_con per step and energy-weighted totals over the whole scenario."""
+    E, I = result.export_kwh, result.import_kwh
+    p_con, p_pv_eff = breakeven_tariffs(E, I, p_pv, p_grid_con, p_grid_del)
+
+    total_e, total_i = float(E.sum()), float(I.sum())
+    grid_import = float(np.maximum(I - E, 0.0).sum())
+    grid_export = float(np.maximum(E - I, 0.0).sum())
+    house_cost = float(p_con @ I)
+    pv_payout = float(p_pv_eff @ E)
+    profit = house_cost + grid_export * p_grid_del - pv_payout - grid_import * p_grid_con
+    return {
+        "p_con": p_con,
+        "p_pv": p_pv_eff,
+        "export_kwh": total_e,
+        "import_kwh": total_i,
+        "grid_import_kwh": grid_import,
+        "grid_export_kwh": grid_export,
+        "mean_p_con": house_cost / total_i if total_i > 0 else p_grid_con,
+        "mean_p_pv": pv_payout / total_e if total_e > 0 else p_pv,
+        "house_cost_ct": (p_con.astype(np.float32) @ result.house_import_kwh).tolist(),
+        "community_profit_ct": profit,
+        "self_consumption": 1 - grid_export / total_e if total_e > 0 else 0.0,
+    }
+
+
+def hour_marks(result: ScenarioResult) -> dict:
+    """Slider marks: every 3 hours for a day, every day for longer scenarios."""
+    if result.days == 1:
+        return {h * 3600 // STEP_SECONDS: f"{h:02d}:00" for h in range(0, 24, 3)}
+    every = max(1, math.ceil(result.days / 15))
+    return {d * STEPS_PER_DAY: f"D{d + 1}" for d in range(0, result.days, every)}
@@ -0,0 +1,157 @@
+"""
+Per-session simulation state for the LEG simulator.
+
+Every browser tab gets its own session id (kept in a dcc.Store) and its own
+Simulation, so edits of one user never show up for another. Two bounded
+backends:
+
+- MemorySessionStore: in-process LRU; fine for a single worker process.
+- SQLiteSessionStore: local SQLite file (WAL) shared by all worker
+  processes of a multi-worker deployment (e.g. gunicorn -w 4).
+
+Both evict the least recently used sessions beyond max_sessions.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from simulation import Simulation
+
+
+@dataclass
+class SessionState:
+    simulation: Simulation
+    # Dynamic graph values last sent to the browser, used to diff Patch updates
+    graph_values: dict | None = None
+
+
+class MemorySessionStore:
+    """In-process LRU of session states."""
+
+    def __init__(self, house_count: int, max_sessions: int = 100) -> None:
+        self.house_count = house_count
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, session_id: str) -> SessionState:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(Simulation(self.house_count))
+                self._sessions[session_id] = state
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def simulation(self, session_id: str) -> Simulation:
+        return self._state(session_id).simulation
+
+    def save_simulation(self, session_id: str, simulation: Simulation) -> None:
+        self._state(session_id).simulation = simulation
+
+    def graph_values(self, session_id: str) -> dict | None:
+        return self._state(session_id).graph_values
+
+    def save_graph_values(self, session_id: str, values: dict | None) -> None:
+        self._state(session_id).graph_values = values
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Session states in a local SQLite database shared across processes.
+
+    Simulation and graph values are stored in separate columns so the edit
+    callback and the graph callback never overwrite each other's data.
+    """
+
+    def __init__(self, path: str, house_count: int, max_sessions: int = 100) -> None:
+        self.path = path
+        self.house_count = house_count
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    simulation BLOB NOT NULL,
+                    graph_values BLOB,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; Flask serves callbacks from a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def simulation(self, session_id: str) -> Simulation:
+        conn = self._connect()
+        row = conn.execute("SELECT simulation FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is not None:
+            with conn:
+                conn.execute("UPDATE sessions SET accessed = ? WHERE session_id = ?", (time.time(), session_id))
+            return pickle.loads(row[0])
+
+        simulation = Simulation(self.house_count)
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, simulation, accessed) VALUES (?, ?, ?)",
+                (session_id, pickle.dumps(simulation), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+        # Another worker may have created the session first
+        return self.simulation(session_id)
+
+    def save_simulation(self, session_id: str, simulation: Simulation) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET simulation = ?, accessed = ? WHERE session_id = ?",
+                (pickle.dumps(simulation), time.time(), session_id),
+            )
+
+    def graph_values(self, session_id: str) -> dict | None:
+        row = self._connect().execute(
+            "SELECT graph_values FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row and row[0] is not None else None
+
+    def save_graph_values(self, session_id: str, values: dict | None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET graph_values = ?, accessed = ? WHERE session_id = ?",
+                (None if values is None else pickle.dumps(values), time.time(), session_id),
+            )
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(kind: str, house_count: int, max_sessions: int = 100, path: str | None = None):
+    """Session store for LEG_SIM_SESSION_STORE: "memory" (default) or "sqlite"."""
+    if kind == "sqlite":
+        path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+        return SQLiteSessionStore(path, house_count, max_sessions)
+    if kind == "memory":
+        return MemorySessionStore(house_count, max_sessions)
+    raise ValueError(f"Unknown session store: {kind} (expected 'memory' or 'sqlite')")
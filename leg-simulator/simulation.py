@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 
-from model import CommunityState, EnergyModel, GridExchange, HouseState
+from model import CommunityState, EnergyModel, GridExchange, HouseStates
 
 
 @dataclass
 class SimulationSnapshot:
-    houses: list[HouseState]
+    houses: HouseStates
     community: CommunityState
     grid: GridExchange
 
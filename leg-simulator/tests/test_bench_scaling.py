@@ -0,0 +1,53 @@
+"""
+Small-size run of bench_scaling.py against the stored baseline.
+
+Timings depend on the machine, so the comparison against the baseline only
+runs with LEG_BENCH=1, at a tolerance wider than the CLI default
+(LEG_BENCH_TOLERANCE overrides it). The default run checks the result
+shape, the figure size and the comparison logic.
+"""
+
+import json
+import os
+
+import pytest
+from bench_scaling import TIMED_CASES, bench_size, compare
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench_baseline.json")
+RUN_TIMING = os.environ.get("LEG_BENCH") == "1"
+TOLERANCE = float(os.environ.get("LEG_BENCH_TOLERANCE", "3.0"))
+MIN_DELTA_S = 0.002
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("houses", [5, 50])
+def test_results_and_figure_size(baseline, houses):
+    result = bench_size(houses, repeat=1)
+    assert set(TIMED_CASES) | {"figure_bytes", "peak_bytes"} <= set(result)
+    assert all(result[case] > 0 for case in TIMED_CASES)
+    assert result["figure_bytes"] <= baseline["results"][str(houses)]["figure_bytes"] * 1.1
+
+
+def test_compare_flags_only_relevant_slowdowns():
+    case, other = TIMED_CASES[0], TIMED_CASES[1]
+    baseline = {"results": {"5": {case: 0.010, other: 0.0001}}}
+    # 3x slower but within min_delta, and a size without a baseline entry
+    results = {"5": {case: 0.011, other: 0.0003}, "7": {case: 1.0, other: 1.0}}
+    assert compare(results, baseline, 1.5, 0.0005) == []
+
+    results = {"5": {case: 0.020, other: 0.0001}}
+    regressions = compare(results, baseline, 1.5, 0.0005)
+    assert len(regressions) == 1 and regressions[0].startswith(f"5 houses {case}: 20.00ms")
+    assert compare(results, baseline, 2.5, 0.0005) == []
+
+
+@pytest.mark.skipif(not RUN_TIMING, reason="timing comparison runs with LEG_BENCH=1")
+@pytest.mark.parametrize("houses", [5, 50])
+def test_no_regression_against_baseline(baseline, houses):
+    results = {str(houses): bench_size(houses, repeat=3)}
+    assert compare(results, baseline, TOLERANCE, MIN_DELTA_S) == []
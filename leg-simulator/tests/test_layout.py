@@ -0,0 +1,106 @@
+import json
+
+import plotly.io as pio
+import pytest
+from layout import (
+    LARGE_COMMUNITY_THRESHOLD,
+    LOD_DETAIL_SPAN,
+    TRACE_COMPONENTS,
+    TRACE_GRID_LINK,
+    TRACE_HOUSES,
+    TRACE_LINK_EXPORT,
+    TRACE_LINK_IDLE,
+    TRACE_LINK_IMPORT,
+    build_graph,
+    build_graph_patch,
+    lod_patch,
+)
+from plotly.utils import PlotlyJSONEncoder
+from simulation import Simulation
+
+
+def plain(fig) -> dict:
+    """Figure (go.Figure or dict) as the JSON the browser receives."""
+    return json.loads(pio.to_json(fig, validate=False))
+
+
+def operations(patch) -> list:
+    return json.loads(json.dumps(patch.to_plotly_json(), cls=PlotlyJSONEncoder))["operations"]
+
+
+def apply_patch(fig: dict, patch) -> dict:
+    """Apply a Patch's Assign operations to a figure dict, like dash-renderer does."""
+    for op in operations(patch):
+        assert op["operation"] == "Assign"
+        *path, last = op["location"]
+        target = fig
+        for key in path:
+            target = target[key]
+        target[last] = op["params"]["value"]
+    return fig
+
+
+@pytest.fixture(params=[5, LARGE_COMMUNITY_THRESHOLD + 30], ids=["small", "large"])
+def simulation(request):
+    return Simulation(request.param)
+
+
+def change(simulation, house=1):
+    model = simulation.model
+    model.set(house, "pv_power_w", 6000.0)
+    model.set(house, "ev_load_w", 11000.0)
+
+
+def test_patch_turns_old_figure_into_new_one(simulation):
+    first = simulation.tick()
+    figure = plain(build_graph(first))
+    _, values = build_graph_patch(first, None)
+    change(simulation)
+    second = simulation.tick()
+    patch, _ = build_graph_patch(second, values)
+    assert operations(patch)
+    assert apply_patch(figure, patch) == plain(build_graph(second))
+
+
+def test_unchanged_snapshot_sends_empty_patch(simulation):
+    snapshot = simulation.tick()
+    _, values = build_graph_patch(snapshot, None)
+    patch, next_values = build_graph_patch(simulation.tick(), values)
+    assert operations(patch) == []
+    assert next_values == values
+
+
+def test_small_patch_touches_only_changed_house():
+    simulation = Simulation(5)
+    _, values = build_graph_patch(simulation.tick(), None)
+    simulation.model.set(3, "washer_load_w", 2000.0)
+    patch, _ = build_graph_patch(simulation.tick(), values)
+    locations = [op["location"] for op in operations(patch)]
+    shapes = {location[2] for location in locations if location[:2] == ["layout", "shapes"]}
+    # Washer line of house 4 plus its community link (5 shapes per house) and the grid link
+    assert shapes <= {3 * 5 + 3, 3 * 5 + 4, 5 * 5}
+    assert ["data", 1, "text"] in locations
+
+
+def test_lod_patch():
+    houses = LARGE_COMMUNITY_THRESHOLD + 1
+    assert lod_patch({"xaxis.range[0]": 0, "xaxis.range[1]": 1}, LARGE_COMMUNITY_THRESHOLD) is None
+    assert lod_patch({"dragmode": "pan"}, houses) is None
+    zoomed = operations(lod_patch({"xaxis.range": [0, LOD_DETAIL_SPAN / 2]}, houses))
+    assert {"operation": "Assign", "location": ["data", TRACE_COMPONENTS, "visible"],
+            "params": {"value": True}} in zoomed
+    reset = operations(lod_patch({"xaxis.autorange": True}, houses))
+    assert all(op["params"]["value"] in (False, 10) for op in reset)
+
+
+def test_large_patch_sends_only_changed_traces():
+    simulation = Simulation(LARGE_COMMUNITY_THRESHOLD + 30)
+    model = simulation.model
+    model.set(0, "pv_power_w", 50000.0)     # keeps the community exporting
+    _, values = build_graph_patch(simulation.tick(), None)
+    # Washer on a house that stays importing: its link keeps its color
+    model.set(5, "washer_load_w", 2000.0)
+    patch, _ = build_graph_patch(simulation.tick(), values)
+    traces = {op["location"][1] for op in operations(patch)}
+    assert TRACE_COMPONENTS in traces and TRACE_HOUSES in traces
+    assert not traces & {TRACE_LINK_EXPORT, TRACE_LINK_IMPORT, TRACE_LINK_IDLE, TRACE_GRID_LINK}
@@ -0,0 +1,44 @@
+import threading
+from types import SimpleNamespace
+
+from scenario import _ResultCache
+
+
+def result(nbytes):
+    return SimpleNamespace(nbytes=nbytes)
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = _ResultCache(300)
+    cache.put("a", result(100))
+    cache.put("b", result(100))
+    cache.put("c", result(100))
+    assert cache.get("a") is not None
+    cache.put("d", result(100))
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+
+
+def test_cache_replacing_a_key_keeps_the_byte_count():
+    cache = _ResultCache(300)
+    cache.put("a", result(100))
+    cache.put("a", result(150))
+    assert cache._bytes == 150
+
+
+def test_concurrent_access_keeps_the_byte_count():
+    cache = _ResultCache(1000)
+
+    def worker(offset):
+        for n in range(2000):
+            key = (offset + n) % 40
+            if cache.get(key) is None:
+                cache.put(key, result(10 + key))
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache._bytes == sum(r.nbytes for r in cache._results.values())
+    assert cache._bytes <= 1000